@@ -1,7 +1,44 @@
 from abc import ABC, abstractmethod
-from datetime import date, datetime
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import accumulate, compress, count, islice
+from operator import itemgetter, mul
+import argparse
+import asyncio
+import csv
+import heapq
+import json
+import mmap
+import multiprocessing
 import os
+import pickle
 import re
+import sqlite3
+import struct
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import unicodedata
+import weakref
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: acelera apenas o recálculo de saldos em lote
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow é opcional: sem ele a exportação usa o formato colunar próprio
+    pa = pq = None
 
 class Validacao:
     """Classe responsável pelas funções de validação e interação com o usuário"""
@@ -16,11 +53,21 @@ class Validacao:
         """Aguarda que o usuário pressione Enter para continuar"""
         input("\nPressione Enter para continuar...")
 
+    # Pesos do cálculo dos dígitos verificadores do CPF (módulo 11)
+    _PESOS_CPF_1 = tuple(range(10, 1, -1))
+    _PESOS_CPF_2 = tuple(range(11, 1, -1))
+    _NAO_DIGITOS = re.compile(r'[^0-9]')
+
+    @staticmethod
+    def limpar_cpf(cpf: str) -> str:
+        """Remove os caracteres não numéricos do CPF (dígitos de outros alfabetos inclusive)"""
+        return cpf if cpf.isascii() and cpf.isdigit() else Validacao._NAO_DIGITOS.sub('', cpf)
+
     @staticmethod
     def validar_cpf(cpf: str) -> bool:
-        """Valida o formato do CPF (apenas verificação básica de formato)"""
+        """Valida o CPF: 11 dígitos, não repetidos, com dígitos verificadores corretos"""
         # Remove caracteres não numéricos
-        cpf = re.sub(r'[^0-9]', '', cpf)
+        cpf = Validacao.limpar_cpf(cpf)
         
         # Verifica se tem 11 dígitos
         if len(cpf) != 11:
@@ -30,7 +77,37 @@ class Validacao:
         if cpf == cpf[0] * 11:
             return False
         
-        return True
+        # Verifica os dois dígitos verificadores
+        digitos = [ord(c) - 48 for c in cpf]
+        primeiro = sum(map(mul, digitos, Validacao._PESOS_CPF_1)) * 10 % 11 % 10
+        if primeiro != digitos[9]:
+            return False
+        segundo = sum(map(mul, digitos, Validacao._PESOS_CPF_2)) * 10 % 11 % 10
+        return segundo == digitos[10]
+
+    @staticmethod
+    def validar_cpfs(cpfs: list) -> list:
+        """Valida um lote de CPFs já limpos e retorna uma lista de booleanos
+        
+        Com NumPy, os dígitos verificadores de todo o lote são calculados de uma vez.
+        """
+        if np is None:
+            return [Validacao.validar_cpf(cpf) for cpf in cpfs]
+        
+        validos = [False] * len(cpfs)
+        posicoes = [i for i, cpf in enumerate(cpfs) if len(cpf) == 11 and cpf.isascii() and cpf.isdigit()]
+        if not posicoes:
+            return validos
+        
+        texto = ''.join(cpfs[i] for i in posicoes).encode('ascii')
+        digitos = (np.frombuffer(texto, dtype=np.uint8).reshape(-1, 11) - 48).astype(np.int32)
+        primeiro = (digitos[:, :9] @ np.array(Validacao._PESOS_CPF_1, dtype=np.int32)) * 10 % 11 % 10
+        segundo = (digitos[:, :10] @ np.array(Validacao._PESOS_CPF_2, dtype=np.int32)) * 10 % 11 % 10
+        repetidos = (digitos == digitos[:, :1]).all(axis=1)
+        corretos = (primeiro == digitos[:, 9]) & (segundo == digitos[:, 10]) & ~repetidos
+        for posicao, correto in zip(posicoes, corretos.tolist()):
+            validos[posicao] = correto
+        return validos
 
     @staticmethod
     def validar_data(dia: int, mes: int, ano: int) -> bool:
@@ -52,19 +129,24 @@ class Validacao:
                 print("Erro: Digite um número inteiro válido.")
 
     @staticmethod
-    def obter_numero_float(mensagem: str) -> float:
-        """Solicita um número float do usuário com validação"""
+    def obter_valor_monetario(mensagem: str) -> Decimal:
+        """Solicita um valor em reais do usuário com validação (sem passar por float)"""
         while True:
             try:
                 entrada = input(mensagem)
                 # Substitui vírgula por ponto para aceitar padrão brasileiro
-                entrada = entrada.replace(',', '.')
-                valor = float(entrada)
+                entrada = entrada.strip().replace(',', '.')
+                valor = Decimal(entrada)
+                if not valor.is_finite():
+                    raise InvalidOperation
                 if valor <= 0:
                     print("Erro: O valor deve ser maior que zero.")
                     continue
+                if valor != valor.quantize(Decimal('0.01')):
+                    print("Erro: Use no máximo duas casas decimais.")
+                    continue
                 return valor
-            except ValueError:
+            except InvalidOperation:
                 print("Erro: Digite um valor numérico válido.")
 
     @classmethod
@@ -92,66 +174,766 @@ class Validacao:
         """Solicita e valida um CPF"""
         while True:
             cpf = input("CPF (apenas números): ")
-            cpf_limpo = re.sub(r'[^0-9]', '', cpf)
+            cpf_limpo = cls.limpar_cpf(cpf)
             
             if cls.validar_cpf(cpf_limpo):
                 return cpf_limpo
             else:
-                print("Erro: CPF inválido. Um CPF válido deve ter 11 dígitos.")
+                print("Erro: CPF inválido. Um CPF válido deve ter 11 dígitos e dígitos verificadores corretos.")
+
+class CodigoResultado:
+    """Códigos de resultado das operações (zero indica sucesso)"""
+    OK = 0
+    CONTA_INEXISTENTE = 1
+    OPERACAO_INVALIDA = 2
+    VALOR_INVALIDO = 3
+    LIMITE_TRANSACOES = 4
+    LIMITE_SAQUES = 5
+    LIMITE_VALOR_SAQUE = 6
+    SALDO_INSUFICIENTE = 7
+    LIMITE_DESTINO = 8
+    BLOQUEIO_FRAUDE = 9
+
+class Dinheiro:
+    """Conversões de valores monetários: internamente todo valor é um inteiro em centavos"""
+    
+    # Maior valor e maior saldo aceitos (R$ 10 trilhões): a soma de dois deles ainda
+    # cabe com folga nos inteiros de 64 bits do log, das colunas e do armazém
+    MAXIMO_CENTAVOS = 10 ** 15
+    
+    @staticmethod
+    def para_centavos(valor) -> int:
+        """Converte um valor em reais (Decimal, int, float ou str) para centavos
+        
+        Levanta ValueError para valores com mais de duas casas decimais ou cujo
+        módulo ultrapasse MAXIMO_CENTAVOS, em vez de arredondá-los.
+        """
+        if type(valor) is int:
+            centavos = valor * 100
+        else:
+            try:
+                # repr de um float é o menor decimal que o representa, sem o ruído binário
+                quantia = Decimal(repr(valor) if isinstance(valor, float) else str(valor).replace(',', '.'))
+            except InvalidOperation:
+                raise ValueError(f"Valor monetário inválido: {valor!r}") from None
+            if not quantia.is_finite():
+                raise ValueError(f"Valor monetário inválido: {valor!r}")
+            if abs(quantia) > Dinheiro.MAXIMO_CENTAVOS:
+                raise ValueError(f"Valor monetário fora do limite: {valor!r}")
+            quantia = quantia.scaleb(2)
+            if quantia != quantia.to_integral_value():
+                raise ValueError(f"Valor monetário com mais de duas casas decimais: {valor!r}")
+            centavos = int(quantia)
+        if abs(centavos) > Dinheiro.MAXIMO_CENTAVOS:
+            raise ValueError(f"Valor monetário fora do limite: {valor!r}")
+        return centavos
+    
+    @staticmethod
+    def para_reais(centavos: int) -> Decimal:
+        """Converte centavos para um Decimal em reais com duas casas"""
+        return Decimal(centavos).scaleb(-2)
 
 class Transacao(ABC):
     """Interface para as transações"""
+    __slots__ = ()
+    centavos = 0  # Transações sem valor monetário
     
     @abstractmethod
     def registrar(self, conta):
         pass
 
-class Deposito(Transacao):
-    def __init__(self, valor: float):
-        self.valor = valor
-        self.data = datetime.now()
+class TransacaoMonetaria(Transacao):
+    """Transação com valor, guardado como inteiro em centavos"""
+    __slots__ = ('centavos', 'data')
+    
+    def __init__(self, valor, data: datetime = None):
+        self.centavos = Dinheiro.para_centavos(valor)
+        self.data = data or datetime.now()
+    
+    @classmethod
+    def de_centavos(cls, centavos: int, data: datetime = None) -> 'TransacaoMonetaria':
+        """Cria a transação diretamente a partir do valor em centavos"""
+        transacao = cls.__new__(cls)
+        transacao.centavos = centavos
+        transacao.data = data or datetime.now()
+        return transacao
+    
+    @property
+    def valor(self) -> Decimal:
+        return Dinheiro.para_reais(self.centavos)
+
+class Deposito(TransacaoMonetaria):
+    __slots__ = ()
     
     def registrar(self, conta):
         return conta.depositar(self.valor)
 
-class Saque(Transacao):
-    def __init__(self, valor: float):
-        self.valor = valor
-        self.data = datetime.now()
+class Saque(TransacaoMonetaria):
+    __slots__ = ()
     
     def registrar(self, conta):
         return conta.sacar(self.valor)
 
+class Transferencia(TransacaoMonetaria):
+    """Transferência entre duas contas, registrada no histórico de ambas"""
+    __slots__ = ('origem', 'destino')  # Números das contas
+    
+    def __init__(self, valor, origem: int, destino: int, data: datetime = None):
+        super().__init__(valor, data)
+        self.origem = origem
+        self.destino = destino
+    
+    @classmethod
+    def entre(cls, centavos: int, origem: int, destino: int, data: datetime = None) -> 'Transferencia':
+        transacao = cls.de_centavos(centavos, data)
+        transacao.origem = origem
+        transacao.destino = destino
+        return transacao
+    
+    def registrar(self, conta):
+        # A transferência envolve duas contas: é executada por Conta.transferir
+        raise TypeError("Use Conta.transferir para realizar transferências")
+    
+    def sinal(self, numero: int) -> int:
+        """+1 se a conta recebeu a transferência e -1 se a enviou"""
+        return -1 if numero == self.origem else 1
+
 class Consulta(Transacao):
-    def __init__(self):
-        self.data = datetime.now()
+    __slots__ = ('data',)
+    
+    def __init__(self, data: datetime = None):
+        self.data = data or datetime.now()
     
     def registrar(self, conta):
         # Não altera o saldo, apenas registra a consulta
         return True
 
-class Historico:
+class AgregadosTransacoes:
+    """Quantidade e total em centavos por tipo de transação, por dia e por mês
+    
+    Atualizados a cada transação, permitem consultar totais em O(dias) do período
+    em vez de percorrer as transações. Os totais diários ficam apenas para os
+    últimos DIAS_RETIDOS dias; os mensais, para todo o histórico.
+    
+    Transferências de uma conta conhecida são separadas em ENVIADA e RECEBIDA;
+    consultas pelo tipo Transferencia somam os dois sentidos.
+    """
+    __slots__ = ('por_dia', 'por_mes')
+    
+    DIAS_RETIDOS = 400
+    ENVIADA = 'transferencia_enviada'
+    RECEBIDA = 'transferencia_recebida'
+    _CHAVES_TIPO = {Transferencia: (Transferencia, ENVIADA, RECEBIDA)}
+    
     def __init__(self):
+        self.por_dia = {}  # date -> {chave: [quantidade, centavos]}, na ordem em que os dias aparecem
+        self.por_mes = {}  # (ano, mês) -> {chave: [quantidade, centavos]}
+    
+    @classmethod
+    def chave(cls, transacao: Transacao, numero: int = None):
+        """Chave da transação nos totais: o tipo, ou o sentido da transferência para a conta `numero`"""
+        tipo = type(transacao)
+        if tipo is Transferencia and numero is not None:
+            return cls.ENVIADA if transacao.origem == numero else cls.RECEBIDA
+        return tipo
+    
+    @staticmethod
+    def _acumular(tabela: dict, periodo, chave, centavos: int, quantidade: int):
+        totais = tabela.get(periodo)
+        if totais is None:
+            totais = tabela[periodo] = {}
+        acumulado = totais.get(chave)
+        if acumulado is None:
+            totais[chave] = [quantidade, centavos]
+        else:
+            acumulado[0] += quantidade
+            acumulado[1] += centavos
+    
+    def _retido(self, dia: date) -> bool:
+        """Indica se o dia entra nos totais diários, descartando os dias que saíram da retenção"""
+        if dia in self.por_dia:
+            return True
+        limite = date.today() - timedelta(days=self.DIAS_RETIDOS)
+        if dia < limite:
+            return False
+        # Dia novo: os mais antigos ficam no início do dicionário (já somados em por_mes)
+        for antigo in list(islice(self.por_dia, 8)):
+            if antigo >= limite:
+                break
+            del self.por_dia[antigo]
+        return True
+    
+    def adicionar(self, chave, dia: date, centavos: int, quantidade: int = 1):
+        self._acumular(self.por_mes, (dia.year, dia.month), chave, centavos, quantidade)
+        if self._retido(dia):
+            self._acumular(self.por_dia, dia, chave, centavos, quantidade)
+    
+    def mesclar(self, outro: 'AgregadosTransacoes'):
+        """Soma os totais diários e mensais de outro agregado a este"""
+        for periodo, totais in outro.por_mes.items():
+            for chave, (quantidade, centavos) in totais.items():
+                self._acumular(self.por_mes, periodo, chave, centavos, quantidade)
+        for dia, totais in outro.por_dia.items():
+            if self._retido(dia):
+                for chave, (quantidade, centavos) in totais.items():
+                    self._acumular(self.por_dia, dia, chave, centavos, quantidade)
+    
+    @classmethod
+    def _somar(cls, totais: dict, tipo=None) -> tuple:
+        if not totais:
+            return 0, 0
+        if tipo is not None:
+            quantidade = centavos = 0
+            for chave in cls._CHAVES_TIPO.get(tipo, (tipo,)):
+                q, c = totais.get(chave, (0, 0))
+                quantidade += q
+                centavos += c
+            return quantidade, centavos
+        return sum(q for q, _ in totais.values()), sum(c for _, c in totais.values())
+    
+    def dia(self, dia: date, tipo=None) -> tuple:
+        """(quantidade, centavos) do dia, de um tipo ou de todos (zero fora da retenção)"""
+        return self._somar(self.por_dia.get(dia), tipo)
+    
+    def mes(self, ano: int, mes: int, tipo=None) -> tuple:
+        """(quantidade, centavos) do mês, de um tipo ou de todos"""
+        return self._somar(self.por_mes.get((ano, mes)), tipo)
+    
+    def periodo(self, inicio: date, fim: date, tipo=None) -> tuple:
+        """(quantidade, centavos) dos dias retidos com inicio <= dia < fim"""
+        quantidade = centavos = 0
+        dia = max(inicio, date.today() - timedelta(days=self.DIAS_RETIDOS))
+        while dia < fim:
+            q, c = self._somar(self.por_dia.get(dia), tipo)
+            quantidade += q
+            centavos += c
+            dia += timedelta(days=1)
+        return quantidade, centavos
+    
+    def resumo_mes(self, ano: int, mes: int) -> dict:
+        """{chave: (quantidade, centavos)} do mês"""
+        return {chave: tuple(totais) for chave, totais in self.por_mes.get((ano, mes), {}).items()}
+
+class Historico:
+    def __init__(self, numero: int = None):
+        # Conta dona do histórico: define o sentido das transferências nos agregados
+        self.numero = numero
         self.transacoes = []
+        # Índice temporal: instante (microssegundos desde a época) de cada transação
+        self._instantes = array('q')
+        self._ordenado = True
+        # Contadores do dia corrente por tipo de transação (reiniciados na virada do dia)
+        self._dia_contagem = date.today()
+        self._contagem_hoje = {}
+        self._total_hoje = 0
+        # Totais por dia e por mês de cada tipo de transação, para relatórios
+        self.agregados = AgregadosTransacoes()
+    
+    @staticmethod
+    def instante(data: datetime) -> int:
+        """Converte uma data para microssegundos desde a época"""
+        return round(data.timestamp() * 1_000_000)
     
     def adicionar_transacao(self, transacao: Transacao):
         self.transacoes.append(transacao)
+        self._indexar(transacao.data)
+        self._contabilizar(type(transacao), transacao)
+    
+    def _indexar(self, data: datetime):
+        """Acrescenta o instante da transação ao índice temporal"""
+        instante = self.instante(data)
+        if self._instantes and instante < self._instantes[-1]:
+            # Inserção fora de ordem: as consultas por período passam a percorrer o histórico
+            self._ordenado = False
+        self._instantes.append(instante)
+    
+    def _contabilizar(self, tipo, transacao: Transacao):
+        """Atualiza os agregados e os contadores diários com uma nova transação"""
+        dia = transacao.data.date()
+        chave = AgregadosTransacoes.chave(transacao, self.numero) if tipo is Transferencia else tipo
+        self.agregados.adicionar(chave, dia, transacao.centavos)
+        if dia != self._dia_contagem:
+            if dia < self._dia_contagem:
+                # Transação de um dia anterior não afeta os contadores de hoje
+                return
+            self._reiniciar_contagem(dia)
+        self._contagem_hoje[tipo] = self._contagem_hoje.get(tipo, 0) + 1
+        self._total_hoje += 1
+    
+    def _reiniciar_contagem(self, dia: date):
+        self._dia_contagem = dia
+        self._contagem_hoje = {}
+        self._total_hoje = 0
+    
+    def contar_hoje(self, tipo=None) -> int:
+        """Retorna em tempo constante a quantidade de transações de hoje (opcionalmente de um tipo)"""
+        if date.today() != self._dia_contagem:
+            # Nada registrado hoje; os contadores só são reiniciados por _contabilizar
+            return 0
+        if tipo is None:
+            return self._total_hoje
+        # Subclasses também contam, como em isinstance; a cópia tolera tipos novos inseridos em paralelo
+        contagem = tuple(self._contagem_hoje.items())
+        return sum(quantidade for chave, quantidade in contagem if issubclass(chave, tipo))
     
     def obter_transacoes_hoje(self):
         """Retorna apenas as transações realizadas hoje"""
-        hoje = datetime.now().date()
-        return [t for t in self.transacoes if t.data.date() == hoje]
+        hoje = date.today()
+        # As transações são registradas em ordem cronológica, então basta
+        # percorrer o histórico a partir do fim até encontrar um dia anterior
+        inicio = len(self.transacoes)
+        while inicio > 0 and self.transacoes[inicio - 1].data.date() == hoje:
+            inicio -= 1
+        return self.transacoes[inicio:]
+    
+    def indices_periodo(self, inicio: datetime = None, fim: datetime = None):
+        """Retorna os índices das transações com inicio <= data < fim
+        
+        Com o histórico em ordem cronológica, a busca é binária sobre o índice temporal.
+        """
+        minimo = self.instante(inicio) if inicio else None
+        maximo = self.instante(fim) if fim else None
+        if not self._ordenado:
+            return [
+                i for i, instante in enumerate(self._instantes)
+                if (minimo is None or instante >= minimo) and (maximo is None or instante < maximo)
+            ]
+        primeiro = bisect_left(self._instantes, minimo) if minimo is not None else 0
+        ultimo = bisect_left(self._instantes, maximo) if maximo is not None else len(self._instantes)
+        return range(primeiro, max(primeiro, ultimo))
+    
+    def transacoes_periodo(self, inicio: datetime = None, fim: datetime = None):
+        """Gera, sob demanda, as transações com inicio <= data < fim"""
+        transacoes = self.transacoes
+        for indice in self.indices_periodo(inicio, fim):
+            yield transacoes[indice]
+    
+    def exportar_colunas(self, inicio: int, fim: int, colunas: 'ColunasTransacoes'):
+        """Acrescenta às colunas as transações de índice inicio <= i < fim (sem o número da conta)"""
+        colunas.instantes.extend(self._instantes[inicio:fim])
+        colunas.acrescentar(self.transacoes[inicio:fim])
+    
+    def recalcular_saldo(self, numero: int) -> int:
+        """Recalcula o saldo em centavos a partir de todas as transações do histórico
+        
+        O número da conta dona do histórico define o sentido das transferências.
+        """
+        saldo = 0
+        for transacao in self.transacoes:
+            tipo = type(transacao)
+            if tipo is Deposito:
+                saldo += transacao.centavos
+            elif tipo is Saque:
+                saldo -= transacao.centavos
+            elif tipo is Transferencia:
+                saldo += transacao.sinal(numero) * transacao.centavos
+        return saldo
+
+class _TransacoesColunares(Sequence):
+    """Visão somente leitura que cria as transações sob demanda a partir das colunas"""
+    __slots__ = ('_historico',)
+    
+    def __init__(self, historico: 'HistoricoColunar'):
+        self._historico = historico
+    
+    def __len__(self):
+        return len(self._historico._tipos)
+    
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self._historico._montar(i) for i in range(*indice.indices(len(self)))]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError("índice de transação fora do intervalo")
+        return self._historico._montar(indice)
+
+class HistoricoColunar(Historico):
+    """Histórico armazenado em colunas tipadas (tipo, centavos e instante em microssegundos)"""
+    
+    TIPOS = (Deposito, Saque, Consulta, Transferencia)
+    CODIGOS = {tipo: codigo for codigo, tipo in enumerate(TIPOS)}
+    
+    def __init__(self, numero: int = None):
+        super().__init__(numero)
+        self._tipos = array('b')
+        self._centavos = array('q')
+        # Contas das transferências, guardadas à parte por serem raras: índice -> (origem, destino)
+        self._transferencias = {}
+        # Índices das transferências em ordem crescente, para localizar as de um intervalo
+        self._indices_transferencias = array('q')
+        self.transacoes = _TransacoesColunares(self)
+    
+    def adicionar_transacao(self, transacao: Transacao):
+        tipo = type(transacao)
+        if tipo is Transferencia:
+            self._transferencias[len(self._tipos)] = (transacao.origem, transacao.destino)
+            self._indices_transferencias.append(len(self._tipos))
+        self._tipos.append(self.CODIGOS[tipo])
+        self._centavos.append(transacao.centavos)
+        self._indexar(transacao.data)
+        self._contabilizar(tipo, transacao)
+    
+    def _montar(self, indice: int) -> Transacao:
+        """Reconstrói o objeto de transação armazenado na posição indicada"""
+        tipo = self.TIPOS[self._tipos[indice]]
+        data = datetime.fromtimestamp(self._instantes[indice] / 1_000_000)
+        if tipo is Consulta:
+            return Consulta(data)
+        if tipo is Transferencia:
+            origem, destino = self._transferencias[indice]
+            return Transferencia.entre(self._centavos[indice], origem, destino, data)
+        return tipo.de_centavos(self._centavos[indice], data)
+    
+    def exportar_colunas(self, inicio: int, fim: int, colunas: 'ColunasTransacoes'):
+        """Copia as fatias das colunas sem montar objetos de transação"""
+        base = len(colunas)
+        colunas.tipos.extend(self._tipos[inicio:fim])
+        colunas.centavos.extend(self._centavos[inicio:fim])
+        colunas.instantes.extend(self._instantes[inicio:fim])
+        zeros = array('q', bytes(8 * (fim - inicio)))
+        colunas.origens.extend(zeros)
+        colunas.destinos.extend(zeros)
+        indices = self._indices_transferencias
+        for posicao in range(bisect_left(indices, inicio), bisect_left(indices, fim)):
+            indice = indices[posicao]
+            origem, destino = self._transferencias[indice]
+            colunas.origens[base + indice - inicio] = origem
+            colunas.destinos[base + indice - inicio] = destino
+    
+    def recalcular_saldo(self, numero: int) -> int:
+        """Recalcula o saldo somando a coluna de valores de forma vetorizada"""
+        deposito, saque = self.CODIGOS[Deposito], self.CODIGOS[Saque]
+        if np is not None and len(self._tipos):
+            tipos = np.frombuffer(self._tipos, dtype=np.int8)
+            centavos = np.frombuffer(self._centavos, dtype=np.int64)
+            saldo = int(centavos[tipos == deposito].sum()) - int(centavos[tipos == saque].sum())
+        else:
+            # Sem NumPy: compress/map percorrem as colunas em C, sem criar objetos de transação
+            depositos = sum(compress(self._centavos, map(deposito.__eq__, self._tipos)))
+            saques = sum(compress(self._centavos, map(saque.__eq__, self._tipos)))
+            saldo = depositos - saques
+        for indice, (origem, _) in self._transferencias.items():
+            saldo += -self._centavos[indice] if origem == numero else self._centavos[indice]
+        return saldo
+
+class _VisaoEscalonada(Sequence):
+    """Visão somente leitura sobre as duas camadas: registros do arquivo seguidos da janela em memória
+    
+    O índice de cada transação nunca muda; a trava das camadas só garante que a divisão
+    entre arquivo e janela seja lida de forma consistente durante um despejo.
+    """
+    __slots__ = ('_historico', '_ler', '_recentes')
+    
+    def __init__(self, historico: 'HistoricoEscalonado', ler, recentes: deque):
+        self._historico = historico
+        self._ler = ler  # Converte um registro do arquivo no item da visão
+        self._recentes = recentes
+    
+    def __len__(self):
+        return self._historico._arquivadas + len(self._recentes)
+    
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self[i] for i in range(*indice.indices(len(self)))]
+        historico = self._historico
+        with historico._trava_camadas:
+            arquivadas = historico._arquivadas
+            if indice < 0:
+                indice += arquivadas + len(self._recentes)
+            if indice < 0:
+                raise IndexError("índice de transação fora do intervalo")
+            if indice >= arquivadas:
+                try:
+                    return self._recentes[indice - arquivadas]
+                except IndexError:
+                    raise IndexError("índice de transação fora do intervalo") from None
+        # Registro já arquivado: as listas de blocos só crescem, a leitura dispensa a trava
+        return self._ler(historico._registro(indice))
+    
+    def __iter__(self):
+        # O arquivo é percorrido sequencialmente, sem uma busca por item
+        historico = self._historico
+        with historico._trava_camadas:
+            arquivadas = historico._arquivadas
+            recentes = list(self._recentes)
+        ler = self._ler
+        for registro in historico._registros(0, arquivadas):
+            yield ler(registro)
+        yield from recentes
+
+class _SegmentoHistorico:
+    """Arquivo de despejo compartilhado pelos HistoricoEscalonado do processo
+    
+    Os blocos despejados são acumulados em memória e gravados no arquivo em lotes de
+    TAMANHO_LOTE bytes, sem abrir nem fechar arquivos a cada despejo; um bloco ainda
+    não gravado é lido do próprio lote. Um arquivo que deixou de receber blocos é
+    removido quando nenhum histórico usa mais os blocos dele.
+    """
+    TAMANHO_LOTE = 1 << 20
+    TAMANHO_MAXIMO = 1 << 28  # Acima deste tamanho, os blocos novos vão para um arquivo novo
+    
+    atual = None  # Segmento que recebe os blocos novos
+    trava = threading.Lock()  # Protege todos os segmentos
+    
+    __slots__ = ('caminho', 'tamanho', 'vivos', '_arquivo', '_gravado', '_lote', '_mapa', '_pid', '__weakref__')
+    
+    def __init__(self, diretorio: str = None):
+        descritor, self.caminho = tempfile.mkstemp(prefix='historico_', suffix='.seg', dir=diretorio)
+        self._arquivo = os.fdopen(descritor, 'wb')
+        self.tamanho = 0  # Bytes anexados, gravados ou no lote
+        self.vivos = 0  # Blocos de históricos ainda existentes
+        self._gravado = 0  # Bytes já gravados no arquivo
+        self._lote = bytearray()
+        self._mapa = None
+        # Processos filhos herdam os segmentos, mas só o dono grava e remove o arquivo
+        self._pid = os.getpid()
+        weakref.finalize(self, _remover_segmento, self.caminho, self._pid)
+    
+    @classmethod
+    def anexar(cls, diretorio: str, dados: bytes) -> tuple:
+        """Acrescenta um bloco ao segmento atual e retorna (segmento, posição)"""
+        with cls.trava:
+            segmento = cls.atual
+            if segmento is None or segmento.tamanho >= cls.TAMANHO_MAXIMO:
+                if segmento is not None:
+                    segmento._gravar()
+                    if not segmento.vivos:
+                        segmento._fechar()
+                segmento = cls.atual = cls(diretorio)
+            posicao = segmento.tamanho
+            segmento._lote += dados
+            segmento.tamanho += len(dados)
+            segmento.vivos += 1
+            if len(segmento._lote) >= cls.TAMANHO_LOTE:
+                segmento._gravar()
+            return segmento, posicao
+    
+    def _gravar(self):
+        """Grava o lote pendente no arquivo (com a trava adquirida)"""
+        if self._lote:
+            self._arquivo.write(self._lote)
+            self._arquivo.flush()
+            self._gravado += len(self._lote)
+            self._lote = bytearray()
+    
+    def ler(self, posicao: int, tamanho: int):
+        """Bytes em [posicao, posicao + tamanho), que não atravessam a divisa entre arquivo e lote"""
+        with self.trava:
+            if posicao >= self._gravado:
+                inicio = posicao - self._gravado
+                return bytes(self._lote[inicio:inicio + tamanho])
+            mapa = self._mapa
+            if mapa is None or len(mapa) < posicao + tamanho:
+                # Mapeamento novo a cada lote gravado; leitores do anterior o mantêm vivo até terminarem
+                with open(self.caminho, 'rb') as arquivo:
+                    mapa = self._mapa = mmap.mmap(arquivo.fileno(), self._gravado, access=mmap.ACCESS_READ)
+        return memoryview(mapa)[posicao:posicao + tamanho]
+    
+    @classmethod
+    def liberar(cls, segmentos: list):
+        """Finalizador dos históricos: desconta os blocos (um item por bloco) e remove os arquivos sem uso"""
+        with cls.trava:
+            for segmento in segmentos:
+                segmento.vivos -= 1
+                if not segmento.vivos and segmento is not cls.atual:
+                    segmento._fechar()
+    
+    def _fechar(self):
+        self._lote = bytearray()
+        self._mapa = None
+        if self._pid == os.getpid():
+            self._arquivo.close()
+            _remover_segmento(self.caminho, self._pid)
+    
+    @classmethod
+    def _reiniciar_no_filho(cls):
+        cls.atual = None
+        cls.trava = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_SegmentoHistorico._reiniciar_no_filho)
+
+class HistoricoEscalonado(Historico):
+    """Histórico em duas camadas: janela recente em memória e arquivo mapeado para o restante
+    
+    Só as JANELA transações mais recentes ficam em memória; as mais antigas são
+    despejadas em blocos de BLOCO registros de largura fixa nos arquivos de segmento
+    compartilhados (_SegmentoHistorico), lidos via mmap sem cópia. `transacoes`
+    percorre as duas camadas de forma transparente. O arquivo é apenas área de
+    despejo: a durabilidade continua a cargo de Persistencia.
+    """
+    diretorio = None  # Onde criar os arquivos de segmento (None = diretório temporário do sistema)
+    JANELA = 64
+    BLOCO = 32  # Transações despejadas de uma vez quando a janela enche (no máximo JANELA)
+    REGISTRO = struct.Struct('<Bqqqq')  # tipo, centavos, instante, origem e destino (transferências)
+    
+    def __init__(self, numero: int = None):
+        super().__init__(numero)
+        self._recentes = deque()
+        self._instantes_recentes = deque()
+        self._arquivadas = 0
+        # Segmento e posição de cada bloco despejado, em ordem
+        self._segmentos = []
+        self._posicoes = array('q')
+        # Torna consistente a leitura das duas camadas enquanto um bloco passa de uma para a outra
+        self._trava_camadas = threading.Lock()
+        self.transacoes = _VisaoEscalonada(self, self._montar, self._recentes)
+        self._instantes = _VisaoEscalonada(self, itemgetter(2), self._instantes_recentes)
+    
+    def adicionar_transacao(self, transacao: Transacao):
+        self._recentes.append(transacao)
+        self._indexar(transacao.data)
+        self._contabilizar(type(transacao), transacao)
+        if len(self._recentes) >= self.JANELA:
+            self._despejar()
+    
+    def _indexar(self, data: datetime):
+        instante = self.instante(data)
+        if self._instantes_recentes and instante < self._instantes_recentes[-1]:
+            self._ordenado = False
+        self._instantes_recentes.append(instante)
+    
+    def _despejar(self):
+        """Anexa o bloco mais antigo da janela a um segmento e o retira da memória"""
+        codigos = HistoricoColunar.CODIGOS
+        empacotar = self.REGISTRO.pack
+        partes = []
+        for transacao, instante in zip(islice(self._recentes, self.BLOCO), self._instantes_recentes):
+            tipo = type(transacao)
+            if tipo is Transferencia:
+                partes.append(empacotar(codigos[tipo], transacao.centavos, instante, transacao.origem, transacao.destino))
+            else:
+                partes.append(empacotar(codigos[tipo], transacao.centavos, instante, 0, 0))
+        segmento, posicao = _SegmentoHistorico.anexar(self.diretorio, b''.join(partes))
+        if not self._segmentos:
+            # Os blocos acompanham o ciclo de vida do histórico
+            weakref.finalize(self, _SegmentoHistorico.liberar, self._segmentos)
+        
+        with self._trava_camadas:
+            self._segmentos.append(segmento)
+            self._posicoes.append(posicao)
+            for _ in partes:
+                self._recentes.popleft()
+                self._instantes_recentes.popleft()
+            # Publicado por último: os registros já estão no bloco e fora da janela
+            self._arquivadas += len(partes)
+    
+    def _registro(self, indice: int) -> tuple:
+        bloco = indice // self.BLOCO
+        tamanho = self.REGISTRO.size
+        posicao = self._posicoes[bloco] + indice % self.BLOCO * tamanho
+        return self.REGISTRO.unpack(self._segmentos[bloco].ler(posicao, tamanho))
+    
+    def _registros(self, inicio: int = 0, fim: int = None):
+        """Percorre os registros arquivados com inicio <= índice < fim, bloco a bloco e sem cópia"""
+        fim = self._arquivadas if fim is None else fim
+        tamanho, bloco = self.REGISTRO.size, self.BLOCO
+        for indice in range(inicio // bloco, -(-fim // bloco)):
+            primeiro = max(inicio - indice * bloco, 0)
+            ultimo = min(fim - indice * bloco, bloco)
+            yield from self.REGISTRO.iter_unpack(self._segmentos[indice].ler(
+                self._posicoes[indice] + primeiro * tamanho, (ultimo - primeiro) * tamanho))
+    
+    def exportar_colunas(self, inicio: int, fim: int, colunas: 'ColunasTransacoes'):
+        """Lê dos segmentos a parte arquivada do intervalo e da janela em memória o restante"""
+        with self._trava_camadas:
+            arquivadas = self._arquivadas
+            if fim > arquivadas:
+                janela = max(inicio, arquivadas) - arquivadas, fim - arquivadas
+                instantes = list(islice(self._instantes_recentes, *janela))
+                recentes = list(islice(self._recentes, *janela))
+        if inicio < arquivadas:
+            for codigo, centavos, instante, origem, destino in self._registros(inicio, min(fim, arquivadas)):
+                colunas.tipos.append(codigo)
+                colunas.centavos.append(centavos)
+                colunas.instantes.append(instante)
+                colunas.origens.append(origem)
+                colunas.destinos.append(destino)
+        if fim > arquivadas:
+            colunas.instantes.extend(instantes)
+            colunas.acrescentar(recentes)
+    
+    @staticmethod
+    def _montar(registro: tuple) -> Transacao:
+        codigo, centavos, instante, origem, destino = registro
+        tipo = HistoricoColunar.TIPOS[codigo]
+        data = datetime.fromtimestamp(instante / 1_000_000)
+        if tipo is Consulta:
+            return Consulta(data)
+        if tipo is Transferencia:
+            return Transferencia.entre(centavos, origem, destino, data)
+        return tipo.de_centavos(centavos, data)
+    
+    def recalcular_saldo(self, numero: int) -> int:
+        """Soma os registros do arquivo sem criar objetos de transação e depois a janela"""
+        deposito, saque = HistoricoColunar.CODIGOS[Deposito], HistoricoColunar.CODIGOS[Saque]
+        transferencia = HistoricoColunar.CODIGOS[Transferencia]
+        with self._trava_camadas:
+            arquivadas = self._arquivadas
+            recentes = list(self._recentes)
+        saldo = 0
+        for codigo, centavos, _, origem, _ in self._registros(0, arquivadas):
+            if codigo == deposito:
+                saldo += centavos
+            elif codigo == saque:
+                saldo -= centavos
+            elif codigo == transferencia:
+                saldo += -centavos if origem == numero else centavos
+        for transacao in recentes:
+            tipo = type(transacao)
+            if tipo is Deposito:
+                saldo += transacao.centavos
+            elif tipo is Saque:
+                saldo -= transacao.centavos
+            elif tipo is Transferencia:
+                saldo += transacao.sinal(numero) * transacao.centavos
+        return saldo
+
+def _remover_segmento(caminho: str, pid: int):
+    if os.getpid() != pid:
+        return  # Processo filho: o arquivo é do processo que o criou
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+
+class ObservadorBanco:
+    """Interface para componentes notificados sobre mudanças de estado de um CaixaEletronico
+    
+    Cada caixa tem os seus observadores (veja CaixaEletronico.registrar_observador).
+    """
+    
+    def cliente_criado(self, cliente):
+        pass
+    
+    def conta_criada(self, conta):
+        pass
+    
+    def conta_movimentada(self, conta, transacao: Transacao, saldo_anterior: int):
+        """saldo_anterior é o saldo em centavos antes da transação"""
+        pass
+    
+    def saldo_recalculado(self, conta, saldo_anterior: int):
+        """O saldo foi reconstruído a partir do histórico e mudou (sem transação nova)"""
+        pass
 
 class Cliente:
     def __init__(self, endereco: str):
         self.endereco = str(endereco)
         self.contas = []
+        self._contas_por_numero = {}
     
     def realizar_transacao(self, conta, transacao: Transacao):
         return transacao.registrar(conta)
     
     def adicionar_conta(self, conta):
         self.contas.append(conta)
+        self._contas_por_numero[conta.numero] = conta
+    
+    def obter_conta(self, numero: int):
+        """Retorna a conta do cliente com o número informado ou None"""
+        return self._contas_por_numero.get(numero)
 
 class PessoaFisica(Cliente):
     def __init__(self, endereco: str, cpf: str, nome: str, data_nascimento: date):
@@ -162,81 +944,527 @@ class PessoaFisica(Cliente):
 
 class Conta:
     contador_contas = 1  # Contador para gerar números de conta automaticamente
+    passo_contas = 1  # Intervalo entre números consecutivos (usado no modo fragmentado)
+    _trava_contador = threading.Lock()
+    classe_historico = Historico  # HistoricoColunar (compacto) ou HistoricoEscalonado (memória limitada)
+    motor_fraude = None  # MotorFraude consultado a cada saque (veja MotorFraude.instalar)
+    caixa = None  # CaixaEletronico cujos observadores são notificados dos movimentos
     
     def __init__(self, cliente: Cliente, numero: int, agencia: str):
-        self._saldo = 0.0
+        self._saldo = 0  # Saldo em centavos
+        # Trava da conta: saldo, histórico e verificação de limites mudam juntos
+        self._trava = threading.RLock()
         self.numero = int(numero)
         self.agencia = str(agencia)
         self.cliente = cliente
-        self.historico = Historico()
+        self.historico = self.classe_historico(self.numero)
         cliente.adicionar_conta(self)
     
     @property
-    def saldo(self) -> float:
+    def saldo(self) -> Decimal:
+        return Dinheiro.para_reais(self._saldo)
+    
+    @property
+    def saldo_centavos(self) -> int:
         return self._saldo
     
+    def adiar_historico(self, carregar):
+        """Descarta o histórico vazio e passa a obtê-lo de carregar(conta) no primeiro acesso"""
+        del self.historico
+        self._carregar_historico = carregar
+    
+    def __getattr__(self, nome):
+        # Só é chamado para atributos ausentes: um histórico adiado custa a busca extra
+        # apenas até ser carregado, e o acesso normal continua sendo um atributo comum
+        if nome != 'historico':
+            raise AttributeError(nome)
+        historico = self.__dict__.get('historico')
+        if historico is not None:
+            return historico
+        if '_carregar_historico' not in self.__dict__:
+            raise AttributeError(nome)
+        with self._trava:
+            historico = self.__dict__.get('historico')
+            if historico is None:
+                historico = self.historico = self._carregar_historico(self)
+                del self._carregar_historico
+            return historico
+    
     @classmethod
     def nova_conta(cls, cliente: Cliente) -> 'Conta':
-        numero = cls.contador_contas
-        cls.contador_contas += 1
+        numero = cls.reservar_numeros(1)[0]
         return cls(cliente, numero, "1001")
     
-    def sacar(self, valor: float) -> bool:
-        if valor > 0 and self._saldo >= valor:
-            self._saldo -= valor
-            self.historico.adicionar_transacao(Saque(valor))
-            return True
-        return False
+    @staticmethod
+    def reservar_numeros(quantidade: int) -> range:
+        """Reserva atomicamente um bloco de números de conta consecutivos"""
+        # O contador fica sempre em Conta para que as subclasses compartilhem a numeração
+        with Conta._trava_contador:
+            inicio = Conta.contador_contas
+            passo = Conta.passo_contas
+            fim = Conta.contador_contas = inicio + quantidade * passo
+        return range(inicio, fim, passo)
     
-    def depositar(self, valor: float) -> bool:
-        if valor > 0:
-            self._saldo += valor
-            self.historico.adicionar_transacao(Deposito(valor))
-            return True
-        return False
+    @staticmethod
+    def configurar_numeracao(inicio: int, passo: int = 1):
+        """Define o próximo número de conta e o intervalo entre os números gerados"""
+        with Conta._trava_contador:
+            Conta.contador_contas = inicio
+            Conta.passo_contas = passo
+    
+    def sacar(self, valor) -> bool:
+        return self.executar_saque(valor) == CodigoResultado.OK
+    
+    def depositar(self, valor) -> bool:
+        return self.executar_deposito(valor) == CodigoResultado.OK
+    
+    def verificar_saque(self, centavos: int) -> int:
+        """Retorna o CodigoResultado que um saque desse valor (em centavos) teria"""
+        if not 0 < centavos <= Dinheiro.MAXIMO_CENTAVOS:
+            return CodigoResultado.VALOR_INVALIDO
+        if self._saldo < centavos:
+            return CodigoResultado.SALDO_INSUFICIENTE
+        if self.motor_fraude is not None and self.motor_fraude.bloquear(self, centavos):
+            return CodigoResultado.BLOQUEIO_FRAUDE
+        return CodigoResultado.OK
+    
+    def verificar_deposito(self, centavos: int) -> int:
+        """Retorna o CodigoResultado que um depósito desse valor (em centavos) teria"""
+        # O saldo resultante também não pode passar de MAXIMO_CENTAVOS
+        if not 0 < centavos <= Dinheiro.MAXIMO_CENTAVOS - self._saldo:
+            return CodigoResultado.VALOR_INVALIDO
+        return CodigoResultado.OK
+    
+    def executar_saque(self, valor) -> int:
+        """Verifica as regras e realiza o saque de forma atômica, retornando o CodigoResultado"""
+        centavos = Dinheiro.para_centavos(valor)
+        with self._trava:
+            codigo = self.verificar_saque(centavos)
+            if codigo == CodigoResultado.OK:
+                saldo_anterior = self._saldo
+                self._saldo -= centavos
+                self._registrar(Saque.de_centavos(centavos), saldo_anterior)
+            return codigo
+    
+    def executar_deposito(self, valor) -> int:
+        """Verifica as regras e realiza o depósito de forma atômica, retornando o CodigoResultado"""
+        centavos = Dinheiro.para_centavos(valor)
+        with self._trava:
+            codigo = self.verificar_deposito(centavos)
+            if codigo == CodigoResultado.OK:
+                saldo_anterior = self._saldo
+                self._saldo += centavos
+                self._registrar(Deposito.de_centavos(centavos), saldo_anterior)
+            return codigo
+    
+    def verificar_transferencia(self, centavos: int) -> int:
+        """Retorna o CodigoResultado que uma transferência desse valor (em centavos) saindo da conta teria"""
+        if not 0 < centavos <= Dinheiro.MAXIMO_CENTAVOS:
+            return CodigoResultado.VALOR_INVALIDO
+        if self._saldo < centavos:
+            return CodigoResultado.SALDO_INSUFICIENTE
+        if self.motor_fraude is not None and self.motor_fraude.bloquear(self, centavos, Transferencia):
+            return CodigoResultado.BLOQUEIO_FRAUDE
+        return CodigoResultado.OK
+    
+    def transferir(self, destino: 'Conta', valor) -> bool:
+        return self.executar_transferencia(destino, valor) == CodigoResultado.OK
+    
+    def executar_transferencia(self, destino: 'Conta', valor) -> int:
+        """Debita esta conta e credita o destino de forma atômica, retornando o CodigoResultado
+        
+        As travas das duas contas são sempre adquiridas em ordem crescente de número,
+        o que impede impasses entre transferências simultâneas em sentidos opostos.
+        """
+        centavos = Dinheiro.para_centavos(valor)
+        if destino is self or destino.numero == self.numero:
+            return CodigoResultado.OPERACAO_INVALIDA
+        primeira, segunda = (self, destino) if self.numero < destino.numero else (destino, self)
+        with primeira._trava, segunda._trava:
+            codigo = self.verificar_transferencia(centavos)
+            if codigo != CodigoResultado.OK:
+                return codigo
+            if destino.verificar_deposito(centavos) != CodigoResultado.OK:
+                return CodigoResultado.LIMITE_DESTINO
+            
+            transacao = Transferencia.entre(centavos, self.numero, destino.numero)
+            saldo_origem, saldo_destino = self._saldo, destino._saldo
+            self._saldo -= centavos
+            destino._saldo += centavos
+            self._registrar(transacao, saldo_origem)
+            destino._registrar(transacao, saldo_destino)
+            return CodigoResultado.OK
+    
+    def recalcular_saldo(self) -> int:
+        """Reconstrói o saldo a partir do histórico e retorna o novo saldo em centavos"""
+        with self._trava:
+            saldo_anterior = self._saldo
+            self._saldo = self.historico.recalcular_saldo(self.numero)
+            if self._saldo != saldo_anterior and self.caixa is not None:
+                for observador in self.caixa.observadores:
+                    observador.saldo_recalculado(self, saldo_anterior)
+            return self._saldo
+    
+    def _registrar(self, transacao: Transacao, saldo_anterior: int):
+        """Adiciona a transação ao histórico e notifica o motor de fraude e os observadores"""
+        self.historico.adicionar_transacao(transacao)
+        if self.motor_fraude is not None:
+            self.motor_fraude.conta_movimentada(self, transacao, saldo_anterior)
+        if self.caixa is not None:
+            for observador in self.caixa.observadores:
+                observador.conta_movimentada(self, transacao, saldo_anterior)
 
 class ContaCorrente(Conta):
-    def __init__(self, cliente: Cliente, numero: int, agencia: str, limite: float = 500, limite_saques: int = 3):
+    def __init__(self, cliente: Cliente, numero: int, agencia: str, limite=500, limite_saques: int = 3):
         super().__init__(cliente, numero, agencia)
-        self.limite = float(limite)
+        self.limite_centavos = Dinheiro.para_centavos(limite)
         self.limite_saques = int(limite_saques)
         self.limite_transacoes = 10
     
-    def sacar(self, valor: float) -> bool:
+    @property
+    def limite(self) -> Decimal:
+        """Limite por saque em reais"""
+        return Dinheiro.para_reais(self.limite_centavos)
+    
+    def verificar_saque(self, centavos: int) -> int:
         # Verificar limite de transações diárias
-        transacoes_hoje = len(self.historico.obter_transacoes_hoje())
-        if transacoes_hoje >= self.limite_transacoes:
-            print(f"Operação falhou! Limite de {self.limite_transacoes} transações diárias atingido.")
-            return False
+        if self.historico.contar_hoje() >= self.limite_transacoes:
+            return CodigoResultado.LIMITE_TRANSACOES
         
         # Verificar limite de saques diários
-        saques_hoje = len([t for t in self.historico.obter_transacoes_hoje() if isinstance(t, Saque)])
-        if saques_hoje >= self.limite_saques:
-            print(f"Operação falhou! Limite de {self.limite_saques} saques diários atingido.")
-            return False
+        if self.historico.contar_hoje(Saque) >= self.limite_saques:
+            return CodigoResultado.LIMITE_SAQUES
         
         # Verificar limite de valor por saque
-        if valor > self.limite:
-            print(f"Operação falhou! O valor excede o limite de R$ {self.limite:.2f} por saque.")
-            return False
-            
-        return super().sacar(valor)
+        if centavos > self.limite_centavos:
+            return CodigoResultado.LIMITE_VALOR_SAQUE
+        
+        return super().verificar_saque(centavos)
     
-    def depositar(self, valor: float) -> bool:
+    def verificar_deposito(self, centavos: int) -> int:
         # Verificar limite de transações diárias
-        transacoes_hoje = len(self.historico.obter_transacoes_hoje())
-        if transacoes_hoje >= self.limite_transacoes:
-            print(f"Operação falhou! Limite de {self.limite_transacoes} transações diárias atingido.")
-            return False
-            
-        return super().depositar(valor)
+        if self.historico.contar_hoje() >= self.limite_transacoes:
+            return CodigoResultado.LIMITE_TRANSACOES
+        
+        return super().verificar_deposito(centavos)
+    
+    def verificar_transferencia(self, centavos: int) -> int:
+        # A transferência conta como transação do dia e respeita os limites de saque
+        if self.historico.contar_hoje() >= self.limite_transacoes:
+            return CodigoResultado.LIMITE_TRANSACOES
+        if self.historico.contar_hoje(Saque) >= self.limite_saques:
+            return CodigoResultado.LIMITE_SAQUES
+        if centavos > self.limite_centavos:
+            return CodigoResultado.LIMITE_VALOR_SAQUE
+        return super().verificar_transferencia(centavos)
 
-class CaixaEletronico:
+class FormatadorExtrato:
+    """Formata linhas de extrato com um formatador por tipo de transação, criado uma única vez"""
+    
+    NOMES = {
+        Deposito: "Depósito",
+        Saque: "Saque",
+        Consulta: "Consulta de Extrato",
+        Transferencia: "Transferência",
+    }
+    
     def __init__(self):
+        self._formatadores = {}
+    
+    def formatar(self, numero: int, transacao: Transacao) -> str:
+        tipo = type(transacao)
+        formatador = self._formatadores.get(tipo)
+        if formatador is None:
+            formatador = self._formatadores[tipo] = self._criar_formatador(tipo)
+        return formatador(numero, transacao)
+    
+    def _criar_formatador(self, tipo):
+        nome = self.NOMES.get(tipo, "Desconhecida")
+        transferencia = issubclass(tipo, Transferencia)
+        
+        def formatador(numero: int, transacao: Transacao) -> str:
+            d = transacao.data
+            centavos = transacao.centavos
+            descricao = f"{nome} {transacao.origem} -> {transacao.destino}" if transferencia else nome
+            # Formatação manual da data: bem mais rápida que strftime
+            return (f"{numero}. {d.day:02d}/{d.month:02d}/{d.year:04d} "
+                    f"{d.hour:02d}:{d.minute:02d}:{d.second:02d} - {descricao}: "
+                    f"R$ {centavos // 100}.{centavos % 100:02d}")
+        return formatador
+
+class ServicoBancario:
+    """Camada de serviço sem interação com o terminal
+    
+    Todas as operações retornam um CodigoResultado em vez de imprimir mensagens,
+    o que permite usar as regras de negócio em lotes, servidores e benchmarks.
+    """
+    
+    MENSAGENS = {
+        CodigoResultado.OK: "Operação realizada com sucesso.",
+        CodigoResultado.CONTA_INEXISTENTE: "Erro: Conta não encontrada.",
+        CodigoResultado.OPERACAO_INVALIDA: "Erro: Operação inválida.",
+        CodigoResultado.VALOR_INVALIDO: "Erro: O valor deve ser maior que zero e estar dentro do limite permitido.",
+        CodigoResultado.LIMITE_TRANSACOES: "Operação falhou! Limite de {conta.limite_transacoes} transações diárias atingido.",
+        CodigoResultado.LIMITE_SAQUES: "Operação falhou! Limite de {conta.limite_saques} saques diários atingido.",
+        CodigoResultado.LIMITE_VALOR_SAQUE: "Operação falhou! O valor excede o limite de R$ {conta.limite:.2f} por saque.",
+        CodigoResultado.SALDO_INSUFICIENTE: "Erro: Saldo insuficiente. Seu saldo atual é de R$ {conta.saldo:.2f}",
+        CodigoResultado.LIMITE_DESTINO: "Operação falhou! A conta de destino atingiu o limite de transações diárias.",
+        CodigoResultado.BLOQUEIO_FRAUDE: "Operação bloqueada por segurança. Procure sua agência.",
+    }
+    
+    def __init__(self, caixa: 'CaixaEletronico'):
+        self.caixa = caixa
+        self.formatador = FormatadorExtrato()
+    
+    def buscar_cliente(self, cpf: str):
+        """Retorna o cliente com o CPF informado ou None (com cache, carrega-o sob demanda)"""
+        return self.caixa.obter_cliente(cpf)
+    
+    def buscar_conta(self, numero: int):
+        """Retorna a conta com o número informado ou None (com cache, carrega-a sob demanda)"""
+        return self.caixa.obter_conta(numero)
+    
+    def abrir_sessao(self, cliente):
+        """Mantém o cliente no cache enquanto a sessão estiver ativa"""
+        if self.caixa.cache is not None:
+            self.caixa.cache.fixar(cliente)
+    
+    def encerrar_sessao(self, cliente):
+        if self.caixa.cache is not None and cliente is not None:
+            self.caixa.cache.liberar(cliente)
+    
+    def depositar(self, conta: Conta, valor) -> int:
+        return conta.executar_deposito(valor)
+    
+    def sacar(self, conta: Conta, valor) -> int:
+        return conta.executar_saque(valor)
+    
+    def transferir(self, origem: Conta, destino: Conta, valor) -> int:
+        return origem.executar_transferencia(destino, valor)
+    
+    def compensar_transferencias(self, transferencias, liquidar: bool = False) -> array:
+        """Aplica um lote de transferências (origem, destino, valor em reais) agrupadas por par de contas
+        
+        As transferências entre o mesmo par de contas, em qualquer sentido, são aplicadas
+        com as travas do par adquiridas uma única vez; cada uma continua sendo verificada
+        contra os limites e registrada no histórico. Dentro de um par, a ordem de entrada
+        é mantida. Retorna um vetor com um CodigoResultado por linha, na ordem de entrada.
+        
+        Com `liquidar`, as transferências válidas de cada par são compensadas: só o valor
+        líquido é verificado (verificar_transferencia e verificar_deposito) e registrado,
+        como uma única transferência. O código do líquido vale para todas as linhas do
+        par; um líquido zero não movimenta as contas.
+        """
+        resultados = array('b')
+        por_par = {}
+        for indice, (origem, destino, valor) in enumerate(transferencias):
+            resultados.append(CodigoResultado.OK)
+            try:
+                centavos = Dinheiro.para_centavos(valor)
+            except (ValueError, TypeError):
+                centavos = 0
+            if not centavos > 0:
+                resultados[indice] = CodigoResultado.VALOR_INVALIDO
+                continue
+            if origem == destino:
+                resultados[indice] = CodigoResultado.OPERACAO_INVALIDA
+                continue
+            # Chave no sentido da menor para a maior conta, a mesma ordem das travas
+            par = (origem, destino) if origem < destino else (destino, origem)
+            linhas = por_par.get(par)
+            if linhas is None:
+                linhas = por_par[par] = []
+            linhas.append((indice, origem, centavos))
+        
+        for (menor, maior), linhas in por_par.items():
+            primeira, segunda = self.buscar_conta(menor), self.buscar_conta(maior)
+            if primeira is None or segunda is None:
+                for indice, _, _ in linhas:
+                    resultados[indice] = CodigoResultado.CONTA_INEXISTENTE
+                continue
+            if liquidar:
+                codigo = self._liquidar_par(primeira, segunda, linhas)
+                for indice, _, _ in linhas:
+                    resultados[indice] = codigo
+                continue
+            with primeira._trava, segunda._trava:
+                for indice, origem, centavos in linhas:
+                    conta_origem, conta_destino = (primeira, segunda) if origem == menor else (segunda, primeira)
+                    resultados[indice] = conta_origem.executar_transferencia(
+                        conta_destino, Dinheiro.para_reais(centavos))
+        return resultados
+    
+    def _liquidar_par(self, primeira: Conta, segunda: Conta, linhas: list) -> int:
+        """Transfere o saldo líquido das linhas entre o par (primeira tem o menor número)"""
+        liquido = sum(centavos if origem == primeira.numero else -centavos for _, origem, centavos in linhas)
+        if liquido == 0:
+            return CodigoResultado.OK
+        origem, destino = (primeira, segunda) if liquido > 0 else (segunda, primeira)
+        if abs(liquido) > Dinheiro.MAXIMO_CENTAVOS:
+            return CodigoResultado.VALOR_INVALIDO
+        return origem.executar_transferencia(destino, Dinheiro.para_reais(abs(liquido)))
+    
+    def consultar_extrato(self, conta: Conta, quantidade: int = 10) -> tuple:
+        """Retorna (CodigoResultado, últimas transações); a consulta respeita o limite diário"""
+        limite_transacoes = getattr(conta, 'limite_transacoes', None)
+        if limite_transacoes is not None and conta.historico.contar_hoje() >= limite_transacoes:
+            return CodigoResultado.LIMITE_TRANSACOES, []
+        return CodigoResultado.OK, conta.historico.transacoes[-quantidade:]
+    
+    def paginar_extrato(self, conta: Conta, inicio: datetime = None, fim: datetime = None,
+                        tamanho_pagina: int = 50):
+        """Gera o extrato do período em páginas de linhas formatadas
+        
+        As linhas são montadas sob demanda, então extratos grandes podem ser
+        exportados com memória constante.
+        """
+        formatar = self.formatador.formatar
+        pagina = []
+        for numero, transacao in enumerate(conta.historico.transacoes_periodo(inicio, fim), 1):
+            pagina.append(formatar(numero, transacao))
+            if len(pagina) == tamanho_pagina:
+                yield pagina
+                pagina = []
+        if pagina:
+            yield pagina
+    
+    def uso_diario(self, conta: Conta) -> dict:
+        """Retorna a quantidade de saques e transações de hoje"""
+        return {
+            'saques': conta.historico.contar_hoje(Saque),
+            'transacoes': conta.historico.contar_hoje(),
+        }
+    
+    def resumo_mensal(self, conta: Conta, ano: int = None, mes: int = None) -> dict:
+        """{chave: (quantidade, valor em reais)} do mês (o atual por padrão), sem percorrer o histórico
+        
+        As chaves são os tipos de transação, com as transferências separadas em
+        AgregadosTransacoes.ENVIADA e RECEBIDA.
+        """
+        hoje = date.today()
+        resumo = conta.historico.agregados.resumo_mes(ano or hoje.year, mes or hoje.month)
+        return {tipo: (quantidade, Dinheiro.para_reais(centavos)) for tipo, (quantidade, centavos) in resumo.items()}
+    
+    def mensagem(self, codigo: int, conta: Conta = None) -> str:
+        """Texto para exibir ao usuário correspondente a um CodigoResultado"""
+        return self.MENSAGENS[codigo].format(conta=conta)
+    
+    # Tipos aceitos nas operações em lote
+    TIPOS_LOTE = {
+        Deposito: Deposito, 'deposito': Deposito, 'D': Deposito,
+        Saque: Saque, 'saque': Saque, 'S': Saque,
+    }
+    
+    def aplicar_lote(self, operacoes) -> array:
+        """Aplica um lote de operações (conta_numero, tipo, valor em reais) sem interação com o usuário
+        
+        Retorna um vetor com um CodigoResultado por linha, na ordem de entrada.
+        """
+        resultados = array('b')
+        por_conta = {}
+        # Agrupa as linhas por conta para buscar a conta e os limites uma única vez
+        for indice, (numero, tipo, valor) in enumerate(operacoes):
+            resultados.append(CodigoResultado.OK)
+            linhas = por_conta.get(numero)
+            if linhas is None:
+                linhas = por_conta[numero] = []
+            linhas.append((indice, tipo, valor))
+        
+        for numero, linhas in por_conta.items():
+            conta = self.caixa.obter_conta(numero)
+            if conta is None:
+                for indice, _, _ in linhas:
+                    resultados[indice] = CodigoResultado.CONTA_INEXISTENTE
+                continue
+            self._aplicar_lote_conta(conta, linhas, resultados)
+        return resultados
+    
+    def _aplicar_lote_conta(self, conta: Conta, linhas: list, resultados: array):
+        """Aplica as linhas de uma conta com as regras da própria conta (verificar_saque/verificar_deposito)"""
+        with conta._trava:
+            self._aplicar_lote_conta_travada(conta, linhas, resultados)
+    
+    def _aplicar_lote_conta_travada(self, conta: Conta, linhas: list, resultados: array):
+        tipos = self.TIPOS_LOTE
+        para_centavos = Dinheiro.para_centavos
+        registrar = conta._registrar
+        verificar = {Saque: conta.verificar_saque, Deposito: conta.verificar_deposito}
+        for indice, tipo, valor in linhas:
+            tipo = tipos.get(tipo)
+            if tipo is None:
+                resultados[indice] = CodigoResultado.OPERACAO_INVALIDA
+                continue
+            try:
+                centavos = para_centavos(valor)
+            except (ValueError, TypeError):
+                centavos = 0  # Recusado pela verificação como VALOR_INVALIDO
+            codigo = verificar[tipo](centavos)
+            if codigo != CodigoResultado.OK:
+                resultados[indice] = codigo
+                continue
+            saldo = conta._saldo
+            conta._saldo = saldo - centavos if tipo is Saque else saldo + centavos
+            registrar(tipo.de_centavos(centavos), saldo)
+    
+    def auditar_saldos(self) -> list:
+        """Compara o saldo de cada conta com o recalculado a partir do histórico
+        
+        Retorna a lista de (número da conta, saldo registrado, saldo recalculado) em
+        centavos para as contas divergentes. Com cache, as contas passam por ele uma a uma.
+        """
+        divergentes = []
+        for numero in self.caixa.numeros_contas():
+            conta = self.caixa.obter_conta(numero)
+            if conta is None:
+                continue
+            with conta._trava:
+                registrado = conta._saldo
+                recalculado = conta.historico.recalcular_saldo(conta.numero)
+            if registrado != recalculado:
+                divergentes.append((conta.numero, registrado, recalculado))
+        return divergentes
+
+class CaixaEletronico:
+    def __init__(self, cache: 'CacheContas' = None):
         self.clientes = {}  # Dicionário para armazenar clientes (chave: CPF)
         self.contas = {}    # Dicionário para armazenar contas (chave: número da conta)
+        # Com um CacheContas, clientes e contas ficam no armazém e os dicionários acima ficam vazios
+        self.cache = cache
         self.cliente_logado = None
         self.conta_logada = None
+        self.servico = ServicoBancario(self)
+        # Notificados na ordem de registro; a tupla é trocada por inteiro para ser percorrida sem trava
+        self.observadores = ()
+        self._trava_observadores = threading.Lock()
+        if cache is not None:
+            cache.vincular(self)
+    
+    def registrar_observador(self, observador: ObservadorBanco):
+        """Passa a notificar o observador sobre os clientes, contas e movimentos deste caixa"""
+        with self._trava_observadores:
+            self.observadores = self.observadores + (observador,)
+    
+    def remover_observador(self, observador: ObservadorBanco):
+        with self._trava_observadores:
+            self.observadores = tuple(o for o in self.observadores if o is not observador)
+    
+    def obter_cliente(self, cpf: str):
+        """Retorna o cliente com o CPF informado ou None, passando pelo cache se houver"""
+        if self.cache is not None:
+            return self.cache.obter_cliente(cpf)
+        return self.clientes.get(cpf)
+    
+    def obter_conta(self, numero: int):
+        """Retorna a conta com o número informado ou None, passando pelo cache se houver"""
+        if self.cache is not None:
+            return self.cache.obter_conta(numero)
+        return self.contas.get(numero)
+    
+    def numeros_contas(self) -> list:
+        """Números de todas as contas cadastradas, em ordem crescente"""
+        if self.cache is not None:
+            return self.cache.armazem.numeros_contas()
+        return sorted(self.contas)
                     
     def login(self) -> bool:
         """Realiza o login do cliente pelo CPF"""
@@ -244,9 +1472,11 @@ class CaixaEletronico:
         print("\n====== CAIXA ELETRÔNICO - LOGIN ======")
         
         cpf = Validacao.obter_cpf()
+        cliente = self.servico.buscar_cliente(cpf)
         
-        if cpf in self.clientes:
-            self.cliente_logado = self.clientes[cpf]
+        if cliente is not None:
+            self.cliente_logado = cliente
+            self.servico.abrir_sessao(cliente)
             
             # Se o cliente tem apenas uma conta, seleciona automaticamente
             if len(self.cliente_logado.contas) == 1:
@@ -292,6 +1522,7 @@ class CaixaEletronico:
     
     def logout(self):
         """Realiza o logout do usuário"""
+        self.servico.encerrar_sessao(self.cliente_logado)
         self.cliente_logado = None
         self.conta_logada = None
     
@@ -308,12 +1539,35 @@ class CaixaEletronico:
         
         # Exibir limites
         if isinstance(self.conta_logada, ContaCorrente):
-            saques_hoje = len([t for t in self.conta_logada.historico.obter_transacoes_hoje() if isinstance(t, Saque)])
-            transacoes_hoje = len(self.conta_logada.historico.obter_transacoes_hoje())
+            uso = self.servico.uso_diario(self.conta_logada)
             
-            print(f"Saques hoje: {saques_hoje}/{self.conta_logada.limite_saques}")
-            print(f"Transações hoje: {transacoes_hoje}/{self.conta_logada.limite_transacoes}")
+            print(f"Saques hoje: {uso['saques']}/{self.conta_logada.limite_saques}")
+            print(f"Transações hoje: {uso['transacoes']}/{self.conta_logada.limite_transacoes}")
             print(f"Limite por saque: R$ {self.conta_logada.limite:.2f}")
+        
+        # Movimentação do mês, a partir dos agregados do histórico
+        resumo = self.servico.resumo_mensal(self.conta_logada)
+        for chave, nome in ((Deposito, "Depósitos"), (Saque, "Saques"),
+                            (AgregadosTransacoes.ENVIADA, "Transferências enviadas"),
+                            (AgregadosTransacoes.RECEBIDA, "Transferências recebidas")):
+            if chave in resumo:
+                quantidade, total = resumo[chave]
+                print(f"{nome} no mês: {quantidade} (R$ {total:.2f})")
+    
+    def adicionar_cliente(self, cliente: PessoaFisica):
+        """Cadastra um cliente e notifica os observadores"""
+        if self.cache is None:
+            self.clientes[cliente.cpf] = cliente
+        for observador in self.observadores:
+            observador.cliente_criado(cliente)
+    
+    def adicionar_conta(self, conta: Conta):
+        """Cadastra uma conta e notifica os observadores"""
+        conta.caixa = self
+        if self.cache is None:
+            self.contas[conta.numero] = conta
+        for observador in self.observadores:
+            observador.conta_criada(conta)
     
     def criar_cliente(self) -> None:
         """Cria um novo cliente com validações"""
@@ -325,7 +1579,7 @@ class CaixaEletronico:
             cpf = Validacao.obter_cpf()
             
             # Verifica se o CPF já está cadastrado
-            if cpf in self.clientes:
+            if self.servico.buscar_cliente(cpf) is not None:
                 print(f"Erro: Já existe um cliente cadastrado com o CPF {cpf}.")
                 Validacao.aguardar_tecla()
                 return
@@ -345,11 +1599,11 @@ class CaixaEletronico:
             
             # Cria o cliente
             cliente = PessoaFisica(endereco, cpf, nome, data_nascimento)
-            self.clientes[cpf] = cliente
+            self.adicionar_cliente(cliente)
             
             # Cria automaticamente uma conta para o cliente
             conta = ContaCorrente.nova_conta(cliente)
-            self.contas[conta.numero] = conta
+            self.adicionar_conta(conta)
             
             print(f"\nCliente {nome} cadastrado com sucesso!")
             print(f"Conta {conta.numero} na agência {conta.agencia} criada automaticamente!")
@@ -371,16 +1625,17 @@ class CaixaEletronico:
         
         try:
             # Solicita o valor do depósito
-            valor = Validacao.obter_numero_float("Valor do depósito (R$): ")
+            valor = Validacao.obter_valor_monetario("Valor do depósito (R$): ")
             
             # Realiza o depósito
-            transacao = Deposito(valor)
+            codigo = self.servico.depositar(self.conta_logada, valor)
             
-            if self.cliente_logado.realizar_transacao(self.conta_logada, transacao):
+            if codigo == CodigoResultado.OK:
                 print(f"\nDepósito de R$ {valor:.2f} realizado com sucesso!")
                 print(f"Novo saldo: R$ {self.conta_logada.saldo:.2f}")
             else:
-                print("\nNão foi possível realizar o depósito.")
+                print(f"\n{self.servico.mensagem(codigo, self.conta_logada)}")
+                print("Não foi possível realizar o depósito.")
                 
         except Exception as e:
             print(f"Erro ao realizar depósito: {e}")
@@ -399,20 +1654,16 @@ class CaixaEletronico:
         
         try:
             # Solicita o valor do saque
-            valor = Validacao.obter_numero_float("Valor do saque (R$): ")
-            
-            # Verifica se o valor é maior que o saldo
-            if valor > self.conta_logada.saldo:
-                print(f"Erro: Saldo insuficiente. Seu saldo atual é de R$ {self.conta_logada.saldo:.2f}")
-                Validacao.aguardar_tecla()
-                return
+            valor = Validacao.obter_valor_monetario("Valor do saque (R$): ")
             
             # Realiza o saque
-            transacao = Saque(valor)
+            codigo = self.servico.sacar(self.conta_logada, valor)
             
-            if self.cliente_logado.realizar_transacao(self.conta_logada, transacao):
+            if codigo == CodigoResultado.OK:
                 print(f"\nSaque de R$ {valor:.2f} realizado com sucesso!")
                 print(f"Novo saldo: R$ {self.conta_logada.saldo:.2f}")
+            else:
+                print(f"\n{self.servico.mensagem(codigo, self.conta_logada)}")
             
         except Exception as e:
             print(f"Erro ao realizar saque: {e}")
@@ -428,10 +1679,10 @@ class CaixaEletronico:
         print("\n====== EXTRATO ======")
         self.exibir_informacoes_cliente()
         
-        # Verificar se a operação excede o limite de transações
-        transacoes_hoje = len(self.conta_logada.historico.obter_transacoes_hoje())
-        if transacoes_hoje >= self.conta_logada.limite_transacoes:
-            print(f"\nOperação falhou! Limite de {self.conta_logada.limite_transacoes} transações diárias atingido.")
+        # Mostrar apenas as 10 últimas transações (a consulta respeita o limite diário)
+        codigo, ultimas_transacoes = self.servico.consultar_extrato(self.conta_logada, 10)
+        if codigo != CodigoResultado.OK:
+            print(f"\n{self.servico.mensagem(codigo, self.conta_logada)}")
             Validacao.aguardar_tecla()
             return
         
@@ -439,33 +1690,22 @@ class CaixaEletronico:
             # Exibe o histórico de transações
             print("\n--- HISTÓRICO DE TRANSAÇÕES ---")
             
-            if not self.conta_logada.historico.transacoes:
+            if not ultimas_transacoes:
                 print("Nenhuma transação realizada.")
             else:
-                # Mostrar apenas as 10 últimas transações
-                ultimas_transacoes = self.conta_logada.historico.transacoes[-10:]
+                formatar = self.servico.formatador.formatar
                 for i, transacao in enumerate(ultimas_transacoes, 1):
-                    if isinstance(transacao, Deposito):
-                        tipo = "Depósito"
-                        valor = transacao.valor
-                    elif isinstance(transacao, Saque):
-                        tipo = "Saque"
-                        valor = transacao.valor
-                    elif isinstance(transacao, Consulta):
-                        tipo = "Consulta de Extrato"
-                        valor = 0
-                    else:
-                        tipo = "Desconhecida"
-                        valor = 0
-                    
-                    data_formatada = transacao.data.strftime("%d/%m/%Y %H:%M:%S")
-                    print(f"{i}. {data_formatada} - {tipo}: R$ {valor:.2f}")
+                    print(formatar(i, transacao))
             
         except Exception as e:
             print(f"Erro ao exibir extrato: {e}")
         
         Validacao.aguardar_tecla()
     
+    def aplicar_lote(self, operacoes) -> array:
+        """Aplica um lote de operações (conta_numero, tipo, valor); veja ServicoBancario.aplicar_lote"""
+        return self.servico.aplicar_lote(operacoes)
+    
     def verificar_login(self) -> bool:
         """Verifica se há um cliente logado e uma conta selecionada"""
         if not self.cliente_logado or not self.conta_logada:
@@ -501,9 +1741,2881 @@ class CaixaEletronico:
         
         return input("\nEscolha uma opção: ")
 
-def main():
-    caixa = CaixaEletronico()
+class HistogramaLatencia:
+    """Histograma de latências em nanossegundos com baldes log-lineares (estilo HDR)
+    
+    Cada potência de dois é dividida em SUB_BALDES baldes iguais, o que limita o erro
+    relativo de qualquer percentil a 1/SUB_BALDES com memória fixa. Os baldes incluem
+    o limite superior, como os "le" do Prometheus: toda potência de dois a partir de
+    SUB_BALDES é o limite superior de um balde.
+    """
+    BITS_SUB = 4
+    SUB_BALDES = 1 << BITS_SUB
+    MAXIMO_EXPOENTE = 40  # Latências acima de ~18 minutos vão para o último balde
+    
+    def __init__(self):
+        self.baldes = array('Q', bytes(8 * (self.SUB_BALDES * (self.MAXIMO_EXPOENTE + 2) + 1)))
+        self.contagem = 0
+        self.soma = 0
+        self.maximo = 0
+    
+    @classmethod
+    def indice(cls, valor: int) -> int:
+        """Balde de um valor: os valores até SUB_BALDES têm baldes exatos"""
+        if valor <= cls.SUB_BALDES:
+            return valor
+        # Com valor - 1, cada balde vai de um limite (exclusivo) ao seguinte (inclusivo)
+        anterior = valor - 1
+        expoente = min(anterior.bit_length() - cls.BITS_SUB - 1, cls.MAXIMO_EXPOENTE)
+        return expoente * cls.SUB_BALDES + min(anterior >> expoente, 2 * cls.SUB_BALDES - 1) + 1
+    
+    @classmethod
+    def limite_superior(cls, indice: int) -> int:
+        """Maior valor que cai no balde indicado"""
+        if indice <= cls.SUB_BALDES:
+            return indice
+        bloco, posicao = divmod(indice - 1, cls.SUB_BALDES)
+        return (posicao + cls.SUB_BALDES + 1) << (bloco - 1)
+    
+    def registrar(self, valor: int):
+        self.baldes[self.indice(valor)] += 1
+        self.contagem += 1
+        self.soma += valor
+        if valor > self.maximo:
+            self.maximo = valor
+    
+    def percentil(self, p: float) -> int:
+        """Latência (ns) abaixo da qual estão p% das amostras"""
+        if not self.contagem:
+            return 0
+        alvo = max(1, -(-self.contagem * p // 100))
+        acumulado = 0
+        for indice, quantidade in enumerate(self.baldes):
+            acumulado += quantidade
+            if acumulado >= alvo:
+                return min(self.limite_superior(indice), self.maximo)
+        return self.maximo
     
+    def acumulado_ate(self, valor: int) -> int:
+        """Quantidade de amostras menores ou iguais ao valor, exata quando ele é o limite superior de um balde"""
+        return sum(islice(self.baldes, self.indice(valor) + 1))
+
+class Metricas:
+    """Instrumentação dos caminhos críticos: chamadas, latências e rejeições por motivo
+    
+    Desligada não tem custo algum: ativar() troca os métodos de ALVOS por versões
+    cronometradas e desativar() devolve os originais. Componentes com métricas próprias
+    (método linhas_prometheus(prefixo)) entram na exportação com registrar_fonte().
+    """
+    PREFIXO = 'banco'
+    # (classe, método, nome da operação, tipo de retorno: 'codigo', 'lote' ou None)
+    ALVOS = (
+        (Conta, 'executar_saque', 'saque', 'codigo'),
+        (Conta, 'executar_deposito', 'deposito', 'codigo'),
+        (Conta, 'executar_transferencia', 'transferencia', 'codigo'),
+        (Historico, 'adicionar_transacao', 'historico_adicionar', None),
+        (HistoricoColunar, 'adicionar_transacao', 'historico_adicionar', None),
+        (HistoricoEscalonado, 'adicionar_transacao', 'historico_adicionar', None),
+        (Historico, 'contar_hoje', 'historico_contar_hoje', None),
+        (ServicoBancario, 'aplicar_lote', 'lote', 'lote'),
+    )
+    # Expoentes de 2 (em ns) usados como limites "le" na exportação: de ~1 µs a ~17 s
+    EXPOENTES_EXPORTACAO = range(10, 35)
+    MOTIVOS = {valor: nome.lower() for nome, valor in vars(CodigoResultado).items() if nome.isupper()}
+    
+    ativa = None  # Instância atualmente instalada, se houver
+    
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._originais = []
+        self.fontes = ()
+        self.zerar()
+    
+    def zerar(self):
+        """Descarta as medições acumuladas"""
+        with self._trava:
+            self.chamadas = {}
+            self.latencias = {}
+            self.rejeicoes = {}  # (operação, CodigoResultado) -> quantidade
+            for _, _, operacao, _ in self.ALVOS:
+                self.chamadas[operacao] = 0
+                self.latencias[operacao] = HistogramaLatencia()
+    
+    def registrar_fonte(self, fonte):
+        """Inclui as linhas de fonte.linhas_prometheus(prefixo) na exportação"""
+        with self._trava:
+            if fonte not in self.fontes:
+                self.fontes = self.fontes + (fonte,)
+    
+    def remover_fonte(self, fonte):
+        with self._trava:
+            self.fontes = tuple(f for f in self.fontes if f is not fonte)
+    
+    # ---- Ligar e desligar ----
+    
+    def ativar(self):
+        """Instala a instrumentação (substituindo a que estiver ativa)"""
+        if Metricas.ativa is self:
+            return
+        if Metricas.ativa is not None:
+            Metricas.ativa.desativar()
+        for classe, nome, operacao, retorno in self.ALVOS:
+            original = classe.__dict__[nome]
+            self._originais.append((classe, nome, original))
+            setattr(classe, nome, self._instrumentar(original, operacao, retorno))
+        Metricas.ativa = self
+    
+    def desativar(self):
+        """Restaura os métodos originais"""
+        if Metricas.ativa is not self:
+            return
+        for classe, nome, original in reversed(self._originais):
+            setattr(classe, nome, original)
+        self._originais.clear()
+        Metricas.ativa = None
+    
+    def _instrumentar(self, funcao, operacao: str, retorno: str):
+        relogio = time.perf_counter_ns
+        medir = self._medir
+        
+        if retorno == 'lote':
+            def instrumentada(*args, **kwargs):
+                inicio = relogio()
+                resultados = funcao(*args, **kwargs)
+                medir(operacao, relogio() - inicio, resultados)
+                return resultados
+        elif retorno == 'codigo':
+            def instrumentada(*args, **kwargs):
+                inicio = relogio()
+                codigo = funcao(*args, **kwargs)
+                medir(operacao, relogio() - inicio, (codigo,) if codigo else ())
+                return codigo
+        else:
+            def instrumentada(*args, **kwargs):
+                inicio = relogio()
+                resultado = funcao(*args, **kwargs)
+                medir(operacao, relogio() - inicio, ())
+                return resultado
+        instrumentada.__name__ = funcao.__name__
+        instrumentada.__doc__ = funcao.__doc__
+        instrumentada.__wrapped__ = funcao
+        return instrumentada
+    
+    def _medir(self, operacao: str, duracao: int, codigos):
+        with self._trava:
+            self.chamadas[operacao] += 1
+            self.latencias[operacao].registrar(duracao)
+            for codigo in codigos:
+                if codigo:
+                    chave = (operacao, codigo)
+                    self.rejeicoes[chave] = self.rejeicoes.get(chave, 0) + 1
+    
+    # ---- Consulta e exportação ----
+    
+    def resumo(self) -> dict:
+        """Chamadas e percentis de latência (ns) por operação executada"""
+        with self._trava:
+            return {
+                operacao: {
+                    'chamadas': self.chamadas[operacao],
+                    'p50': histograma.percentil(50),
+                    'p99': histograma.percentil(99),
+                    'p999': histograma.percentil(99.9),
+                    'maximo': histograma.maximo,
+                }
+                for operacao, histograma in self.latencias.items() if histograma.contagem
+            }
+    
+    def exportar_prometheus(self) -> str:
+        """Gera as métricas no formato de texto do Prometheus"""
+        prefixo = self.PREFIXO
+        linhas = [
+            f"# HELP {prefixo}_operacoes_total Chamadas das operações instrumentadas",
+            f"# TYPE {prefixo}_operacoes_total counter",
+        ]
+        with self._trava:
+            for operacao, quantidade in self.chamadas.items():
+                linhas.append(f'{prefixo}_operacoes_total{{operacao="{operacao}"}} {quantidade}')
+            
+            linhas.append(f"# HELP {prefixo}_rejeicoes_total Operações recusadas por motivo")
+            linhas.append(f"# TYPE {prefixo}_rejeicoes_total counter")
+            for (operacao, codigo), quantidade in sorted(self.rejeicoes.items()):
+                motivo = self.MOTIVOS.get(codigo, str(codigo))
+                linhas.append(f'{prefixo}_rejeicoes_total{{operacao="{operacao}",motivo="{motivo}"}} {quantidade}')
+            
+            linhas.append(f"# HELP {prefixo}_latencia_segundos Latência das operações instrumentadas")
+            linhas.append(f"# TYPE {prefixo}_latencia_segundos histogram")
+            for operacao, histograma in self.latencias.items():
+                rotulo = f'operacao="{operacao}"'
+                for expoente in self.EXPOENTES_EXPORTACAO:
+                    limite = 1 << expoente
+                    linhas.append(f'{prefixo}_latencia_segundos_bucket{{{rotulo},le="{limite / 1e9:.9g}"}} '
+                                  f'{histograma.acumulado_ate(limite)}')
+                linhas.append(f'{prefixo}_latencia_segundos_bucket{{{rotulo},le="+Inf"}} {histograma.contagem}')
+                linhas.append(f'{prefixo}_latencia_segundos_sum{{{rotulo}}} {histograma.soma / 1e9:.9g}')
+                linhas.append(f'{prefixo}_latencia_segundos_count{{{rotulo}}} {histograma.contagem}')
+        for fonte in self.fontes:
+            linhas.extend(fonte.linhas_prometheus(prefixo))
+        return '\n'.join(linhas) + '\n'
+    
+    def gravar(self, caminho: str):
+        """Grava as métricas em arquivo de forma atômica (para o coletor textfile do Prometheus)"""
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(self.exportar_prometheus())
+        os.replace(temporario, caminho)
+    
+    def gravar_periodicamente(self, caminho: str, intervalo: float = 15.0) -> threading.Thread:
+        """Regrava o arquivo de métricas a cada intervalo segundos enquanto estiverem ativas"""
+        def gravar():
+            while Metricas.ativa is self:
+                self.gravar(caminho)
+                time.sleep(intervalo)
+        thread = threading.Thread(target=gravar, daemon=True)
+        thread.start()
+        return thread
+    
+    async def servir_http(self, host: str = '127.0.0.1', porta: int = 9100):
+        """Inicia um endpoint HTTP mínimo que responde GET /metrics (retorna o asyncio.Server)"""
+        async def atender(leitor: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+            try:
+                requisicao = await leitor.readline()
+                while (await leitor.readline()).strip():
+                    pass  # Cabeçalhos da requisição são ignorados
+                partes = requisicao.split()
+                if len(partes) >= 2 and partes[0] == b'GET' and partes[1].split(b'?')[0] == b'/metrics':
+                    status, corpo = '200 OK', self.exportar_prometheus().encode('utf-8')
+                else:
+                    status, corpo = '404 Not Found', b'use GET /metrics\n'
+                escritor.write(
+                    f"HTTP/1.0 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                    f"Content-Length: {len(corpo)}\r\n\r\n".encode('ascii') + corpo)
+                await escritor.drain()
+            except ConnectionError:
+                pass
+            finally:
+                escritor.close()
+        return await asyncio.start_server(atender, host, porta)
+
+class JanelaDeslizante:
+    """Quantidade e valor dos movimentos dos últimos `janela` segundos, em baldes de tempo
+    
+    Os baldes expiram inteiros, então a janela efetiva pode se estender por até um
+    balde além do configurado; em troca, registrar e consultar custam O(1) amortizado.
+    """
+    __slots__ = ('janela', 'largura', 'quantidade', 'centavos', 'contas', '_baldes')
+    
+    def __init__(self, janela: float, baldes: int = 60, contar_contas: bool = False):
+        self.janela = janela
+        self.largura = janela / baldes
+        self.quantidade = 0
+        self.centavos = 0
+        self.contas = {} if contar_contas else None  # Número da conta -> instante do último movimento
+        self._baldes = deque()  # [índice do balde, quantidade, centavos], do mais antigo ao mais novo
+    
+    def _expirar(self, agora: float):
+        limite = agora - self.janela
+        baldes = self._baldes
+        while baldes and (baldes[0][0] + 1) * self.largura <= limite:
+            _, quantidade, centavos = baldes.popleft()
+            self.quantidade -= quantidade
+            self.centavos -= centavos
+    
+    def adicionar(self, agora: float, centavos: int, numero: int):
+        self._expirar(agora)
+        indice = int(agora // self.largura)
+        if self._baldes and self._baldes[-1][0] >= indice:
+            balde = self._baldes[-1]
+            balde[1] += 1
+            balde[2] += centavos
+        else:
+            self._baldes.append([indice, 1, centavos])
+        self.quantidade += 1
+        self.centavos += centavos
+        if self.contas is not None:
+            self.contas[numero] = agora
+    
+    def totais(self, agora: float) -> tuple:
+        """(quantidade, centavos) dentro da janela"""
+        self._expirar(agora)
+        return self.quantidade, self.centavos
+    
+    def vazia(self, agora: float) -> bool:
+        """Indica se todos os movimentos já saíram da janela"""
+        self._expirar(agora)
+        return not self._baldes
+    
+    def contas_distintas(self, agora: float) -> set:
+        """Números das contas com movimento dentro da janela"""
+        limite = agora - self.janela
+        for numero in [n for n, instante in self.contas.items() if instante <= limite]:
+            del self.contas[numero]
+        return self.contas.keys()
+
+class RegraVelocidade:
+    """Regra de velocidade avaliada antes de cada saque (ou transferência, se incluída em `tipos`)
+    
+    Bloqueia a operação que faria a janela ultrapassar maximo_quantidade movimentos,
+    maximo_valor reais ou, com escopo 'cliente', maximo_contas contas distintas do CPF.
+    """
+    ESCOPOS = ('conta', 'cliente')
+    TIPOS = {'saque': Saque, 'transferencia': Transferencia}
+    
+    def __init__(self, nome: str, janela_minutos: float, maximo_quantidade: int = None, maximo_valor=None,
+                 maximo_contas: int = None, escopo: str = 'conta', tipos=(Saque,)):
+        if escopo not in self.ESCOPOS:
+            raise ValueError(f"Escopo inválido: {escopo}")
+        if maximo_contas is not None and escopo != 'cliente':
+            raise ValueError("maximo_contas só se aplica ao escopo 'cliente'")
+        self.nome = nome
+        self.janela = janela_minutos * 60
+        self.maximo_quantidade = maximo_quantidade
+        self.maximo_centavos = Dinheiro.para_centavos(maximo_valor) if maximo_valor is not None else None
+        self.maximo_contas = maximo_contas
+        self.escopo = escopo
+        self.tipos = tuple(self.TIPOS[tipo] if isinstance(tipo, str) else tipo for tipo in tipos)
+    
+    @classmethod
+    def de_dicionario(cls, dados: dict) -> 'RegraVelocidade':
+        """Cria a regra a partir da configuração, por exemplo lida de um arquivo JSON"""
+        return cls(**dados)
+    
+    def chave(self, conta):
+        """Identifica a janela da regra: número da conta ou CPF do cliente"""
+        return conta.cliente.cpf if self.escopo == 'cliente' else conta.numero
+    
+    def nova_janela(self) -> JanelaDeslizante:
+        return JanelaDeslizante(self.janela, contar_contas=self.maximo_contas is not None)
+    
+    def violada(self, janela: JanelaDeslizante, numero: int, centavos: int, agora: float) -> bool:
+        """Indica se um novo movimento de `centavos` na conta `numero` ultrapassaria a regra
+        
+        janela None equivale a uma janela sem movimentos.
+        """
+        quantidade, total = janela.totais(agora) if janela is not None else (0, 0)
+        if self.maximo_quantidade is not None and quantidade + 1 > self.maximo_quantidade:
+            return True
+        if self.maximo_centavos is not None and total + centavos > self.maximo_centavos:
+            return True
+        if self.maximo_contas is not None:
+            contas = janela.contas_distintas(agora) if janela is not None else ()
+            if numero not in contas and len(contas) + 1 > self.maximo_contas:
+                return True
+        return False
+
+class MotorFraude(ObservadorBanco):
+    """Avalia regras de velocidade a cada saque, com janelas por conta e por cliente
+    
+    instalar() faz Conta.verificar_saque (e verificar_transferencia, para as regras que
+    incluem transferências) consultar o motor, que passa a recusar com
+    CodigoResultado.BLOQUEIO_FRAUDE. A consulta não altera as janelas: o movimento só é
+    contabilizado depois de efetivado, quando a conta notifica conta_movimentada.
+    Como consulta e registro acontecem com a trava da conta, as regras por conta são
+    exatas; nas regras por cliente, saques simultâneos em contas diferentes do mesmo CPF
+    podem ser aprovados juntos.
+    
+    As janelas ficam em FATIAS dicionários com travas próprias, escolhidos pela chave, e
+    as que passam uma janela inteira sem movimentos são descartadas. O tempo de avaliação
+    de cada regra é medido por amostragem (uma a cada AMOSTRAGEM avaliações).
+    """
+    AMOSTRAGEM = 8  # Potência de dois
+    FATIAS = 64  # Potência de dois
+    
+    def __init__(self, regras=()):
+        self.regras = []
+        self.tempos = {}  # Nome da regra -> HistogramaLatencia das avaliações amostradas
+        self.bloqueios = {}  # Nome da regra -> operações bloqueadas
+        # Por regra, uma lista de FATIAS OrderedDict (chave do escopo -> JanelaDeslizante)
+        # do movimento menos recente para o mais recente
+        self._janelas = []
+        self._travas = [threading.Lock() for _ in range(self.FATIAS)]
+        self._avaliacoes = count(1)
+        self._trava = threading.Lock()  # Regras e estatísticas
+        for regra in regras:
+            self.adicionar_regra(regra)
+    
+    @classmethod
+    def de_arquivo(cls, caminho: str) -> 'MotorFraude':
+        """Carrega as regras de um arquivo JSON com uma lista de objetos (argumentos de RegraVelocidade)"""
+        with open(caminho, encoding='utf-8') as arquivo:
+            return cls(RegraVelocidade.de_dicionario(dados) for dados in json.load(arquivo))
+    
+    def adicionar_regra(self, regra: RegraVelocidade):
+        with self._trava:
+            if regra.nome in self.tempos:
+                raise ValueError(f"Já existe uma regra chamada {regra.nome}")
+            self.tempos[regra.nome] = HistogramaLatencia()
+            self.bloqueios[regra.nome] = 0
+            # Listas novas: bloquear() e registrar() as percorrem sem adquirir a trava
+            self._janelas = self._janelas + [[OrderedDict() for _ in range(self.FATIAS)]]
+            self.regras = self.regras + [regra]
+    
+    def instalar(self):
+        """Passa a avaliar as regras nos saques de todas as contas"""
+        Conta.motor_fraude = self
+    
+    def desinstalar(self):
+        if Conta.motor_fraude is self:
+            Conta.motor_fraude = None
+    
+    def bloquear(self, conta, centavos: int, tipo=Saque):
+        """Retorna o nome da primeira regra que o movimento violaria, ou None (sem alterar as janelas)"""
+        agora = time.time()
+        numero = conta.numero
+        medir = not next(self._avaliacoes) & (self.AMOSTRAGEM - 1)
+        for regra, fatias in zip(self.regras, self._janelas):
+            if tipo not in regra.tipos:
+                continue
+            chave = regra.chave(conta)
+            fatia = hash(chave) & (self.FATIAS - 1)
+            with self._travas[fatia]:
+                janela = fatias[fatia].get(chave)
+                if medir:
+                    inicio = time.perf_counter_ns()
+                    violada = regra.violada(janela, numero, centavos, agora)
+                    duracao = time.perf_counter_ns() - inicio
+                else:
+                    violada = regra.violada(janela, numero, centavos, agora)
+            if medir or violada:
+                with self._trava:
+                    if medir:
+                        self.tempos[regra.nome].registrar(duracao)
+                    if violada:
+                        self.bloqueios[regra.nome] += 1
+            if violada:
+                return regra.nome
+        return None
+    
+    def registrar(self, conta, centavos: int, tipo=Saque):
+        """Contabiliza um movimento efetivado nas janelas das regras que se aplicam a ele"""
+        agora = time.time()
+        numero = conta.numero
+        for regra, fatias in zip(self.regras, self._janelas):
+            if tipo not in regra.tipos:
+                continue
+            chave = regra.chave(conta)
+            fatia = hash(chave) & (self.FATIAS - 1)
+            with self._travas[fatia]:
+                janelas = fatias[fatia]
+                janela = janelas.get(chave)
+                if janela is None:
+                    janela = janelas[chave] = regra.nova_janela()
+                else:
+                    janelas.move_to_end(chave)
+                janela.adicionar(agora, centavos, numero)
+                # As janelas menos recentes ficam no início: descarta as que esvaziaram
+                for antiga in list(islice(janelas, 2)):
+                    if antiga == chave or not janelas[antiga].vazia(agora):
+                        break
+                    del janelas[antiga]
+    
+    def conta_movimentada(self, conta, transacao: Transacao, saldo_anterior: int):
+        tipo = type(transacao)
+        if tipo is Saque or (tipo is Transferencia and conta.numero == transacao.origem):
+            self.registrar(conta, transacao.centavos, tipo)
+    
+    def estatisticas(self) -> dict:
+        """Avaliações, bloqueios e percentis do tempo de avaliação (ns) de cada regra"""
+        with self._trava:
+            return {
+                regra.nome: {
+                    'avaliacoes_medidas': self.tempos[regra.nome].contagem,
+                    'bloqueios': self.bloqueios[regra.nome],
+                    'janelas': sum(len(janelas) for janelas in fatias),
+                    'p50_ns': self.tempos[regra.nome].percentil(50),
+                    'p99_ns': self.tempos[regra.nome].percentil(99),
+                }
+                for regra, fatias in zip(self.regras, self._janelas)
+            }
+    
+    def linhas_prometheus(self, prefixo: str) -> list:
+        """Linhas das regras para Metricas.exportar_prometheus"""
+        linhas = [
+            f"# HELP {prefixo}_fraude_bloqueios_total Operações bloqueadas por regra de velocidade",
+            f"# TYPE {prefixo}_fraude_bloqueios_total counter",
+        ]
+        estatisticas = self.estatisticas()
+        for nome, dados in estatisticas.items():
+            linhas.append(f'{prefixo}_fraude_bloqueios_total{{regra="{nome}"}} {dados["bloqueios"]}')
+        linhas.append(f"# HELP {prefixo}_fraude_avaliacao_segundos Tempo de avaliação de cada regra")
+        linhas.append(f"# TYPE {prefixo}_fraude_avaliacao_segundos summary")
+        for nome, dados in estatisticas.items():
+            for quantil, chave in (('0.5', 'p50_ns'), ('0.99', 'p99_ns')):
+                linhas.append(f'{prefixo}_fraude_avaliacao_segundos{{regra="{nome}",quantile="{quantil}"}} '
+                              f'{dados[chave] / 1e9:.9g}')
+            linhas.append(f'{prefixo}_fraude_avaliacao_segundos_sum{{regra="{nome}"}} '
+                          f'{self.tempos[nome].soma / 1e9:.9g}')
+            linhas.append(f'{prefixo}_fraude_avaliacao_segundos_count{{regra="{nome}"}} {dados["avaliacoes_medidas"]}')
+        return linhas
+
+class Persistencia(ObservadorBanco):
+    """Log de escrita antecipada (WAL) com snapshots periódicos do estado do CaixaEletronico
+    
+    Cada registro do log tem o formato: tamanho (4 bytes), CRC32 (4 bytes), sequência
+    (8 bytes), tipo da operação (1 byte) e os dados da operação. A recuperação carrega o
+    snapshot mais recente e reaplica os registros do log com sequência posterior a ele.
+    
+    O snapshot não para o banco: o log é trocado por um novo na sequência de corte e cada
+    conta é copiada com a sua própria trava, junto com a sequência do último registro
+    aplicado a ela. Na recuperação, um movimento só é reaplicado nas contas cujo estado
+    gravado ainda não o inclui.
+    """
+    
+    OP_CLIENTE = 1
+    OP_CONTA = 2
+    OP_DEPOSITO = 3
+    OP_SAQUE = 4
+    OP_TRANSFERENCIA = 5
+    
+    CABECALHO = struct.Struct('<IIQB')
+    MOVIMENTO = struct.Struct('<qqq')  # número da conta, centavos, instante em microssegundos
+    CONTA = struct.Struct('<qBqi')  # número, tipo da conta, limite em centavos, limite de saques
+    TRANSFERENCIA = struct.Struct('<qqqq')  # origem, destino, centavos, instante em microssegundos
+    CLASSES_CONTA = (Conta, ContaCorrente)
+    
+    def __init__(self, caixa: 'CaixaEletronico', diretorio: str, fsync_em_lote: bool = True,
+                 tamanho_lote: int = 512, intervalo_commit: float = 0.005,
+                 intervalo_snapshot: int = 100_000):
+        if caixa.cache is not None:
+            # O snapshot copia caixa.contas, que com cache só tem os clientes em memória
+            raise ValueError("Persistencia não pode ser usada com um caixa que usa CacheContas")
+        self.caixa = caixa
+        self.diretorio = diretorio
+        self.caminho_log = os.path.join(diretorio, 'wal.log')
+        # Log anterior ao snapshot em andamento, apagado quando o snapshot fica gravado
+        self.caminho_log_anterior = os.path.join(diretorio, 'wal.anterior.log')
+        self.caminho_snapshot = os.path.join(diretorio, 'snapshot.bin')
+        self.fsync_em_lote = fsync_em_lote
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_commit = intervalo_commit
+        self.intervalo_snapshot = intervalo_snapshot
+        
+        self._sequencia = 0
+        # Número da conta -> sequência do último registro aplicado a ela (alterado com a trava da conta)
+        self._sequencias_contas = {}
+        self._pendentes = 0  # Registros escritos e ainda não sincronizados com o disco
+        self._desde_snapshot = 0
+        self._trava = threading.Lock()
+        self._trava_snapshot = threading.Lock()
+        self._log = None
+        self._sincronizador = None
+        self._ativo = False
+    
+    # ---- Recuperação ----
+    
+    def recuperar(self) -> int:
+        """Carrega o snapshot, reaplica o log e passa a registrar as novas operações
+        
+        Retorna a quantidade de registros do log reaplicados.
+        """
+        os.makedirs(self.diretorio, exist_ok=True)
+        self._carregar_snapshot()
+        reaplicados, _ = self._reaplicar_log(self.caminho_log_anterior)
+        reaplicados_log, tamanho_valido = self._reaplicar_log(self.caminho_log)
+        reaplicados += reaplicados_log
+        
+        self._log = open(self.caminho_log, 'ab')
+        # Descarta um eventual registro incompleto no fim do log (escrita interrompida)
+        self._log.truncate(tamanho_valido)
+        if os.path.exists(self.caminho_log_anterior):
+            # Snapshot interrompido: o estado recuperado já inclui os dois logs
+            self._gravar_snapshot(self._sequencia, Conta.contador_contas,
+                                  self._copiar_clientes(), self._copiar_contas(list(self.caixa.contas.values())))
+            self._log.truncate(0)
+            os.fsync(self._log.fileno())
+            os.remove(self.caminho_log_anterior)
+        self._ativo = True
+        self.caixa.registrar_observador(self)
+        self._sincronizador = threading.Thread(target=self._sincronizar_periodicamente, daemon=True)
+        self._sincronizador.start()
+        return reaplicados
+    
+    def _carregar_snapshot(self):
+        if not os.path.exists(self.caminho_snapshot):
+            return
+        with open(self.caminho_snapshot, 'rb') as arquivo:
+            estado = pickle.load(arquivo)
+        
+        self._sequencia = estado['sequencia']
+        self._sequencias_contas = estado['sequencias_contas']
+        Conta.contador_contas = estado['contador_contas']
+        for cpf, nome, endereco, nascimento in estado['clientes']:
+            self.caixa.clientes[cpf] = PessoaFisica(endereco, cpf, nome, self._data(nascimento))
+        classes = HistoricoColunar.TIPOS
+        for (numero, tipo, agencia, cpf, limite, limite_saques, saldo,
+             tipos, valores, instantes, transferencias) in estado['contas']:
+            conta = self._criar_conta(numero, tipo, agencia, cpf, limite, limite_saques)
+            conta._saldo = saldo
+            for indice, (codigo, centavos, instante) in enumerate(zip(tipos, valores, instantes)):
+                data = datetime.fromtimestamp(instante / 1_000_000)
+                classe = classes[codigo]
+                if classe is Consulta:
+                    transacao = Consulta(data)
+                elif classe is Transferencia:
+                    transacao = Transferencia.entre(centavos, *transferencias[indice], data)
+                else:
+                    transacao = classe.de_centavos(centavos, data)
+                conta.historico.adicionar_transacao(transacao)
+    
+    def _reaplicar_log(self, caminho: str):
+        """Reaplica os registros válidos de um arquivo de log e retorna (quantidade, bytes válidos)"""
+        if not os.path.exists(caminho):
+            return 0, 0
+        with open(caminho, 'rb') as arquivo:
+            dados = arquivo.read()
+        
+        posicao = 0
+        reaplicados = 0
+        cabecalho = self.CABECALHO
+        while posicao + cabecalho.size <= len(dados):
+            tamanho, crc, sequencia, operacao = cabecalho.unpack_from(dados, posicao)
+            inicio = posicao + cabecalho.size
+            corpo = dados[inicio:inicio + tamanho]
+            if len(corpo) < tamanho or zlib.crc32(corpo, sequencia & 0xFFFFFFFF) != crc:
+                break
+            if sequencia > self._sequencia:
+                self._aplicar(sequencia, operacao, corpo)
+                reaplicados += 1
+            posicao = inicio + tamanho
+        return reaplicados, posicao
+    
+    def _aplicar(self, sequencia: int, operacao: int, corpo: bytes):
+        """Reaplica uma operação registrada no log, sem passar pelas regras de limite
+        
+        Registros que o snapshot já inclui (cadastros existentes e movimentos com
+        sequência até a da conta) são ignorados.
+        """
+        sequencias = self._sequencias_contas
+        if operacao in (self.OP_DEPOSITO, self.OP_SAQUE):
+            numero, centavos, instante = self.MOVIMENTO.unpack(corpo)
+            if sequencia > sequencias.get(numero, 0):
+                conta = self.caixa.contas[numero]
+                data = datetime.fromtimestamp(instante / 1_000_000)
+                if operacao == self.OP_DEPOSITO:
+                    conta._saldo += centavos
+                    conta.historico.adicionar_transacao(Deposito.de_centavos(centavos, data))
+                else:
+                    conta._saldo -= centavos
+                    conta.historico.adicionar_transacao(Saque.de_centavos(centavos, data))
+                sequencias[numero] = sequencia
+        elif operacao == self.OP_TRANSFERENCIA:
+            origem, destino, centavos, instante = self.TRANSFERENCIA.unpack(corpo)
+            transacao = Transferencia.entre(centavos, origem, destino, datetime.fromtimestamp(instante / 1_000_000))
+            for numero, sinal in ((origem, -1), (destino, 1)):
+                if sequencia > sequencias.get(numero, 0):
+                    conta = self.caixa.contas[numero]
+                    conta._saldo += sinal * centavos
+                    conta.historico.adicionar_transacao(transacao)
+                    sequencias[numero] = sequencia
+        elif operacao == self.OP_CONTA:
+            numero, tipo, limite, limite_saques = self.CONTA.unpack_from(corpo)
+            agencia, cpf = self._ler_textos(corpo, self.CONTA.size, 2)
+            if numero not in self.caixa.contas:
+                self._criar_conta(numero, tipo, agencia, cpf, limite, limite_saques)
+            Conta.contador_contas = max(Conta.contador_contas, numero + 1)
+        elif operacao == self.OP_CLIENTE:
+            (nascimento,) = struct.unpack_from('<i', corpo)
+            cpf, nome, endereco = self._ler_textos(corpo, 4, 3)
+            if cpf not in self.caixa.clientes:
+                self.caixa.clientes[cpf] = PessoaFisica(endereco, cpf, nome, self._data(nascimento))
+        self._sequencia = sequencia
+    
+    def _criar_conta(self, numero, tipo, agencia, cpf, limite, limite_saques) -> Conta:
+        cliente = self.caixa.clientes[cpf]
+        if self.CLASSES_CONTA[tipo] is ContaCorrente:
+            conta = ContaCorrente(cliente, numero, agencia, Dinheiro.para_reais(limite), limite_saques)
+        else:
+            conta = Conta(cliente, numero, agencia)
+        conta.caixa = self.caixa
+        self.caixa.contas[numero] = conta
+        return conta
+    
+    @staticmethod
+    def _data(ordinal: int):
+        return date.fromordinal(ordinal) if ordinal else None
+    
+    @staticmethod
+    def _textos(*textos: str) -> bytes:
+        partes = []
+        for texto in textos:
+            codificado = texto.encode('utf-8')
+            partes.append(struct.pack('<H', len(codificado)))
+            partes.append(codificado)
+        return b''.join(partes)
+    
+    @staticmethod
+    def _ler_textos(corpo: bytes, posicao: int, quantidade: int) -> list:
+        textos = []
+        for _ in range(quantidade):
+            (tamanho,) = struct.unpack_from('<H', corpo, posicao)
+            posicao += 2
+            textos.append(corpo[posicao:posicao + tamanho].decode('utf-8'))
+            posicao += tamanho
+        return textos
+    
+    # ---- Registro das operações ----
+    
+    def cliente_criado(self, cliente):
+        nascimento = cliente.data_nascimento.toordinal() if cliente.data_nascimento else 0
+        corpo = struct.pack('<i', nascimento) + self._textos(cliente.cpf, cliente.nome, cliente.endereco)
+        self._anexar(self.OP_CLIENTE, corpo)
+    
+    def conta_criada(self, conta):
+        if isinstance(conta, ContaCorrente):
+            corpo = self.CONTA.pack(conta.numero, 1, conta.limite_centavos, conta.limite_saques)
+        else:
+            corpo = self.CONTA.pack(conta.numero, 0, 0, 0)
+        self._anexar(self.OP_CONTA, corpo + self._textos(conta.agencia, conta.cliente.cpf))
+    
+    def conta_movimentada(self, conta, transacao: Transacao, saldo_anterior: int):
+        # Chamado com a trava da conta (nas transferências, das duas contas) adquirida
+        if isinstance(transacao, Deposito):
+            operacao = self.OP_DEPOSITO
+        elif isinstance(transacao, Saque):
+            operacao = self.OP_SAQUE
+        elif isinstance(transacao, Transferencia):
+            # Um único registro cobre as duas contas: grava apenas na notificação da origem
+            if conta.numero == transacao.origem:
+                sequencia = self._anexar(self.OP_TRANSFERENCIA, self.TRANSFERENCIA.pack(
+                    transacao.origem, transacao.destino, transacao.centavos,
+                    Historico.instante(transacao.data)))
+                self._sequencias_contas[transacao.origem] = sequencia
+                self._sequencias_contas[transacao.destino] = sequencia
+            return
+        else:
+            return
+        instante = Historico.instante(transacao.data)
+        self._sequencias_contas[conta.numero] = self._anexar(
+            operacao, self.MOVIMENTO.pack(conta.numero, transacao.centavos, instante))
+    
+    def _anexar(self, operacao: int, corpo: bytes) -> int:
+        """Escreve um registro no log e retorna a sua sequência"""
+        with self._trava:
+            self._sequencia += 1
+            sequencia = self._sequencia
+            crc = zlib.crc32(corpo, sequencia & 0xFFFFFFFF)
+            self._log.write(self.CABECALHO.pack(len(corpo), crc, sequencia, operacao))
+            self._log.write(corpo)
+            self._pendentes += 1
+            if not self.fsync_em_lote or self._pendentes >= self.tamanho_lote:
+                self._sincronizar()
+            # O snapshot periódico fica a cargo de uma thread própria: aqui a operação
+            # ainda segura a trava da sua conta
+            self._desde_snapshot += 1
+            return sequencia
+    
+    def _sincronizar(self):
+        """Grava em disco os registros pendentes (deve ser chamado com a trava adquirida)"""
+        if self._pendentes:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._pendentes = 0
+    
+    def _sincronizar_periodicamente(self):
+        """Commit em grupo a cada intervalo_commit segundos; dispara o snapshot periódico em outra thread"""
+        while self._ativo:
+            time.sleep(self.intervalo_commit)
+            with self._trava:
+                if not self._ativo:
+                    break
+                if self.fsync_em_lote:
+                    self._sincronizar()
+                pendente = self._desde_snapshot >= self.intervalo_snapshot
+            if pendente and not self._trava_snapshot.locked():
+                threading.Thread(target=self._snapshot_em_fundo, daemon=True).start()
+    
+    def _snapshot_em_fundo(self):
+        try:
+            self.snapshot()
+        except Exception as e:
+            # O log continua íntegro: o próximo snapshot tenta de novo
+            print(f"Erro ao gravar o snapshot: {e}", file=sys.stderr)
+    
+    def sincronizar(self):
+        """Força a gravação em disco dos registros pendentes"""
+        with self._trava:
+            self._sincronizar()
+    
+    # ---- Snapshot ----
+    
+    def snapshot(self):
+        """Grava um snapshot do estado atual e descarta o log anterior a ele
+        
+        Sob a trava do log, o log atual é sincronizado e trocado por um novo: todo registro
+        do log antigo já foi aplicado às contas. Em seguida, cada conta é copiada com a
+        própria trava, sem impedir as operações nas demais.
+        """
+        with self._trava_snapshot:
+            with self._trava:
+                if not self._ativo:
+                    return
+                self._sincronizar()
+                self._log.close()
+                os.replace(self.caminho_log, self.caminho_log_anterior)
+                self._log = open(self.caminho_log, 'ab')
+                sequencia = self._sequencia
+                contador_contas = Conta.contador_contas
+                self._desde_snapshot = 0
+            # Contas antes dos clientes: o titular de toda conta copiada já está cadastrado.
+            # Cadastros posteriores ao corte estão no log novo e são reaplicados sem duplicar
+            contas = self._copiar_contas(list(self.caixa.contas.values()))
+            self._gravar_snapshot(sequencia, contador_contas, self._copiar_clientes(), contas)
+            os.remove(self.caminho_log_anterior)
+    
+    def _copiar_clientes(self) -> list:
+        return [
+            (c.cpf, c.nome, c.endereco, c.data_nascimento.toordinal() if c.data_nascimento else 0)
+            for c in list(self.caixa.clientes.values())
+        ]
+    
+    def _copiar_contas(self, contas: list) -> list:
+        """Copia cada conta com a sua trava e a sequência do último registro aplicado a ela"""
+        copias = []
+        codigos = HistoricoColunar.CODIGOS
+        for conta in contas:
+            tipos, valores, instantes = array('b'), array('q'), array('q')
+            transferencias = {}
+            with conta._trava:
+                for indice, transacao in enumerate(conta.historico.transacoes):
+                    if type(transacao) is Transferencia:
+                        transferencias[indice] = (transacao.origem, transacao.destino)
+                    tipos.append(codigos[type(transacao)])
+                    valores.append(transacao.centavos)
+                    instantes.append(Historico.instante(transacao.data))
+                saldo = conta._saldo
+                sequencia = self._sequencias_contas.get(conta.numero, 0)
+            corrente = isinstance(conta, ContaCorrente)
+            copias.append((sequencia, (
+                conta.numero, int(corrente), conta.agencia, conta.cliente.cpf,
+                conta.limite_centavos if corrente else 0, conta.limite_saques if corrente else 0,
+                saldo, tipos, valores, instantes, transferencias,
+            )))
+        return copias
+    
+    def _gravar_snapshot(self, sequencia: int, contador_contas: int, clientes: list, contas: list):
+        estado = {
+            'sequencia': sequencia,
+            'contador_contas': contador_contas,
+            'clientes': clientes,
+            'contas': [dados for _, dados in contas],
+            'sequencias_contas': {dados[0]: sequencia_conta for sequencia_conta, dados in contas if sequencia_conta},
+        }
+        temporario = self.caminho_snapshot + '.tmp'
+        with open(temporario, 'wb') as arquivo:
+            pickle.dump(estado, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, self.caminho_snapshot)
+    
+    def fechar(self):
+        """Sincroniza o log pendente e deixa de registrar as operações"""
+        self.caixa.remover_observador(self)
+        with self._trava_snapshot, self._trava:
+            self._ativo = False
+            self._sincronizar()
+            self._log.close()
+
+class ArmazemContas(ABC):
+    """Interface para o armazenamento persistente de clientes e contas usado pelo CacheContas"""
+    
+    @abstractmethod
+    def carregar_cliente(self, cpf: str):
+        """Retorna o PessoaFisica com suas contas (históricos vazios), ou None"""
+    
+    @abstractmethod
+    def carregar_historico(self, numero: int, historico: Historico):
+        """Acrescenta ao histórico as transações gravadas da conta, em ordem"""
+    
+    @abstractmethod
+    def cpf_da_conta(self, numero: int):
+        """Retorna o CPF do titular da conta, ou None"""
+    
+    @abstractmethod
+    def salvar_cliente(self, cliente):
+        """Grava os dados cadastrais do cliente"""
+    
+    @abstractmethod
+    def salvar_conta(self, conta):
+        """Grava os dados cadastrais e o saldo de uma conta nova"""
+    
+    @abstractmethod
+    def gravar_movimentos(self, movimentos: list):
+        """Grava de uma vez uma lista de (número da conta, saldo em centavos, transações novas)"""
+    
+    @abstractmethod
+    def proximo_numero(self) -> int:
+        """Primeiro número de conta ainda não usado no armazém"""
+    
+    @abstractmethod
+    def numeros_contas(self) -> list:
+        """Números de todas as contas do armazém, em ordem crescente"""
+    
+    @abstractmethod
+    def nomes_clientes(self):
+        """Percorre (CPF, nome) de todos os clientes, sem carregá-los"""
+    
+    @abstractmethod
+    def resumo_contas(self):
+        """Percorre (número, agência, saldo em centavos gravado) de todas as contas, sem carregá-las"""
+    
+    @abstractmethod
+    def agregados_contas(self, primeiro: int, ultimo: int) -> dict:
+        """{número: (agência, AgregadosTransacoes)} das transações gravadas das contas com
+        primeiro <= número <= ultimo (contas sem transações inclusive)"""
+    
+    def fechar(self):
+        pass
+
+class ArmazemSQLite(ArmazemContas):
+    """ArmazemContas em um arquivo SQLite local"""
+    CLASSES_CONTA = (Conta, ContaCorrente)
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS clientes (
+            cpf TEXT PRIMARY KEY, nome TEXT NOT NULL, endereco TEXT NOT NULL, nascimento INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS contas (
+            numero INTEGER PRIMARY KEY, cpf TEXT NOT NULL REFERENCES clientes (cpf),
+            tipo INTEGER NOT NULL, agencia TEXT NOT NULL, limite INTEGER NOT NULL,
+            limite_saques INTEGER NOT NULL, saldo INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS contas_cpf ON contas (cpf);
+        CREATE TABLE IF NOT EXISTS transacoes (
+            numero INTEGER NOT NULL, tipo INTEGER NOT NULL, centavos INTEGER NOT NULL,
+            instante INTEGER NOT NULL, origem INTEGER NOT NULL, destino INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS transacoes_numero ON transacoes (numero);
+    """
+    
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._trava = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.execute('PRAGMA journal_mode=WAL')
+        self._conexao.execute('PRAGMA synchronous=NORMAL')
+        with self._conexao:
+            self._conexao.executescript(self.ESQUEMA)
+    
+    def carregar_cliente(self, cpf: str):
+        with self._trava:
+            linha = self._conexao.execute(
+                "SELECT nome, endereco, nascimento FROM clientes WHERE cpf = ?", (cpf,)).fetchone()
+            if linha is None:
+                return None
+            nome, endereco, nascimento = linha
+            cliente = PessoaFisica(endereco, cpf, nome, date.fromordinal(nascimento) if nascimento else None)
+            contas = self._conexao.execute(
+                "SELECT numero, tipo, agencia, limite, limite_saques, saldo FROM contas WHERE cpf = ? ORDER BY numero",
+                (cpf,)).fetchall()
+            for numero, tipo, agencia, limite, limite_saques, saldo in contas:
+                if self.CLASSES_CONTA[tipo] is ContaCorrente:
+                    conta = ContaCorrente(cliente, numero, agencia, Dinheiro.para_reais(limite), limite_saques)
+                else:
+                    conta = Conta(cliente, numero, agencia)
+                conta._saldo = saldo
+            return cliente
+    
+    def carregar_historico(self, numero: int, historico: Historico):
+        with self._trava:
+            registros = self._conexao.execute(
+                "SELECT tipo, centavos, instante, origem, destino FROM transacoes WHERE numero = ? ORDER BY rowid",
+                (numero,)).fetchall()
+        montar = HistoricoEscalonado._montar
+        for registro in registros:
+            historico.adicionar_transacao(montar(registro))
+    
+    def cpf_da_conta(self, numero: int):
+        with self._trava:
+            linha = self._conexao.execute("SELECT cpf FROM contas WHERE numero = ?", (numero,)).fetchone()
+        return linha[0] if linha else None
+    
+    def salvar_cliente(self, cliente):
+        nascimento = cliente.data_nascimento.toordinal() if cliente.data_nascimento else 0
+        with self._trava, self._conexao:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO clientes (cpf, nome, endereco, nascimento) VALUES (?, ?, ?, ?)",
+                (cliente.cpf, cliente.nome, cliente.endereco, nascimento))
+    
+    def salvar_conta(self, conta):
+        corrente = isinstance(conta, ContaCorrente)
+        with self._trava, self._conexao:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO contas (numero, cpf, tipo, agencia, limite, limite_saques, saldo) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (conta.numero, conta.cliente.cpf, int(corrente), conta.agencia,
+                 conta.limite_centavos if corrente else 0, conta.limite_saques if corrente else 0, conta._saldo))
+    
+    def gravar_movimentos(self, movimentos: list):
+        codigos = HistoricoColunar.CODIGOS
+        linhas = []
+        saldos = []
+        for numero, saldo, transacoes in movimentos:
+            saldos.append((saldo, numero))
+            for transacao in transacoes:
+                tipo = type(transacao)
+                origem, destino = (transacao.origem, transacao.destino) if tipo is Transferencia else (0, 0)
+                linhas.append((numero, codigos[tipo], transacao.centavos,
+                               Historico.instante(transacao.data), origem, destino))
+        with self._trava, self._conexao:
+            self._conexao.executemany(
+                "INSERT INTO transacoes (numero, tipo, centavos, instante, origem, destino) VALUES (?, ?, ?, ?, ?, ?)",
+                linhas)
+            self._conexao.executemany("UPDATE contas SET saldo = ? WHERE numero = ?", saldos)
+    
+    def proximo_numero(self) -> int:
+        with self._trava:
+            (maior,) = self._conexao.execute("SELECT COALESCE(MAX(numero), 0) FROM contas").fetchone()
+        return maior + 1
+    
+    def numeros_contas(self) -> list:
+        with self._trava:
+            return [numero for (numero,) in self._conexao.execute("SELECT numero FROM contas ORDER BY numero")]
+    
+    def nomes_clientes(self):
+        with self._trava:
+            return self._conexao.execute("SELECT cpf, nome FROM clientes").fetchall()
+    
+    def resumo_contas(self):
+        with self._trava:
+            return self._conexao.execute("SELECT numero, agencia, saldo FROM contas").fetchall()
+    
+    def agregados_contas(self, primeiro: int, ultimo: int) -> dict:
+        # Agrupa no próprio SQLite por conta, tipo, sentido e dia (no fuso local, como transacao.data.date())
+        with self._trava:
+            linhas = self._conexao.execute(
+                "SELECT c.numero, c.agencia, t.tipo, t.origem = c.numero,"
+                " date(t.instante / 1000000, 'unixepoch', 'localtime'), COUNT(t.numero), SUM(t.centavos)"
+                " FROM contas c LEFT JOIN transacoes t ON t.numero = c.numero"
+                " WHERE c.numero BETWEEN ? AND ? GROUP BY 1, 3, 4, 5",
+                (primeiro, ultimo)).fetchall()
+        tipos = HistoricoColunar.TIPOS
+        resultado = {}
+        for numero, agencia, codigo, enviada, dia, quantidade, centavos in linhas:
+            if numero not in resultado:
+                resultado[numero] = (agencia, AgregadosTransacoes())
+            if codigo is None:
+                continue  # Conta sem transações
+            chave = tipos[codigo]
+            if chave is Transferencia:
+                chave = AgregadosTransacoes.ENVIADA if enviada else AgregadosTransacoes.RECEBIDA
+            resultado[numero][1].adicionar(chave, date.fromisoformat(dia), centavos, quantidade)
+        return resultado
+    
+    def fechar(self):
+        with self._trava:
+            self._conexao.close()
+
+class CacheContas(ObservadorBanco):
+    """Cache LRU de clientes (com suas contas) na frente de um ArmazemContas
+    
+    No máximo `capacidade` clientes ficam em memória; os demais são carregados do
+    armazém sob demanda, e o histórico de cada conta só no primeiro acesso a ele.
+    Saldos e transações novos ficam pendentes em memória e são gravados de volta
+    quando o cliente sai do cache, a cada `intervalo_sincronizacao` segundos, em
+    sincronizar() e em fechar(). Clientes com sessão ativa (fixar/liberar) nunca são removidos.
+    
+    Um cliente removido que ainda esteja em uso (alguém guarda a conta) volta para o
+    cache em vez de ser recarregado do armazém: nunca há dois objetos vivos para a
+    mesma conta, e um movimento na cópia antiga não sobrescreve o da nova.
+    
+    Ordem das travas: conta -> cache -> armazém.
+    """
+    TAMANHO_SINCRONIZACAO = 256  # Contas travadas e gravadas por transação em sincronizar()
+    
+    def __init__(self, armazem: ArmazemContas, capacidade: int = 10_000,
+                 intervalo_sincronizacao: float = 5.0):
+        self.armazem = armazem
+        self.capacidade = capacidade
+        self._clientes = OrderedDict()  # CPF -> cliente, do uso menos recente para o mais recente
+        self._contas = {}  # Número -> conta dos clientes em cache
+        # Conta -> transações do histórico já gravadas no armazém; a entrada acompanha
+        # o objeto da conta, inclusive depois que ele sai do cache
+        self._persistidas = weakref.WeakKeyDictionary()
+        self._removidos = weakref.WeakValueDictionary()  # CPF -> cliente fora do cache ainda em uso
+        self._sujas = set()  # Números das contas com movimentos ainda não gravados
+        self._fixados = {}  # CPF -> quantidade de sessões ativas
+        self._trava = threading.RLock()
+        self.acertos = 0
+        self.faltas = 0
+        self.remocoes = 0
+        self.gravacoes = 0
+        self.caixa = None  # Definido por vincular()
+        self._parar = threading.Event()
+        self._sincronizador = None
+        if intervalo_sincronizacao:
+            self._sincronizador = threading.Thread(
+                target=self._sincronizar_periodicamente, args=(intervalo_sincronizacao,), daemon=True)
+            self._sincronizador.start()
+    
+    def vincular(self, caixa: 'CaixaEletronico'):
+        """Associa o cache ao caixa que o usa (chamado por CaixaEletronico)"""
+        self.caixa = caixa
+        caixa.registrar_observador(self)
+    
+    # ---- Consulta ----
+    
+    def obter_cliente(self, cpf: str):
+        """Retorna o cliente do cache ou do armazém (None se não existir)"""
+        with self._trava:
+            cliente = self._clientes.get(cpf)
+            if cliente is not None:
+                self._clientes.move_to_end(cpf)
+                self.acertos += 1
+                return cliente
+            cliente = self._removidos.pop(cpf, None)
+            if cliente is not None:
+                self.acertos += 1
+                self._guardar(cliente)
+                return cliente
+            self.faltas += 1
+            cliente = self.armazem.carregar_cliente(cpf)
+            if cliente is not None:
+                for conta in cliente.contas:
+                    self._persistidas[conta] = 0
+                    conta.caixa = self.caixa
+                    conta.adiar_historico(self._carregar_historico)
+                self._guardar(cliente)
+            return cliente
+    
+    def obter_conta(self, numero: int):
+        """Retorna a conta do cache ou carrega o titular do armazém (None se não existir)"""
+        with self._trava:
+            conta = self._contas.get(numero)
+            if conta is not None:
+                self._clientes.move_to_end(conta.cliente.cpf)
+                self.acertos += 1
+                return conta
+            cpf = self.armazem.cpf_da_conta(numero)
+            if cpf is None:
+                self.faltas += 1
+                return None
+            cliente = self.obter_cliente(cpf)
+            return cliente.obter_conta(numero) if cliente is not None else None
+    
+    def percorrer_agregados(self, consumir):
+        """Chama consumir(numero, agencia, agregados) com os totais de todas as transações de
+        cada conta do armazém, gravadas ou ainda pendentes
+        
+        Cada conta é lida quando não pode ser movimentada: as que estão fora da memória com a
+        trava do cache (para entrar no cache precisariam dela), as em memória com a própria trava.
+        """
+        numeros = self.armazem.numeros_contas()
+        for inicio in range(0, len(numeros), self.TAMANHO_SINCRONIZACAO):
+            faixa = numeros[inicio:inicio + self.TAMANHO_SINCRONIZACAO]
+            with self._trava:
+                em_memoria = dict(self._contas)
+                for cliente in list(self._removidos.values()):
+                    em_memoria.update((conta.numero, conta) for conta in cliente.contas)
+                residentes = [em_memoria[numero] for numero in faixa if numero in em_memoria]
+                for numero, (agencia, agregados) in self.armazem.agregados_contas(faixa[0], faixa[-1]).items():
+                    if numero not in em_memoria:
+                        consumir(numero, agencia, agregados)
+            for conta in residentes:
+                with conta._trava:
+                    _, agregados = self.armazem.agregados_contas(conta.numero, conta.numero).get(
+                        conta.numero, (None, AgregadosTransacoes()))
+                    for transacao in self._pendentes(conta):
+                        agregados.adicionar(AgregadosTransacoes.chave(transacao, conta.numero),
+                                            transacao.data.date(), transacao.centavos)
+                    consumir(conta.numero, conta.agencia, agregados)
+    
+    def _pendentes(self, conta) -> list:
+        """Transações da conta ainda não gravadas no armazém (com a trava da conta)"""
+        if 'historico' not in vars(conta):
+            return []  # Histórico ainda não carregado: nada foi acrescentado a ele
+        with self._trava:
+            return list(conta.historico.transacoes[self._persistidas.get(conta, 0):])
+    
+    def contas_em_memoria(self) -> dict:
+        """Cópia de número -> conta dos clientes em cache"""
+        with self._trava:
+            return dict(self._contas)
+    
+    def _carregar_historico(self, conta) -> Historico:
+        """Carrega do armazém o histórico adiado de uma conta (chamado com a trava da conta)"""
+        historico = conta.classe_historico(conta.numero)
+        self.armazem.carregar_historico(conta.numero, historico)
+        with self._trava:
+            self._persistidas[conta] = len(historico.transacoes)
+        return historico
+    
+    def fixar(self, cliente):
+        """Impede que o cliente saia do cache (uma chamada por sessão aberta)"""
+        with self._trava:
+            self._fixados[cliente.cpf] = self._fixados.get(cliente.cpf, 0) + 1
+    
+    def liberar(self, cliente):
+        with self._trava:
+            restantes = self._fixados.get(cliente.cpf, 0) - 1
+            if restantes > 0:
+                self._fixados[cliente.cpf] = restantes
+            else:
+                self._fixados.pop(cliente.cpf, None)
+                self._reduzir()
+    
+    # ---- Entrada e saída do cache ----
+    
+    def _guardar(self, cliente):
+        self._clientes[cliente.cpf] = cliente
+        for conta in cliente.contas:
+            self._contas[conta.numero] = conta
+        self._reduzir()
+    
+    def _reduzir(self):
+        """Remove os clientes menos usados até respeitar a capacidade"""
+        while len(self._clientes) > self.capacidade:
+            for cpf, cliente in self._clientes.items():
+                if cpf not in self._fixados and self._remover(cpf, cliente):
+                    break
+            else:
+                # Todos fixados ou em uso: o cache excede a capacidade até a próxima liberação
+                return
+    
+    def _remover(self, cpf: str, cliente) -> bool:
+        """Grava as contas pendentes e tira o cliente do cache; False se alguma conta estiver em uso"""
+        travadas = []
+        try:
+            for conta in cliente.contas:
+                # Sem bloquear: esperar pela trava da conta segurando a do cache inverteria a ordem
+                if not conta._trava.acquire(blocking=False):
+                    return False
+                travadas.append(conta)
+            self._gravar(cliente.contas)
+            del self._clientes[cpf]
+            for conta in cliente.contas:
+                self._contas.pop(conta.numero, None)
+            self._removidos[cpf] = cliente
+            self.remocoes += 1
+            return True
+        finally:
+            for conta in travadas:
+                conta._trava.release()
+    
+    def _gravar(self, contas):
+        """Grava no armazém as contas pendentes da lista (com as travas das contas e do cache)"""
+        movimentos = []
+        for conta in contas:
+            if conta.numero in self._sujas:
+                transacoes = conta.historico.transacoes
+                movimentos.append((conta.numero, conta._saldo, transacoes[self._persistidas[conta]:]))
+                self._persistidas[conta] = len(transacoes)
+                self._sujas.discard(conta.numero)
+        if movimentos:
+            self.armazem.gravar_movimentos(movimentos)
+            self.gravacoes += len(movimentos)
+    
+    def sincronizar(self):
+        """Grava no armazém os saldos e transações pendentes de todas as contas em cache"""
+        with self._trava:
+            pendentes = sorted(self._sujas)
+        for inicio in range(0, len(pendentes), self.TAMANHO_SINCRONIZACAO):
+            # Travas em ordem crescente de número, como nas transferências
+            contas = [self._contas.get(numero) for numero in pendentes[inicio:inicio + self.TAMANHO_SINCRONIZACAO]]
+            contas = [conta for conta in contas if conta is not None]
+            for conta in contas:
+                conta._trava.acquire()
+            try:
+                with self._trava:
+                    self._gravar([conta for conta in contas if self._contas.get(conta.numero) is conta])
+            finally:
+                for conta in reversed(contas):
+                    conta._trava.release()
+    
+    def _sincronizar_periodicamente(self, intervalo: float):
+        while not self._parar.wait(intervalo):
+            self.sincronizar()
+    
+    def fechar(self):
+        """Grava as pendências e deixa de acompanhar as operações (o armazém continua aberto)"""
+        if self._parar.is_set():
+            return
+        self._parar.set()
+        if self._sincronizador is not None:
+            self._sincronizador.join()
+        self.sincronizar()
+        if self.caixa is not None:
+            self.caixa.remover_observador(self)
+    
+    # ---- Observador ----
+    
+    def cliente_criado(self, cliente):
+        self.armazem.salvar_cliente(cliente)
+        with self._trava:
+            self._guardar(cliente)
+    
+    def conta_criada(self, conta):
+        self.armazem.salvar_conta(conta)
+        with self._trava:
+            self._persistidas[conta] = len(conta.historico.transacoes)
+            if self._clientes.get(conta.cliente.cpf) is conta.cliente:
+                self._contas[conta.numero] = conta
+    
+    def conta_movimentada(self, conta, transacao: Transacao, saldo_anterior: int):
+        # Chamado com a trava da conta adquirida
+        with self._trava:
+            self._sujas.add(conta.numero)
+            if self._contas.get(conta.numero) is not conta:
+                # A conta saiu do cache enquanto ainda estava em uso: volta com o titular,
+                # e o movimento é gravado com as demais pendências
+                self._removidos.pop(conta.cliente.cpf, None)
+                self._guardar(conta.cliente)
+    
+    def saldo_recalculado(self, conta, saldo_anterior: int):
+        self.conta_movimentada(conta, None, saldo_anterior)
+    
+    # ---- Métricas ----
+    
+    def estatisticas(self) -> dict:
+        with self._trava:
+            consultas = self.acertos + self.faltas
+            return {
+                'capacidade': self.capacidade,
+                'clientes': len(self._clientes),
+                'contas': len(self._contas),
+                'contas_pendentes': len(self._sujas),
+                'sessoes_fixadas': len(self._fixados),
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                'remocoes': self.remocoes,
+                'gravacoes': self.gravacoes,
+            }
+    
+    def linhas_prometheus(self, prefixo: str) -> list:
+        """Linhas do cache para Metricas.exportar_prometheus"""
+        estatisticas = self.estatisticas()
+        linhas = []
+        for nome, tipo, descricao in (
+            ('acertos', 'counter', "Consultas atendidas pelo cache"),
+            ('faltas', 'counter', "Consultas que foram ao armazém"),
+            ('remocoes', 'counter', "Clientes removidos do cache por falta de espaço"),
+            ('gravacoes', 'counter', "Contas gravadas de volta no armazém"),
+            ('clientes', 'gauge', "Clientes em cache"),
+            ('contas_pendentes', 'gauge', "Contas com movimentos ainda não gravados"),
+        ):
+            metrica = f"{prefixo}_cache_{nome}" + ('_total' if tipo == 'counter' else '')
+            linhas.append(f"# HELP {metrica} {descricao}")
+            linhas.append(f"# TYPE {metrica} {tipo}")
+            linhas.append(f"{metrica} {estatisticas[nome]}")
+        return linhas
+
+class _ListaOrdenada:
+    """Lista ordenada dividida em baldes de até 2 x CARGA itens
+    
+    Inserção e remoção custam O(log n + CARGA) em vez do O(n) de deslocar uma lista
+    única, e a leitura a partir de uma chave percorre os baldes em ordem.
+    """
+    CARGA = 512
+    __slots__ = ('_baldes', '_maximos', '_tamanho')
+    
+    def __init__(self, itens=()):
+        itens = sorted(itens)
+        carga = self.CARGA
+        self._baldes = [itens[i:i + carga] for i in range(0, len(itens), carga)]
+        self._maximos = [balde[-1] for balde in self._baldes]  # Último item de cada balde
+        self._tamanho = len(itens)
+    
+    def __len__(self):
+        return self._tamanho
+    
+    def __contains__(self, item):
+        indice = bisect_left(self._maximos, item)
+        if indice == len(self._maximos):
+            return False
+        balde = self._baldes[indice]
+        return balde[bisect_left(balde, item)] == item
+    
+    def adicionar(self, item):
+        baldes, maximos = self._baldes, self._maximos
+        self._tamanho += 1
+        if not baldes:
+            baldes.append([item])
+            maximos.append(item)
+            return
+        indice = bisect_left(maximos, item)
+        if indice == len(maximos):
+            indice -= 1
+            baldes[indice].append(item)
+            maximos[indice] = item
+        else:
+            insort(baldes[indice], item)
+        balde = baldes[indice]
+        if len(balde) > 2 * self.CARGA:
+            metade = self.CARGA
+            baldes[indice:indice + 1] = [balde[:metade], balde[metade:]]
+            maximos[indice:indice + 1] = [balde[metade - 1], balde[-1]]
+    
+    def remover(self, item) -> bool:
+        """Remove o item se estiver na lista e retorna se removeu"""
+        baldes, maximos = self._baldes, self._maximos
+        indice = bisect_left(maximos, item)
+        if indice == len(maximos):
+            return False
+        balde = baldes[indice]
+        posicao = bisect_left(balde, item)
+        if balde[posicao] != item:
+            return False
+        del balde[posicao]
+        self._tamanho -= 1
+        if not balde:
+            del baldes[indice]
+            del maximos[indice]
+        elif posicao == len(balde):
+            maximos[indice] = balde[-1]
+        return True
+    
+    def a_partir(self, chave):
+        """Percorre em ordem os itens >= chave (a lista não pode mudar durante o percurso)"""
+        baldes = self._baldes
+        indice = bisect_left(self._maximos, chave)
+        if indice == len(baldes):
+            return
+        balde = baldes[indice]
+        yield from islice(balde, bisect_left(balde, chave), None)
+        for balde in islice(baldes, indice + 1, None):
+            yield from balde
+
+class Diretorio(ObservadorBanco):
+    """Índices de clientes e contas para consultas de retaguarda sem varrer o cadastro
+    
+    - lista ordenada de (sufixo do nome normalizado, CPF), com um sufixo a partir de cada
+      palavra, para buscar por prefixo do nome ou do sobrenome;
+    - números das contas agrupados por agência;
+    - lista ordenada de (saldo em centavos, número da conta), atualizada a cada movimentação.
+    
+    Os índices guardam só chaves: clientes e contas são obtidos do caixa (ou do seu cache)
+    no momento da consulta. Com um CacheContas, o cadastro inicial vem do armazém.
+    """
+    
+    def __init__(self, caixa: 'CaixaEletronico'):
+        self.caixa = caixa
+        self.por_agencia = {}  # Agência -> números das contas
+        self._nomes = _ListaOrdenada()
+        self._saldos = _ListaOrdenada()
+        self._saldo_indexado = {}  # Número da conta -> saldo presente em _saldos
+        self._trava = threading.Lock()
+        
+        # Registrado antes de ler o cadastro: o que mudar durante a leitura chega pelos eventos,
+        # e a leitura não sobrescreve o que os eventos já indexaram
+        caixa.registrar_observador(self)
+        if caixa.cache is not None:
+            armazem = caixa.cache.armazem
+            clientes = armazem.nomes_clientes()
+            contas = armazem.resumo_contas()
+            # Contas em cache podem ter saldo ainda não gravado no armazém
+            em_memoria = caixa.cache.contas_em_memoria()
+        else:
+            clientes = [(cliente.cpf, cliente.nome) for cliente in list(caixa.clientes.values())]
+            em_memoria = dict(caixa.contas)
+            contas = [(conta.numero, conta.agencia, None) for conta in em_memoria.values()]
+        with self._trava:
+            for cpf, nome in clientes:
+                self._indexar_nome(cpf, nome)
+            for numero, agencia, saldo in contas:
+                conta = em_memoria.get(numero)
+                self._indexar_conta(numero, agencia, conta.saldo_centavos if conta is not None else saldo)
+    
+    def fechar(self):
+        """Deixa de acompanhar as mudanças do caixa"""
+        self.caixa.remover_observador(self)
+    
+    @staticmethod
+    def normalizar_nome(nome: str) -> str:
+        decomposto = unicodedata.normalize('NFKD', nome)
+        sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+        return ' '.join(sem_acentos.lower().split())
+    
+    # ---- Atualização dos índices (com a trava adquirida) ----
+    
+    def _indexar_nome(self, cpf: str, nome: str):
+        nome = self.normalizar_nome(nome)
+        if (nome, cpf) in self._nomes:
+            return  # Já indexado por um evento durante a leitura do cadastro
+        # Um sufixo a partir de cada palavra para encontrar também pelo sobrenome
+        for posicao in [0] + [i + 1 for i, c in enumerate(nome) if c == ' ']:
+            self._nomes.adicionar((nome[posicao:], cpf))
+    
+    def _indexar_conta(self, numero: int, agencia: str, saldo: int):
+        if numero in self._saldo_indexado:
+            return
+        self.por_agencia.setdefault(agencia, set()).add(numero)
+        self._saldo_indexado[numero] = saldo
+        self._saldos.adicionar((saldo, numero))
+    
+    def _atualizar_saldo(self, conta):
+        anterior = self._saldo_indexado.get(conta.numero)
+        if anterior is None:
+            self._indexar_conta(conta.numero, conta.agencia, conta.saldo_centavos)
+            return
+        self._saldos.remover((anterior, conta.numero))
+        self._saldo_indexado[conta.numero] = conta.saldo_centavos
+        self._saldos.adicionar((conta.saldo_centavos, conta.numero))
+    
+    # ---- Observador ----
+    
+    def cliente_criado(self, cliente):
+        with self._trava:
+            self._indexar_nome(cliente.cpf, cliente.nome)
+    
+    def conta_criada(self, conta):
+        with self._trava:
+            self._indexar_conta(conta.numero, conta.agencia, conta.saldo_centavos)
+    
+    def conta_movimentada(self, conta, transacao: Transacao, saldo_anterior: int):
+        with self._trava:
+            self._atualizar_saldo(conta)
+    
+    def saldo_recalculado(self, conta, saldo_anterior: int):
+        with self._trava:
+            self._atualizar_saldo(conta)
+    
+    # ---- Consultas ----
+    
+    def buscar_cpf(self, cpf: str):
+        return self.caixa.obter_cliente(cpf)
+    
+    def buscar_nome(self, prefixo: str, limite: int = None) -> list:
+        """Clientes cujo nome (ou alguma palavra dele em diante) começa com o prefixo"""
+        prefixo = self.normalizar_nome(prefixo)
+        encontrados = {}  # Dicionário como conjunto ordenado
+        with self._trava:
+            for sufixo, cpf in self._nomes.a_partir((prefixo,)):
+                if not sufixo.startswith(prefixo) or (limite is not None and len(encontrados) >= limite):
+                    break
+                encontrados[cpf] = None
+        clientes = [self.caixa.obter_cliente(cpf) for cpf in encontrados]
+        return [cliente for cliente in clientes if cliente is not None]
+    
+    def _contas(self, numeros) -> list:
+        contas = [self.caixa.obter_conta(numero) for numero in numeros]
+        return [conta for conta in contas if conta is not None]
+    
+    def contas_agencia(self, agencia: str) -> list:
+        with self._trava:
+            numeros = sorted(self.por_agencia.get(str(agencia), ()))
+        return self._contas(numeros)
+    
+    def contas_saldo_entre(self, minimo=None, maximo=None) -> list:
+        """Contas com minimo <= saldo <= maximo (em reais), em ordem crescente de saldo"""
+        inicio = (Dinheiro.para_centavos(minimo),) if minimo is not None else ()
+        fim = Dinheiro.para_centavos(maximo) if maximo is not None else None
+        with self._trava:
+            numeros = []
+            for saldo, numero in self._saldos.a_partir(inicio):
+                if fim is not None and saldo > fim:
+                    break
+                numeros.append(numero)
+        return self._contas(numeros)
+    
+    def contas_saldo_acima(self, valor) -> list:
+        """Contas com saldo estritamente maior que o valor (em reais)"""
+        with self._trava:
+            numeros = [numero for _, numero in self._saldos.a_partir((Dinheiro.para_centavos(valor), float('inf')))]
+        return self._contas(numeros)
+
+class AgregadosAgencia(ObservadorBanco):
+    """Totais diários e mensais por tipo de transação, consolidados por agência
+    
+    Cada agência soma os agregados das suas contas: uma transferência entre duas
+    contas da mesma agência aparece uma vez em cada lado (enviada e recebida).
+    
+    A carga inicial lê o histórico completo de cada conta (o reaplicado pela
+    Persistencia e, com um CacheContas, o gravado no armazém), por isso deve ser
+    feita depois da recuperação. Um movimento só é somado pelo evento se a conta já
+    foi carregada; a carga de cada conta e os seus eventos são serializados pela trava da conta.
+    """
+    
+    def __init__(self, caixa: 'CaixaEletronico'):
+        self.caixa = caixa
+        self.por_agencia = {}  # agência -> AgregadosTransacoes
+        self._trava = threading.Lock()
+        self._carregadas = set()  # Números das contas já somadas; None depois da carga inicial
+        
+        caixa.registrar_observador(self)
+        if caixa.cache is not None:
+            # Agrupado no armazém, sem carregar as contas no cache
+            caixa.cache.percorrer_agregados(self._carregar_conta)
+        else:
+            for conta in list(caixa.contas.values()):
+                with conta._trava:
+                    self._carregar_conta(conta.numero, conta.agencia, conta.historico.agregados)
+        with self._trava:
+            self._carregadas = None
+    
+    def _carregar_conta(self, numero: int, agencia: str, agregados: AgregadosTransacoes):
+        with self._trava:
+            if numero not in self._carregadas:
+                self._carregadas.add(numero)
+                self._agregados(agencia).mesclar(agregados)
+    
+    def fechar(self):
+        """Deixa de acompanhar as mudanças do caixa"""
+        self.caixa.remover_observador(self)
+    
+    def _agregados(self, agencia: str) -> AgregadosTransacoes:
+        agregados = self.por_agencia.get(agencia)
+        if agregados is None:
+            agregados = self.por_agencia[agencia] = AgregadosTransacoes()
+        return agregados
+    
+    def conta_criada(self, conta):
+        with self._trava:
+            if self._carregadas is not None:
+                # Conta nova durante a carga: o histórico vazio já está somado
+                self._carregadas.add(conta.numero)
+    
+    def conta_movimentada(self, conta, transacao: Transacao, saldo_anterior: int):
+        with self._trava:
+            if self._carregadas is not None and conta.numero not in self._carregadas:
+                return  # Será somado com o histórico da conta
+            self._agregados(conta.agencia).adicionar(
+                AgregadosTransacoes.chave(transacao, conta.numero), transacao.data.date(), transacao.centavos)
+    
+    def totais_dia(self, agencia: str, dia: date, tipo=None) -> tuple:
+        with self._trava:
+            return self._agregados(agencia).dia(dia, tipo)
+    
+    def totais_mes(self, agencia: str, ano: int, mes: int, tipo=None) -> tuple:
+        """(quantidade, centavos) da agência no mês, por exemplo o total depositado"""
+        with self._trava:
+            return self._agregados(agencia).mes(ano, mes, tipo)
+    
+    def totais_periodo(self, agencia: str, inicio: date, fim: date, tipo=None) -> tuple:
+        with self._trava:
+            return self._agregados(agencia).periodo(inicio, fim, tipo)
+
+class Evento:
+    """Evento publicado no BarramentoEventos: criação de cliente, de conta ou transação registrada"""
+    __slots__ = ('sequencia', 'tipo', 'dados')
+    
+    def __init__(self, sequencia: int, tipo: str, dados: dict):
+        self.sequencia = sequencia
+        self.tipo = tipo
+        self.dados = dados
+    
+    def serializar(self) -> bytes:
+        """Linha JSON usada no FluxoEventos"""
+        evento = {'seq': self.sequencia, 'tipo': self.tipo, 'dados': self.dados}
+        return json.dumps(evento, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+    
+    @classmethod
+    def de_linha(cls, linha: bytes) -> 'Evento':
+        evento = json.loads(linha)
+        return cls(evento['seq'], evento['tipo'], evento['dados'])
+
+class Assinatura:
+    """Fila limitada de eventos de um consumidor do BarramentoEventos
+    
+    Com a fila cheia, a política 'bloquear' faz a thread distribuidora do barramento
+    esperar (contrapressão, sem travar quem publica) e 'descartar' descarta o evento e o
+    contabiliza; lacunas podem ser recuperadas no FluxoEventos pela sequência. Os eventos são retirados em lotes, por threads
+    (receber_lote) ou por corrotinas (receber_lote_async).
+    """
+    POLITICAS = ('bloquear', 'descartar')
+    
+    def __init__(self, nome: str, capacidade: int = 10_000, politica: str = 'bloquear',
+                 laco: asyncio.AbstractEventLoop = None):
+        if politica not in self.POLITICAS:
+            raise ValueError(f"Política inválida: {politica}")
+        self.nome = nome
+        self.capacidade = capacidade
+        self.politica = politica
+        self.fechada = False
+        self.entregues = 0
+        self.descartados = 0
+        self.erros = 0  # Lotes em que o consumidor de consumir_em_thread falhou
+        self._fila = deque()
+        self._condicao = threading.Condition()
+        # Consumidor asyncio: o laço é avisado de forma thread-safe a cada entrega
+        self._laco = laco
+        self._aviso = asyncio.Event() if laco is not None else None
+    
+    def _entregar(self, evento: Evento):
+        with self._condicao:
+            while len(self._fila) >= self.capacidade and not self.fechada:
+                if self.politica == 'descartar':
+                    self.descartados += 1
+                    return
+                self._condicao.wait()
+            if self.fechada:
+                return
+            self._fila.append(evento)
+            self.entregues += 1
+            # Consumidores só esperam com a fila vazia
+            if len(self._fila) == 1:
+                self._condicao.notify_all()
+        if self._laco is not None:
+            try:
+                self._laco.call_soon_threadsafe(self._aviso.set)
+            except RuntimeError:
+                pass  # Laço já encerrado
+    
+    def _retirar(self, maximo: int) -> list:
+        """Retira até `maximo` eventos (deve ser chamado com a condição adquirida)"""
+        fila = self._fila
+        lote = [fila.popleft() for _ in range(min(maximo, len(fila)))]
+        if lote:
+            self._condicao.notify_all()  # Libera quem esperava por espaço
+        return lote
+    
+    def receber_lote(self, maximo: int = 512, timeout: float = None) -> list:
+        """Espera por eventos e retorna até `maximo` deles (lista vazia em timeout ou se fechada)"""
+        with self._condicao:
+            self._condicao.wait_for(lambda: self._fila or self.fechada, timeout)
+            return self._retirar(maximo)
+    
+    async def receber_lote_async(self, maximo: int = 512) -> list:
+        """Versão asyncio de receber_lote (lista vazia se fechada)"""
+        if self._aviso is None:
+            raise RuntimeError("Assinatura criada sem laço asyncio; use BarramentoEventos.assinar_async")
+        while True:
+            self._aviso.clear()
+            with self._condicao:
+                lote = self._retirar(maximo)
+                if lote or self.fechada:
+                    return lote
+            await self._aviso.wait()
+    
+    def consumir_em_thread(self, funcao, maximo: int = 512, intervalo: float = 0) -> threading.Thread:
+        """Chama funcao(lote) em uma thread própria até a assinatura ser fechada
+        
+        Com `intervalo`, a thread espera esse tempo (em segundos) entre lotes para acumular
+        eventos, trocando um pouco de latência por menos trocas de contexto. Um erro em
+        funcao é registrado e a thread continua: parada, ela deixaria o distribuidor do
+        barramento esperando para sempre numa assinatura 'bloquear'.
+        """
+        def consumir():
+            while True:
+                lote = self.receber_lote(maximo)
+                if lote:
+                    try:
+                        funcao(lote)
+                    except Exception as e:
+                        self.erros += 1
+                        print(f"Erro no consumidor '{self.nome}' (sequências {lote[0].sequencia}"
+                              f" a {lote[-1].sequencia}): {e}", file=sys.stderr)
+                    if intervalo and not self.fechada:
+                        time.sleep(intervalo)
+                elif self.fechada:
+                    return
+        thread = threading.Thread(target=consumir, name=f"assinatura-{self.nome}", daemon=True)
+        thread.start()
+        return thread
+    
+    def fechar(self):
+        with self._condicao:
+            self.fechada = True
+            self._condicao.notify_all()
+        if self._laco is not None:
+            try:
+                self._laco.call_soon_threadsafe(self._aviso.set)
+            except RuntimeError:
+                pass
+
+class FluxoEventos:
+    """Fluxo de eventos reproduzível em arquivo (linhas JSON), com a posição de cada consumidor
+    
+    Consumidores leem em bloco a partir da última posição confirmada, o que permite
+    alcançar o estado atual depois de uma parada sem passar pelas filas em memória.
+    """
+    
+    def __init__(self, diretorio: str):
+        os.makedirs(diretorio, exist_ok=True)
+        self.caminho = os.path.join(diretorio, 'eventos.jsonl')
+        self.caminho_posicoes = os.path.join(diretorio, 'consumidores.json')
+        self._trava = threading.Lock()
+        self._arquivo = open(self.caminho, 'ab')
+        self._descartar_linha_incompleta()
+        self.ultima_sequencia = self._ler_maior_sequencia()
+        self._posicoes = {}
+        if os.path.exists(self.caminho_posicoes):
+            with open(self.caminho_posicoes, encoding='utf-8') as arquivo:
+                self._posicoes = json.load(arquivo)
+    
+    def _descartar_linha_incompleta(self):
+        """Remove uma última linha sem quebra (escrita interrompida), que emendaria na próxima"""
+        tamanho = os.path.getsize(self.caminho)
+        if tamanho:
+            self._arquivo.truncate(self._inicio_ultima_linha(tamanho, incompleta=True))
+    
+    def _inicio_ultima_linha(self, tamanho: int, incompleta: bool = False) -> int:
+        """Posição em que começa a última linha, lendo o arquivo de trás para frente em blocos
+        
+        Com `incompleta`, a última linha é a que vem depois da última quebra (vazia se o
+        arquivo termina em quebra); sem ela, a quebra final é ignorada.
+        """
+        fim_busca = tamanho if incompleta else tamanho - 1
+        with open(self.caminho, 'rb') as arquivo:
+            fim = fim_busca
+            while fim > 0:
+                inicio = max(0, fim - 65536)
+                arquivo.seek(inicio)
+                quebra = arquivo.read(fim - inicio).rfind(b'\n')
+                if quebra >= 0:
+                    return inicio + quebra + 1
+                fim = inicio
+        return 0
+    
+    def _ler_maior_sequencia(self) -> int:
+        """Sequência da última linha: o distribuidor do barramento grava os eventos em ordem"""
+        tamanho = os.path.getsize(self.caminho)
+        if not tamanho:
+            return 0
+        inicio = self._inicio_ultima_linha(tamanho)
+        with open(self.caminho, 'rb') as arquivo:
+            arquivo.seek(inicio)
+            return Evento.de_linha(arquivo.read(tamanho - inicio)).sequencia
+    
+    def anexar(self, eventos: list):
+        dados = b''.join(evento.serializar() for evento in eventos)
+        with self._trava:
+            self._arquivo.write(dados)
+            self._arquivo.flush()
+    
+    def posicao(self, consumidor: str) -> int:
+        return self._posicoes.get(consumidor, 0)
+    
+    def ler(self, consumidor: str, maximo: int = 10_000) -> tuple:
+        """Lê até `maximo` eventos a partir da posição do consumidor e retorna (eventos, nova posição)
+        
+        A nova posição só vale depois de confirmar(consumidor, posicao).
+        """
+        posicao = self.posicao(consumidor)
+        eventos = []
+        with open(self.caminho, 'rb') as arquivo:
+            arquivo.seek(posicao)
+            for linha in arquivo:
+                if not linha.endswith(b'\n') or len(eventos) >= maximo:
+                    break
+                eventos.append(Evento.de_linha(linha))
+                posicao += len(linha)
+        return eventos, posicao
+    
+    def confirmar(self, consumidor: str, posicao: int):
+        """Grava de forma atômica a posição até onde o consumidor já processou o fluxo"""
+        with self._trava:
+            self._posicoes[consumidor] = posicao
+            temporario = self.caminho_posicoes + '.tmp'
+            with open(temporario, 'w', encoding='utf-8') as arquivo:
+                json.dump(self._posicoes, arquivo)
+            os.replace(temporario, self.caminho_posicoes)
+    
+    def reproduzir(self, desde_sequencia: int = 0):
+        """Gera todos os eventos com sequência maior que `desde_sequencia`"""
+        with open(self.caminho, 'rb') as arquivo:
+            for linha in arquivo:
+                if not linha.endswith(b'\n'):
+                    return
+                evento = Evento.de_linha(linha)
+                if evento.sequencia > desde_sequencia:
+                    yield evento
+    
+    def fechar(self):
+        with self._trava:
+            self._arquivo.close()
+
+class BarramentoEventos(ObservadorBanco):
+    """Barramento publicador/assinante dos eventos do banco
+    
+    Publica um Evento para cada cliente criado, conta criada e transação registrada
+    no histórico. Quem publica (com a trava da conta adquirida) só numera o evento e o
+    coloca na fila de entrada, sem travas nem esperas. Uma thread distribuidora repassa
+    os eventos às assinaturas em ordem crescente de sequência, e é ela quem espera pelas
+    assinaturas 'bloquear' cheias. Se a fila de entrada passar de capacidade_entrada,
+    os eventos novos são descartados e contados em `descartados`. A serialização e a
+    gravação no FluxoEventos (opcional) ficam com outra thread.
+    """
+    TAMANHO_LOTE_FLUXO = 65536
+    INTERVALO_FLUXO = 0.05  # Segundos entre gravações no fluxo
+    
+    def __init__(self, caixa: 'CaixaEletronico', diretorio_fluxo: str = None, capacidade_fluxo: int = 100_000,
+                 capacidade_entrada: int = 1_000_000):
+        self.caixa = caixa
+        self.capacidade_entrada = capacidade_entrada
+        self.descartados = 0
+        self._assinaturas = []
+        self._trava = threading.Lock()
+        self.fluxo = FluxoEventos(diretorio_fluxo) if diretorio_fluxo else None
+        inicio = self.fluxo.ultima_sequencia + 1 if self.fluxo else 1
+        self._sequencias = count(inicio)
+        self._entrada = deque()
+        self._aviso = threading.Event()
+        self._ativo = True
+        self._distribuidor = threading.Thread(
+            target=self._distribuir, args=(inicio,), name="barramento-eventos", daemon=True)
+        self._distribuidor.start()
+        self._gravador = None
+        self._assinatura_fluxo = None
+        if self.fluxo is not None:
+            self._assinatura_fluxo = self.assinar('fluxo', capacidade_fluxo, 'bloquear')
+            self._gravador = self._assinatura_fluxo.consumir_em_thread(
+                self.fluxo.anexar, self.TAMANHO_LOTE_FLUXO, self.INTERVALO_FLUXO)
+        caixa.registrar_observador(self)
+    
+    # ---- Assinaturas ----
+    
+    def assinar(self, nome: str, capacidade: int = 10_000, politica: str = 'bloquear') -> Assinatura:
+        """Cria uma assinatura para consumidores em threads"""
+        assinatura = Assinatura(nome, capacidade, politica)
+        self._adicionar(assinatura)
+        return assinatura
+    
+    def assinar_async(self, nome: str, capacidade: int = 10_000, politica: str = 'bloquear') -> Assinatura:
+        """Cria uma assinatura consumida no laço asyncio em execução"""
+        assinatura = Assinatura(nome, capacidade, politica, asyncio.get_running_loop())
+        self._adicionar(assinatura)
+        return assinatura
+    
+    def _adicionar(self, assinatura: Assinatura):
+        with self._trava:
+            # Cópia nova da lista: publicar() a percorre sem adquirir a trava
+            self._assinaturas = self._assinaturas + [assinatura]
+    
+    def cancelar(self, assinatura: Assinatura):
+        with self._trava:
+            self._assinaturas = [a for a in self._assinaturas if a is not assinatura]
+        assinatura.fechar()
+    
+    # ---- Publicação ----
+    
+    def publicar(self, tipo: str, dados: dict):
+        entrada = self._entrada
+        if len(entrada) >= self.capacidade_entrada:
+            self.descartados += 1
+            return
+        # next() de itertools.count e deque.append são atômicos: nenhuma trava no caminho da transação
+        entrada.append(Evento(next(self._sequencias), tipo, dados))
+        if not self._aviso.is_set():
+            self._aviso.set()
+    
+    def _distribuir(self, proxima: int):
+        """Laço da thread distribuidora: entrega os eventos às assinaturas em ordem de sequência
+        
+        Dois publicadores podem enfileirar as sequências fora de ordem; os eventos que
+        chegam antes de uma sequência anterior esperam num heap até ela chegar.
+        """
+        entrada = self._entrada
+        pendentes = []
+        while True:
+            while entrada:
+                evento = entrada.popleft()
+                heapq.heappush(pendentes, (evento.sequencia, evento))
+            while pendentes and (pendentes[0][0] == proxima or not self._ativo):
+                sequencia, evento = heapq.heappop(pendentes)
+                for assinatura in self._assinaturas:
+                    assinatura._entregar(evento)
+                proxima = sequencia + 1
+            if entrada:
+                continue
+            if not self._ativo:
+                return
+            self._aviso.clear()
+            # fechar() desliga _ativo antes de avisar: conferido depois do clear(), o aviso não se perde
+            if not entrada and self._ativo:
+                self._aviso.wait()
+    
+    def cliente_criado(self, cliente):
+        self.publicar('cliente_criado', {'cpf': cliente.cpf, 'nome': cliente.nome})
+    
+    def conta_criada(self, conta):
+        self.publicar('conta_criada', {
+            'numero': conta.numero, 'agencia': conta.agencia, 'cpf': conta.cliente.cpf,
+            'classe': type(conta).__name__,
+        })
+    
+    def conta_movimentada(self, conta, transacao: Transacao, saldo_anterior: int):
+        dados = {
+            'numero': conta.numero,
+            'transacao': type(transacao).__name__,
+            'centavos': transacao.centavos,
+            'instante': Historico.instante(transacao.data),
+            'saldo_anterior': saldo_anterior,
+            'saldo': conta._saldo,
+        }
+        if type(transacao) is Transferencia:
+            dados['origem'] = transacao.origem
+            dados['destino'] = transacao.destino
+        self.publicar('transacao', dados)
+    
+    def fechar(self):
+        """Deixa de publicar, entrega o que já foi publicado, encerra as assinaturas e grava o que restar no fluxo
+        
+        As assinaturas dos consumidores são encerradas antes da entrega final, para que uma
+        assinatura 'bloquear' sem consumidor não prenda o distribuidor.
+        """
+        self.caixa.remover_observador(self)
+        for assinatura in self._assinaturas:
+            if assinatura is not self._assinatura_fluxo:
+                assinatura.fechar()
+        self._ativo = False
+        self._aviso.set()
+        self._distribuidor.join()
+        if self._gravador is not None:
+            self._assinatura_fluxo.fechar()
+            self._gravador.join()
+            self.fluxo.fechar()
+
+class ColunasTransacoes:
+    """Colunas tipadas de transações, uma linha por transação, usadas na exportação"""
+    __slots__ = ('numeros', 'instantes', 'tipos', 'centavos', 'origens', 'destinos')
+    
+    def __init__(self):
+        self.numeros = array('q')
+        self.instantes = array('q')
+        self.tipos = array('b')  # Códigos de HistoricoColunar.TIPOS
+        self.centavos = array('q')
+        self.origens = array('q')  # Zero fora das transferências
+        self.destinos = array('q')
+    
+    def __len__(self):
+        return len(self.tipos)
+    
+    def acrescentar(self, transacoes):
+        """Acrescenta tipo, valor e contas de objetos de transação (os instantes ficam com quem chama)"""
+        codigos = HistoricoColunar.CODIGOS
+        for transacao in transacoes:
+            tipo = type(transacao)
+            self.tipos.append(codigos[tipo])
+            self.centavos.append(transacao.centavos)
+            if tipo is Transferencia:
+                self.origens.append(transacao.origem)
+                self.destinos.append(transacao.destino)
+            else:
+                self.origens.append(0)
+                self.destinos.append(0)
+    
+    def limpar(self):
+        for nome in self.__slots__:
+            del getattr(self, nome)[:]
+
+def _little_endian(valores: array) -> bytes:
+    if sys.byteorder == 'big':
+        valores = array(valores.typecode, valores)
+        valores.byteswap()
+    return valores.tobytes()
+
+def _codificar_dicionario(textos: list) -> tuple:
+    """Codifica textos como (códigos int32, valores distintos na ordem em que aparecem)"""
+    posicoes = {}
+    codigos = array('i', [posicoes.setdefault(texto, len(posicoes)) for texto in textos])
+    return codigos, list(posicoes)
+
+class ArquivoSBC:
+    """Arquivo colunar próprio (.sbc), usado quando o pyarrow não está instalado
+    
+    Depois da MAGICA vem uma sequência de blocos. Cada bloco tem um cabeçalho JSON,
+    precedido do seu tamanho, com a quantidade de linhas e a descrição das colunas,
+    seguido dos buffers das colunas comprimidos com zlib: int64 little-endian,
+    dicionários como códigos (int8 ou int32) e textos como deslocamentos int64 + UTF-8.
+    """
+    EXTENSAO = '.sbc'
+    MAGICA = b'SBCOL1\n'
+    TAMANHO = struct.Struct('<I')
+    TIPOS_CODIGO = {'dicionario8': 'b', 'dicionario32': 'i'}
+    NIVEL_COMPRESSAO = 1
+    
+    def __init__(self, caminho: str, esquema: tuple):
+        self.caminho = caminho
+        self.esquema = esquema
+        self._arquivo = open(caminho, 'wb')
+        self._arquivo.write(self.MAGICA)
+    
+    def escrever(self, colunas: dict):
+        """Grava um bloco; colunas de dicionário são passadas como (códigos, valores)"""
+        descricoes = []
+        buffers = []
+        linhas = 0
+        for nome, formato in self.esquema:
+            valor = colunas[nome]
+            descricao = {'nome': nome, 'formato': formato}
+            if formato == 'int64':
+                linhas = len(valor)
+                bruto = _little_endian(valor)
+            elif formato == 'texto':
+                linhas = len(valor)
+                dados = [texto.encode('utf-8') for texto in valor]
+                deslocamentos = array('q', accumulate(map(len, dados), initial=0))
+                bruto = _little_endian(deslocamentos) + b''.join(dados)
+            else:
+                codigos, valores = valor
+                linhas = len(codigos)
+                descricao['dicionario'] = valores
+                bruto = _little_endian(codigos)
+            # zlib libera o GIL: fragmentos gravados em threads comprimem em paralelo
+            comprimido = zlib.compress(bruto, self.NIVEL_COMPRESSAO)
+            descricao['bytes'] = len(comprimido)
+            descricoes.append(descricao)
+            buffers.append(comprimido)
+        cabecalho = json.dumps({'linhas': linhas, 'colunas': descricoes}, ensure_ascii=False).encode('utf-8')
+        self._arquivo.write(self.TAMANHO.pack(len(cabecalho)) + cabecalho + b''.join(buffers))
+    
+    def fechar(self):
+        self._arquivo.close()
+    
+    @classmethod
+    def ler(cls, caminho: str):
+        """Gera cada bloco do arquivo como {coluna: valores}, com os dicionários já decodificados"""
+        with open(caminho, 'rb') as arquivo:
+            if arquivo.read(len(cls.MAGICA)) != cls.MAGICA:
+                raise ValueError(f"{caminho} não é um arquivo SBC")
+            while True:
+                tamanho = arquivo.read(cls.TAMANHO.size)
+                if not tamanho:
+                    return
+                cabecalho = json.loads(arquivo.read(cls.TAMANHO.unpack(tamanho)[0]))
+                linhas = cabecalho['linhas']
+                bloco = {}
+                for descricao in cabecalho['colunas']:
+                    bruto = zlib.decompress(arquivo.read(descricao['bytes']))
+                    formato = descricao['formato']
+                    if formato == 'texto':
+                        deslocamentos = cls._array('q', bruto[:8 * (linhas + 1)])
+                        dados = bruto[8 * (linhas + 1):]
+                        bloco[descricao['nome']] = [
+                            dados[a:b].decode('utf-8') for a, b in zip(deslocamentos, deslocamentos[1:])
+                        ]
+                    elif formato == 'int64':
+                        bloco[descricao['nome']] = cls._array('q', bruto)
+                    else:
+                        valores = descricao['dicionario']
+                        codigos = cls._array(cls.TIPOS_CODIGO[formato], bruto)
+                        bloco[descricao['nome']] = [valores[codigo] for codigo in codigos]
+                yield bloco
+    
+    @staticmethod
+    def _array(tipo: str, bruto: bytes) -> array:
+        valores = array(tipo)
+        valores.frombytes(bruto)
+        if sys.byteorder == 'big':
+            valores.byteswap()
+        return valores
+
+class ArquivoParquet:
+    """Arquivo Parquet gravado com pyarrow, um grupo de linhas por bloco (mesma interface de ArquivoSBC)"""
+    EXTENSAO = '.parquet'
+    
+    def __init__(self, caminho: str, esquema: tuple):
+        if pa is None:
+            raise RuntimeError("pyarrow não está instalado")
+        self.caminho = caminho
+        self.esquema = esquema
+        tipos = {
+            'int64': pa.int64(), 'texto': pa.string(),
+            'dicionario8': pa.dictionary(pa.int8(), pa.string()),
+            'dicionario32': pa.dictionary(pa.int32(), pa.string()),
+        }
+        self._esquema = pa.schema([(nome, tipos[formato]) for nome, formato in esquema])
+        self._escritor = pq.ParquetWriter(caminho, self._esquema)
+    
+    def escrever(self, colunas: dict):
+        arrays = []
+        for (nome, formato), campo in zip(self.esquema, self._esquema):
+            valor = colunas[nome]
+            if formato == 'int64':
+                # Sem cópia: o array Arrow usa o buffer do array('q')
+                arrays.append(pa.Array.from_buffers(pa.int64(), len(valor), [None, pa.py_buffer(valor)]))
+            elif formato == 'texto':
+                arrays.append(pa.array(valor, pa.string()))
+            else:
+                codigos, valores = valor
+                indices = pa.Array.from_buffers(campo.type.index_type, len(codigos), [None, pa.py_buffer(codigos)])
+                arrays.append(pa.DictionaryArray.from_arrays(indices, pa.array(valores, pa.string())))
+        self._escritor.write_table(pa.Table.from_arrays(arrays, schema=self._esquema))
+    
+    def fechar(self):
+        self._escritor.close()
+
+class ExportadorColunar:
+    """Exporta clientes, contas e transações para arquivos colunares, em blocos e por fragmento
+    
+    Grava Parquet quando o pyarrow está instalado e ArquivoSBC caso contrário. Valores
+    e instantes são int64 (centavos e microssegundos desde a época) e os tipos são
+    codificados por dicionário. Cada exportação cria o diretório exportacao-NNNNNN,
+    renomeado só ao final, com a marca d'água: quantas transações de cada conta já
+    foram exportadas. As transações são incrementais a partir da última marca; clientes
+    e contas são exportados por inteiro, com o saldo correspondente às transações exportadas.
+    
+    As contas são divididas em fragmentos como no LedgerFragmentado ((numero - 1) % fragmentos),
+    cada um gravado por uma thread em arquivos próprios. A memória fica limitada a um
+    bloco de tamanho_bloco linhas por fragmento.
+    """
+    ESQUEMA_CLIENTES = (('cpf', 'texto'), ('nome', 'texto'), ('endereco', 'texto'), ('nascimento', 'int64'))
+    ESQUEMA_CONTAS = (
+        ('numero', 'int64'), ('cpf', 'texto'), ('agencia', 'dicionario32'), ('classe', 'dicionario32'),
+        ('saldo_centavos', 'int64'), ('limite_centavos', 'int64'),
+    )
+    ESQUEMA_TRANSACOES = (
+        ('numero', 'int64'), ('instante', 'int64'), ('tipo', 'dicionario8'),
+        ('centavos', 'int64'), ('origem', 'int64'), ('destino', 'int64'),
+    )
+    NOMES_TIPOS = [tipo.__name__ for tipo in HistoricoColunar.TIPOS]
+    PADRAO_DIRETORIO = re.compile(r'exportacao-(\d{6})$')
+    
+    def __init__(self, caixa: 'CaixaEletronico', diretorio: str, fragmentos: int = 4,
+                 tamanho_bloco: int = 65_536, formato: str = None):
+        if caixa.cache is not None:
+            # caixa.contas e caixa.clientes só teriam os clientes em memória
+            raise ValueError("ExportadorColunar exporta o estado em memória e não aceita um caixa com CacheContas")
+        self.caixa = caixa
+        self.diretorio = diretorio
+        self.fragmentos = fragmentos
+        self.tamanho_bloco = tamanho_bloco
+        self.formato = formato or ('parquet' if pa is not None else 'sbc')
+        self.classe_arquivo = {'parquet': ArquivoParquet, 'sbc': ArquivoSBC}[self.formato]
+        os.makedirs(diretorio, exist_ok=True)
+    
+    def ultima_exportacao(self) -> int:
+        """Número da última exportação concluída (0 se nenhuma)"""
+        numeros = [
+            int(encontrado.group(1)) for encontrado in map(self.PADRAO_DIRETORIO.match, os.listdir(self.diretorio))
+            if encontrado
+        ]
+        return max(numeros, default=0)
+    
+    def marca_dagua(self) -> dict:
+        """Transações já exportadas por conta: {numero: quantidade}"""
+        ultima = self.ultima_exportacao()
+        if not ultima:
+            return {}
+        caminho = os.path.join(self.diretorio, f'exportacao-{ultima:06d}', 'marca_dagua.json')
+        with open(caminho, encoding='utf-8') as arquivo:
+            return {int(numero): quantidade for numero, quantidade in json.load(arquivo).items()}
+    
+    def exportar(self) -> dict:
+        """Exporta o que mudou desde a última marca d'água e retorna o relatório de vazão"""
+        inicio = time.perf_counter()
+        anterior = self.marca_dagua()
+        exportacao = self.ultima_exportacao() + 1
+        final = os.path.join(self.diretorio, f'exportacao-{exportacao:06d}')
+        temporario = final + '.tmp'
+        os.makedirs(temporario, exist_ok=True)
+        for nome in os.listdir(temporario):  # Restos de uma exportação interrompida
+            os.remove(os.path.join(temporario, nome))
+        
+        partes = [[] for _ in range(self.fragmentos)]
+        for conta in list(self.caixa.contas.values()):
+            partes[(conta.numero - 1) % self.fragmentos].append(conta)
+        with ThreadPoolExecutor(max_workers=self.fragmentos + 1) as executor:
+            clientes = executor.submit(self._exportar_clientes, temporario)
+            tarefas = [
+                executor.submit(self._exportar_fragmento, indice, contas, anterior, temporario)
+                for indice, contas in enumerate(partes)
+            ]
+            fragmentos = [tarefa.result() for tarefa in tarefas]
+            clientes = clientes.result()
+        
+        marca = dict(anterior)
+        for fragmento in fragmentos:
+            marca.update(fragmento.pop('marca'))
+        with open(os.path.join(temporario, 'marca_dagua.json'), 'w', encoding='utf-8') as arquivo:
+            json.dump(marca, arquivo)
+        # A renomeação conclui a exportação: uma interrupção antes dela não avança a marca
+        os.replace(temporario, final)
+        
+        segundos = time.perf_counter() - inicio
+        transacoes = sum(fragmento['transacoes'] for fragmento in fragmentos)
+        tamanho = clientes['bytes'] + sum(fragmento['bytes'] for fragmento in fragmentos)
+        return {
+            'exportacao': exportacao,
+            'formato': self.formato,
+            'diretorio': final,
+            'clientes': clientes['clientes'],
+            'contas': sum(fragmento['contas'] for fragmento in fragmentos),
+            'transacoes': transacoes,
+            'bytes': tamanho,
+            'segundos': segundos,
+            'transacoes_por_segundo': transacoes / segundos if segundos else 0.0,
+            'mib_por_segundo': tamanho / 2**20 / segundos if segundos else 0.0,
+            'fragmentos': fragmentos,
+        }
+    
+    def _arquivo(self, diretorio: str, nome: str, esquema: tuple):
+        return self.classe_arquivo(os.path.join(diretorio, nome + self.classe_arquivo.EXTENSAO), esquema)
+    
+    def _exportar_clientes(self, diretorio: str) -> dict:
+        arquivo = self._arquivo(diretorio, 'clientes', self.ESQUEMA_CLIENTES)
+        clientes = list(self.caixa.clientes.values())
+        for inicio in range(0, len(clientes), self.tamanho_bloco):
+            bloco = clientes[inicio:inicio + self.tamanho_bloco]
+            arquivo.escrever({
+                'cpf': [cliente.cpf for cliente in bloco],
+                'nome': [cliente.nome for cliente in bloco],
+                'endereco': [cliente.endereco for cliente in bloco],
+                'nascimento': array('q', [
+                    cliente.data_nascimento.toordinal() if cliente.data_nascimento else 0 for cliente in bloco
+                ]),
+            })
+        arquivo.fechar()
+        return {'clientes': len(clientes), 'bytes': os.path.getsize(arquivo.caminho)}
+    
+    def _exportar_fragmento(self, indice: int, contas: list, anterior: dict, diretorio: str) -> dict:
+        """Grava as contas do fragmento e as transações novas de cada uma"""
+        inicio = time.perf_counter()
+        arquivo_contas = self._arquivo(diretorio, f'contas-{indice:03d}', self.ESQUEMA_CONTAS)
+        arquivo_transacoes = self._arquivo(diretorio, f'transacoes-{indice:03d}', self.ESQUEMA_TRANSACOES)
+        colunas = ColunasTransacoes()
+        linhas_contas = []
+        marca = {}
+        transacoes = 0
+        for conta in contas:
+            historico = conta.historico
+            with conta._trava:
+                fim = len(historico.transacoes)
+                linhas_contas.append((conta, conta._saldo))
+            posicao = anterior.get(conta.numero, 0)
+            while posicao < fim:
+                ate = min(fim, posicao + self.tamanho_bloco - len(colunas))
+                # A trava por trecho evita ler o histórico no meio de um despejo
+                with conta._trava:
+                    historico.exportar_colunas(posicao, ate, colunas)
+                colunas.numeros.extend(array('q', [conta.numero]) * (ate - posicao))
+                posicao = ate
+                if len(colunas) >= self.tamanho_bloco:
+                    transacoes += len(colunas)
+                    self._gravar_transacoes(arquivo_transacoes, colunas)
+            marca[conta.numero] = fim
+            if len(linhas_contas) >= self.tamanho_bloco:
+                self._gravar_contas(arquivo_contas, linhas_contas)
+        if len(colunas):
+            transacoes += len(colunas)
+            self._gravar_transacoes(arquivo_transacoes, colunas)
+        if linhas_contas:
+            self._gravar_contas(arquivo_contas, linhas_contas)
+        arquivo_contas.fechar()
+        arquivo_transacoes.fechar()
+        return {
+            'fragmento': indice,
+            'contas': len(contas),
+            'transacoes': transacoes,
+            'bytes': os.path.getsize(arquivo_contas.caminho) + os.path.getsize(arquivo_transacoes.caminho),
+            'segundos': time.perf_counter() - inicio,
+            'marca': marca,
+        }
+    
+    def _gravar_transacoes(self, arquivo, colunas: ColunasTransacoes):
+        arquivo.escrever({
+            'numero': colunas.numeros,
+            'instante': colunas.instantes,
+            'tipo': (colunas.tipos, self.NOMES_TIPOS),
+            'centavos': colunas.centavos,
+            'origem': colunas.origens,
+            'destino': colunas.destinos,
+        })
+        colunas.limpar()
+    
+    def _gravar_contas(self, arquivo, linhas: list):
+        arquivo.escrever({
+            'numero': array('q', [conta.numero for conta, _ in linhas]),
+            'cpf': [conta.cliente.cpf for conta, _ in linhas],
+            'agencia': _codificar_dicionario([conta.agencia for conta, _ in linhas]),
+            'classe': _codificar_dicionario([type(conta).__name__ for conta, _ in linhas]),
+            'saldo_centavos': array('q', [saldo for _, saldo in linhas]),
+            'limite_centavos': array('q', [getattr(conta, 'limite_centavos', 0) for conta, _ in linhas]),
+        })
+        linhas.clear()
+
+class ImportadorClientes:
+    """Importação em massa de clientes a partir de CSV, processada em lotes
+    
+    O arquivo deve ter as colunas cpf, nome, endereco e data_nascimento
+    (AAAA-MM-DD ou DD/MM/AAAA). Cada cliente válido e inédito ganha uma conta.
+    """
+    
+    def __init__(self, caixa: 'CaixaEletronico', tamanho_lote: int = 10_000,
+                 classe_conta=ContaCorrente, agencia: str = "1001"):
+        self.caixa = caixa
+        self.tamanho_lote = tamanho_lote
+        self.classe_conta = classe_conta
+        self.agencia = agencia
+    
+    def importar(self, caminho: str, medir_memoria: bool = False) -> dict:
+        """Importa o arquivo e retorna um relatório com contagens, linhas/s e pico de memória"""
+        relatorio = {
+            'linhas': 0, 'importados': 0, 'cpf_invalido': 0,
+            'duplicados': 0, 'linhas_invalidas': 0,
+        }
+        if medir_memoria:
+            tracemalloc.start()
+        try:
+            inicio = time.perf_counter()
+            with open(caminho, newline='', encoding='utf-8') as arquivo:
+                leitor = csv.DictReader(arquivo)
+                while True:
+                    lote = list(islice(leitor, self.tamanho_lote))
+                    if not lote:
+                        break
+                    self._importar_lote(lote, relatorio)
+            
+            relatorio['segundos'] = time.perf_counter() - inicio
+            relatorio['linhas_por_segundo'] = relatorio['linhas'] / relatorio['segundos'] if relatorio['segundos'] else 0.0
+            if medir_memoria:
+                relatorio['pico_memoria'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            if medir_memoria:
+                tracemalloc.stop()
+        return relatorio
+    
+    def _importar_lote(self, lote: list, relatorio: dict):
+        relatorio['linhas'] += len(lote)
+        limpar = Validacao.limpar_cpf
+        cpfs = [limpar(linha.get('cpf') or '') for linha in lote]
+        validos = Validacao.validar_cpfs(cpfs)
+        
+        obter_cliente = self.caixa.obter_cliente
+        novos = []
+        vistos = set()
+        for linha, cpf, valido in zip(lote, cpfs, validos):
+            if not valido:
+                relatorio['cpf_invalido'] += 1
+                continue
+            if cpf in vistos or obter_cliente(cpf) is not None:
+                relatorio['duplicados'] += 1
+                continue
+            nome = (linha.get('nome') or '').strip()
+            endereco = (linha.get('endereco') or '').strip()
+            nascimento = self._data(linha.get('data_nascimento') or '')
+            if not nome or not endereco or nascimento is None:
+                relatorio['linhas_invalidas'] += 1
+                continue
+            vistos.add(cpf)
+            novos.append(PessoaFisica(endereco, cpf, nome, nascimento))
+        
+        # Números de conta reservados em um único bloco para o lote inteiro
+        numeros = Conta.reservar_numeros(len(novos))
+        for cliente, numero in zip(novos, numeros):
+            self.caixa.adicionar_cliente(cliente)
+            self.caixa.adicionar_conta(self.classe_conta(cliente, numero, self.agencia))
+        relatorio['importados'] += len(novos)
+    
+    @staticmethod
+    def _data(texto: str):
+        texto = texto.strip()
+        try:
+            if '/' in texto:
+                dia, mes, ano = texto.split('/')
+                nascimento = date(int(ano), int(mes), int(dia))
+            else:
+                nascimento = date.fromisoformat(texto)
+        except ValueError:
+            return None
+        return nascimento if nascimento <= date.today() else None
+
+class ServidorCaixa:
+    """Servidor asyncio que atende sessões do caixa eletrônico via TCP
+    
+    O protocolo é de linhas JSON: cada requisição é um objeto com o campo "op"
+    ("login", "depositar", "sacar", "transferir", "extrato", "metricas" ou "sair") e cada resposta traz "ok".
+    Todas as operações, exceto "login" e "sair", exigem uma sessão autenticada.
+    Valores monetários são enviados como texto (por exemplo "10.50") para não perder precisão.
+    """
+    
+    def __init__(self, caixa: CaixaEletronico):
+        self.caixa = caixa
+        self.servico = caixa.servico
+        # Com cache, uma requisição pode ler e gravar no armazém: ela roda em uma thread
+        # para não parar o laço de eventos (e as demais sessões) durante a E/S
+        self.bloqueante = caixa.cache is not None
+        self.sessoes_ativas = 0
+    
+    async def iniciar(self, host: str = '127.0.0.1', porta: int = 8888):
+        """Inicia o servidor e retorna o objeto asyncio.Server"""
+        return await asyncio.start_server(self._atender, host, porta, limit=2**16)
+    
+    async def _atender(self, leitor: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        sessao = {'cliente': None, 'conta': None}
+        self.sessoes_ativas += 1
+        try:
+            while True:
+                try:
+                    linha = await leitor.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    # readline descarta o excesso e converte o estouro em ValueError; o restante da
+                    # linha ainda pode chegar, então a sessão é encerrada depois da resposta
+                    resposta = {'ok': False, 'codigo': CodigoResultado.OPERACAO_INVALIDA,
+                                'erro': "Requisição maior que o limite.", 'fim': True}
+                else:
+                    if not linha:
+                        break
+                    try:
+                        requisicao = json.loads(linha)
+                        if self.bloqueante:
+                            resposta = await asyncio.to_thread(self.processar, sessao, requisicao)
+                        else:
+                            resposta = self.processar(sessao, requisicao)
+                    except (ValueError, TypeError, KeyError, OverflowError, struct.error) as e:
+                        resposta = {'ok': False, 'codigo': CodigoResultado.OPERACAO_INVALIDA,
+                                    'erro': f"Requisição inválida: {e}"}
+                escritor.write(json.dumps(resposta, ensure_ascii=False).encode('utf-8') + b'\n')
+                await escritor.drain()
+                if resposta.get('fim'):
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.sessoes_ativas -= 1
+            self.servico.encerrar_sessao(sessao['cliente'])
+            escritor.close()
+    
+    def processar(self, sessao: dict, requisicao: dict) -> dict:
+        """Executa uma requisição no contexto da sessão e retorna a resposta"""
+        operacao = requisicao['op']
+        if operacao == 'login':
+            return self._login(sessao, requisicao)
+        if operacao == 'sair':
+            return {'ok': True, 'fim': True}
+        
+        conta = sessao['conta']
+        if conta is None:
+            return {'ok': False, 'erro': "É necessário fazer login primeiro."}
+        
+        if operacao == 'metricas':
+            metricas = Metricas.ativa
+            if metricas is None:
+                return {'ok': False, 'erro': "Instrumentação desativada."}
+            return {'ok': True, 'metricas': metricas.exportar_prometheus()}
+        
+        if operacao == 'depositar':
+            codigo = self.servico.depositar(conta, requisicao['valor'])
+            return self._resposta(codigo, conta)
+        if operacao == 'sacar':
+            codigo = self.servico.sacar(conta, requisicao['valor'])
+            return self._resposta(codigo, conta)
+        if operacao == 'transferir':
+            destino = self.servico.buscar_conta(int(requisicao['destino']))
+            if destino is None:
+                return self._resposta(CodigoResultado.CONTA_INEXISTENTE, conta)
+            codigo = self.servico.transferir(conta, destino, requisicao['valor'])
+            return self._resposta(codigo, conta)
+        if operacao == 'extrato':
+            codigo, transacoes = self.servico.consultar_extrato(conta)
+            if codigo != CodigoResultado.OK:
+                return self._resposta(codigo, conta)
+            return {
+                'ok': True,
+                'saldo': str(conta.saldo),
+                'transacoes': [
+                    {
+                        'data': transacao.data.isoformat(timespec='seconds'),
+                        'tipo': type(transacao).__name__,
+                        'valor': str(Dinheiro.para_reais(transacao.centavos)),
+                    }
+                    for transacao in transacoes
+                ],
+            }
+        return {'ok': False, 'erro': f"Operação desconhecida: {operacao}"}
+    
+    def _resposta(self, codigo: int, conta: Conta) -> dict:
+        if codigo == CodigoResultado.OK:
+            return {'ok': True, 'saldo': str(conta.saldo)}
+        return {'ok': False, 'codigo': codigo, 'erro': self.servico.mensagem(codigo, conta)}
+    
+    def _login(self, sessao: dict, requisicao: dict) -> dict:
+        cliente = self.servico.buscar_cliente(str(requisicao['cpf']))
+        if cliente is None:
+            return {'ok': False, 'erro': "CPF não cadastrado no sistema."}
+        if not cliente.contas:
+            return {'ok': False, 'erro': "Cliente não possui contas cadastradas."}
+        
+        numero = requisicao.get('conta')
+        if numero is None:
+            conta = cliente.contas[0]
+        else:
+            conta = cliente.obter_conta(int(numero))
+            if conta is None:
+                return {'ok': False, 'erro': "Conta não pertence ao cliente."}
+        if cliente is not sessao['cliente']:
+            self.servico.encerrar_sessao(sessao['cliente'])
+            self.servico.abrir_sessao(cliente)
+        sessao['cliente'] = cliente
+        sessao['conta'] = conta
+        return {'ok': True, 'nome': cliente.nome, 'conta': conta.numero,
+                'agencia': conta.agencia, 'saldo': str(conta.saldo)}
+
+def _executar_fragmento(conexao):
+    """Laço de um processo do LedgerFragmentado: é dono das contas do seu fragmento
+    
+    Cada pedido recebe exatamente uma resposta (erro, resultado): um erro ao processar
+    um pedido é devolvido ao roteador e o processo continua atendendo.
+    """
+    caixa = CaixaEletronico()
+    servico = caixa.servico
+    while True:
+        comando, dados = conexao.recv()
+        try:
+            if comando == 'lote':
+                resultado = servico.aplicar_lote(dados).tobytes()
+            elif comando == 'abrir':
+                classe_conta, linhas = dados
+                for cpf, nome, endereco, nascimento, numero in linhas:
+                    cliente = caixa.clientes.get(cpf)
+                    if cliente is None:
+                        cliente = PessoaFisica(endereco, cpf, nome, nascimento)
+                        caixa.adicionar_cliente(cliente)
+                    caixa.adicionar_conta(classe_conta(cliente, numero, "1001"))
+                resultado = None
+            elif comando == 'saldos':
+                resultado = {numero: caixa.contas[numero].saldo_centavos for numero in dados if numero in caixa.contas}
+            elif comando == 'parar':
+                conexao.send((None, None))
+                break
+            else:
+                raise ValueError(f"Comando desconhecido: {comando}")
+        except Exception as e:
+            conexao.send((f"{type(e).__name__}: {e}", None))
+        else:
+            conexao.send((None, resultado))
+
+class LedgerFragmentado:
+    """Distribui as contas entre processos para escapar do GIL
+    
+    Cada processo é dono de um fragmento (contas com (numero - 1) % fragmentos == i) e dos
+    respectivos objetos Conta/Historico; o roteador envia as operações pelo pipe do fragmento.
+    Os números das contas novas são reservados neste processo (Conta.reservar_numeros), então
+    não se repetem entre ledgers nem com as contas criadas localmente.
+    
+    Um erro em um fragmento vira RuntimeError só depois de recebidas as respostas de
+    todos os fragmentos envolvidos, para que os pipes continuem sincronizados. Se um
+    processo terminar, o ledger fica inoperante e as chamadas seguintes também falham.
+    """
+    
+    def __init__(self, fragmentos: int, classe_conta=ContaCorrente):
+        self.fragmentos = fragmentos
+        self.classe_conta = classe_conta
+        self._conexoes = []
+        self._processos = []
+        self._falha = None  # Motivo pelo qual o ledger ficou inoperante
+        for _ in range(fragmentos):
+            local, remota = multiprocessing.Pipe()
+            processo = multiprocessing.Process(target=_executar_fragmento, args=(remota,), daemon=True)
+            processo.start()
+            remota.close()
+            self._conexoes.append(local)
+            self._processos.append(processo)
+    
+    def fragmento(self, numero: int) -> int:
+        """Índice do fragmento dono da conta"""
+        return (numero - 1) % self.fragmentos
+    
+    def _pedir(self, pedidos: dict) -> dict:
+        """Envia {fragmento: (comando, dados)} a todos antes de esperar, e retorna {fragmento: resultado}"""
+        if self._falha is not None:
+            raise RuntimeError(f"LedgerFragmentado inoperante: {self._falha}")
+        erros = []
+        enviados = []
+        for indice, pedido in pedidos.items():
+            try:
+                self._conexoes[indice].send(pedido)
+                enviados.append(indice)
+            except OSError as e:
+                self._falha = f"fragmento {indice} encerrado ({e})"
+                erros.append(self._falha)
+        # Todas as respostas pendentes são lidas, mesmo depois de um erro
+        resultados = {}
+        for indice in enviados:
+            try:
+                erro, resultado = self._conexoes[indice].recv()
+            except (EOFError, OSError) as e:
+                self._falha = f"fragmento {indice} encerrado ({e or type(e).__name__})"
+                erros.append(self._falha)
+                continue
+            if erro is not None:
+                erros.append(f"fragmento {indice}: {erro}")
+            else:
+                resultados[indice] = resultado
+        if erros:
+            raise RuntimeError("; ".join(erros))
+        return resultados
+    
+    def abrir_contas(self, clientes: list) -> list:
+        """Abre uma conta para cada (cpf, nome, endereco, data_nascimento) e retorna os números
+        
+        O cliente fica no fragmento determinado pelo CPF (sem formatação), junto com todas as suas contas.
+        """
+        partes = [[] for _ in range(self.fragmentos)]
+        posicoes = [[] for _ in range(self.fragmentos)]
+        for posicao, (cpf, *dados) in enumerate(clientes):
+            cpf = Validacao.limpar_cpf(cpf)
+            if not cpf:
+                raise ValueError(f"CPF sem dígitos na posição {posicao}")
+            indice = int(cpf) % self.fragmentos
+            partes[indice].append((cpf, *dados))
+            posicoes[indice].append(posicao)
+        
+        numeros = [0] * len(clientes)
+        livres = self._reservar([len(parte) for parte in partes])
+        for indice, parte in enumerate(partes):
+            partes[indice] = [(*linha, numero) for linha, numero in zip(parte, livres[indice])]
+            for posicao, numero in zip(posicoes[indice], livres[indice]):
+                numeros[posicao] = numero
+        self._pedir({i: ('abrir', (self.classe_conta, partes[i])) for i in range(self.fragmentos) if partes[i]})
+        return numeros
+    
+    def _reservar(self, quantidades: list) -> list:
+        """Reserva no contador deste processo `quantidades[i]` números do fragmento i
+        
+        Os números do bloco reservado que sobram em algum fragmento ficam sem uso.
+        """
+        livres = [[] for _ in range(self.fragmentos)]
+        while True:
+            falta = max(quantidade - len(numeros) for quantidade, numeros in zip(quantidades, livres))
+            if falta <= 0:
+                return livres
+            aproveitados = 0
+            for numero in Conta.reservar_numeros(falta * self.fragmentos):
+                numeros = livres[self.fragmento(numero)]
+                if len(numeros) < quantidades[self.fragmento(numero)]:
+                    numeros.append(numero)
+                    aproveitados += 1
+            if not aproveitados:
+                raise RuntimeError("A numeração deste processo não alcança todos os fragmentos")
+    
+    def aplicar_lote(self, operacoes) -> array:
+        """Aplica (conta_numero, tipo, valor) nos fragmentos em paralelo; mesmo retorno de ServicoBancario.aplicar_lote"""
+        partes = [[] for _ in range(self.fragmentos)]
+        posicoes = [[] for _ in range(self.fragmentos)]
+        fragmentos = self.fragmentos
+        total = 0
+        for posicao, operacao in enumerate(operacoes):
+            indice = (operacao[0] - 1) % fragmentos
+            partes[indice].append(operacao)
+            posicoes[indice].append(posicao)
+            total = posicao + 1
+        
+        # Todas as partes são enviadas antes de esperar qualquer resposta: os fragmentos trabalham em paralelo
+        respostas = self._pedir({i: ('lote', partes[i]) for i in range(fragmentos) if partes[i]})
+        resultados = array('b', bytes(total))
+        for indice, resposta in respostas.items():
+            parcial = array('b')
+            parcial.frombytes(resposta)
+            for posicao, codigo in zip(posicoes[indice], parcial):
+                resultados[posicao] = codigo
+        return resultados
+    
+    def saldos(self, numeros: list) -> dict:
+        """Saldos em centavos das contas informadas"""
+        partes = [[] for _ in range(self.fragmentos)]
+        for numero in numeros:
+            partes[self.fragmento(numero)].append(numero)
+        saldos = {}
+        for resposta in self._pedir({i: ('saldos', partes[i]) for i in range(self.fragmentos) if partes[i]}).values():
+            saldos.update(resposta)
+        return saldos
+    
+    def fechar(self):
+        for conexao in self._conexoes:
+            try:
+                conexao.send(('parar', None))
+            except OSError:
+                pass  # Processo já encerrado
+        for conexao, processo in zip(self._conexoes, self._processos):
+            try:
+                conexao.recv()
+            except (EOFError, OSError):
+                pass
+            conexao.close()
+            processo.join(5)
+            if processo.is_alive():
+                processo.terminate()
+                processo.join()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.fechar()
+
+async def servir(caixa: CaixaEletronico, host: str, porta: int, porta_metricas: int = None):
+    """Executa o ServidorCaixa (e, opcionalmente, o endpoint de métricas) até ser interrompido"""
+    servidor = await ServidorCaixa(caixa).iniciar(host, porta)
+    print(f"Servidor do caixa eletrônico ouvindo em {host}:{porta}")
+    if porta_metricas is not None and Metricas.ativa is not None:
+        await Metricas.ativa.servir_http(host, porta_metricas)
+        print(f"Métricas em http://{host}:{porta_metricas}/metrics")
+    async with servidor:
+        await servidor.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Caixa eletrônico do sistema bancário")
+    parser.add_argument('--dados', help="diretório para persistir o estado (log + snapshot)")
+    parser.add_argument('--servidor', action='store_true', help="atende sessões via TCP em vez do terminal")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8888)
+    parser.add_argument('--armazem', metavar='ARQUIVO',
+                        help="guarda clientes e contas em SQLite, carregando-os sob demanda")
+    parser.add_argument('--cache', type=int, default=10_000, help="clientes mantidos em memória com --armazem")
+    parser.add_argument('--regras-fraude', metavar='ARQUIVO',
+                        help="JSON com as regras de velocidade avaliadas a cada saque")
+    parser.add_argument('--metricas', metavar='ARQUIVO',
+                        help="ativa a instrumentação e grava as métricas (formato Prometheus) neste arquivo")
+    parser.add_argument('--porta-metricas', type=int,
+                        help="com --servidor, expõe também GET /metrics nesta porta")
+    parser.add_argument('--eventos', metavar='DIRETORIO',
+                        help="publica os eventos do banco e os grava em um fluxo reproduzível neste diretório")
+    parser.add_argument('--exportar', metavar='DIRETORIO',
+                        help="exporta clientes, contas e transações novas em formato colunar e encerra")
+    parser.add_argument('--fragmentos-exportacao', type=int, default=4, help="arquivos gravados em paralelo com --exportar")
+    args = parser.parse_args(argv)
+    if args.dados and args.armazem:
+        parser.error("--dados e --armazem não podem ser usados juntos")
+    if args.exportar and args.armazem:
+        parser.error("--exportar exporta o estado em memória e não pode ser usado com --armazem")
+    
+    armazem = cache = motor = None
+    if args.armazem:
+        armazem = ArmazemSQLite(args.armazem)
+        cache = CacheContas(armazem, args.cache)
+        # Contas novas continuam depois das que já estão no armazém
+        Conta.configurar_numeracao(max(Conta.contador_contas, armazem.proximo_numero()), Conta.passo_contas)
+    caixa = CaixaEletronico(cache)
+    if args.regras_fraude:
+        motor = MotorFraude.de_arquivo(args.regras_fraude)
+        motor.instalar()
+    barramento = BarramentoEventos(caixa, args.eventos) if args.eventos else None
+    persistencia = None
+    if args.dados:
+        persistencia = Persistencia(caixa, args.dados)
+        persistencia.recuperar()
+    metricas = None
+    if args.metricas or args.porta_metricas is not None:
+        metricas = Metricas()
+        for fonte in (cache, motor):
+            if fonte is not None:
+                metricas.registrar_fonte(fonte)
+        metricas.ativar()
+        if args.metricas:
+            metricas.gravar_periodicamente(args.metricas)
+    
+    try:
+        if args.exportar:
+            relatorio = ExportadorColunar(caixa, args.exportar, args.fragmentos_exportacao).exportar()
+            print(f"Exportação {relatorio['exportacao']} ({relatorio['formato']}) em {relatorio['diretorio']}: "
+                  f"{relatorio['clientes']} clientes, {relatorio['contas']} contas, {relatorio['transacoes']} transações "
+                  f"em {relatorio['segundos']:.2f} s ({relatorio['transacoes_por_segundo']:,.0f} transações/s, "
+                  f"{relatorio['mib_por_segundo']:.1f} MiB/s)")
+        elif args.servidor:
+            asyncio.run(servir(caixa, args.host, args.porta, args.porta_metricas))
+        else:
+            executar_menu(caixa)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if metricas:
+            if args.metricas:
+                metricas.gravar(args.metricas)
+            metricas.desativar()
+            for fonte in metricas.fontes:
+                metricas.remover_fonte(fonte)
+        if motor:
+            motor.desinstalar()
+        if persistencia:
+            persistencia.fechar()
+        if barramento:
+            barramento.fechar()
+        if cache:
+            cache.fechar()
+            armazem.fechar()
+
+def executar_menu(caixa: CaixaEletronico):
+    """Laço principal do menu interativo"""
     while True:
         opcao = caixa.obter_opcao_menu()
         
@@ -0,0 +1,21 @@
+"""Benchmarks do sistema bancário
+
+Os scripts devem ser executados a partir da raiz do repositório, por exemplo:
+    python -m benchmarks.memoria_historico
+"""
+import importlib.util
+import sys
+from pathlib import Path
+
+_ARQUIVO_SISTEMA = Path(__file__).resolve().parent.parent / "16_desafio_sistema_bancario.py"
+
+
+def carregar_sistema():
+    """Importa o módulo do sistema bancário (o nome do arquivo não é um identificador válido)"""
+    if "sistema_bancario" in sys.modules:
+        return sys.modules["sistema_bancario"]
+    spec = importlib.util.spec_from_file_location("sistema_bancario", _ARQUIVO_SISTEMA)
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules["sistema_bancario"] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
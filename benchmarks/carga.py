@@ -0,0 +1,129 @@
+"""Gerador de carga sintética e reprodutível para o núcleo do sistema bancário
+
+Cria clientes PessoaFisica com ContaCorrente e históricos longos (em dias anteriores, para
+não consumir os limites de hoje) e gera sequências de operações com mistura configurável
+e contas "quentes" escolhidas por uma distribuição de Zipf. Para inspecionar a carga:
+    python -m benchmarks.carga -n 1000 --zipf 1.2
+"""
+import argparse
+import random
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from itertools import accumulate
+
+from benchmarks import carregar_sistema
+from benchmarks.importacao_clientes import gerar_cpf
+
+sb = carregar_sistema()
+
+MISTURA_PADRAO = {"deposito": 0.45, "saque": 0.45, "extrato": 0.10}
+SEM_LIMITE = 10**9
+
+
+def popular(clientes: int, historico_por_conta: int = 1000, dias_historico: int = 90,
+            semente: int = 42, classe_historico=None, limites_diarios: bool = False):
+    """Cadastra os clientes com uma ContaCorrente cada e retorna (caixa, contas)
+
+    Sem limites_diarios, os limites de ContaCorrente ficam altos o bastante para que
+    uma carga sustentada meça o caminho de sucesso, e não apenas as recusas.
+    """
+    aleatorio = random.Random(semente)
+    caixa = sb.CaixaEletronico()
+    classe_anterior = sb.Conta.classe_historico
+    if classe_historico is not None:
+        sb.Conta.classe_historico = classe_historico
+    inicio_historico = datetime.combine(date.today() - timedelta(days=dias_historico), time())
+    passo = timedelta(days=dias_historico - 1) / max(historico_por_conta, 1)
+    contas = []
+    try:
+        for i in range(clientes):
+            cliente = sb.PessoaFisica("Rua A, 1", gerar_cpf(aleatorio), f"Cliente {i}", date(1990, 1, 1))
+            caixa.adicionar_cliente(cliente)
+            numero = sb.Conta.reservar_numeros(1)[0]
+            if limites_diarios:
+                conta = sb.ContaCorrente(cliente, numero, "1001")
+            else:
+                conta = sb.ContaCorrente(cliente, numero, "1001", limite=SEM_LIMITE, limite_saques=SEM_LIMITE)
+                conta.limite_transacoes = SEM_LIMITE
+            caixa.adicionar_conta(conta)
+            preencher_historico(conta, historico_por_conta, inicio_historico, passo, aleatorio)
+            contas.append(conta)
+    finally:
+        sb.Conta.classe_historico = classe_anterior
+    return caixa, contas
+
+
+def preencher_historico(conta, quantidade: int, inicio: datetime, passo: timedelta, aleatorio: random.Random):
+    """Acrescenta transações antigas ao histórico, sem deixar o saldo negativo"""
+    historico = conta.historico
+    saldo = 0
+    data = inicio
+    for _ in range(quantidade):
+        centavos = aleatorio.randrange(100, 50_000)
+        if saldo >= centavos and aleatorio.random() < 0.4:
+            historico.adicionar_transacao(sb.Saque.de_centavos(centavos, data))
+            saldo -= centavos
+        else:
+            historico.adicionar_transacao(sb.Deposito.de_centavos(centavos, data))
+            saldo += centavos
+        data += passo
+    conta.recalcular_saldo()
+
+
+def gerar_operacoes(contas: list, quantidade: int, mistura: dict = None, zipf: float = 1.1,
+                    semente: int = 42) -> list:
+    """Gera (tipo, conta, valor em reais) com os tipos na proporção de `mistura`
+
+    A conta de cada operação segue uma distribuição de Zipf com expoente `zipf`
+    (0 = uniforme); quais contas são as quentes também depende da semente.
+    """
+    aleatorio = random.Random(semente)
+    mistura = mistura or MISTURA_PADRAO
+    tipos = list(mistura)
+    pesos_tipos = list(accumulate(mistura[tipo] for tipo in tipos))
+    ordem = list(contas)
+    aleatorio.shuffle(ordem)
+    pesos_contas = list(accumulate(1 / posicao**zipf for posicao in range(1, len(ordem) + 1)))
+
+    escolhidos = aleatorio.choices(tipos, cum_weights=pesos_tipos, k=quantidade)
+    alvos = aleatorio.choices(ordem, cum_weights=pesos_contas, k=quantidade)
+    return [
+        (tipo, conta, aleatorio.randrange(1, 200) if tipo != "extrato" else None)
+        for tipo, conta in zip(escolhidos, alvos)
+    ]
+
+
+def ler_mistura(texto: str) -> dict:
+    """Converte "deposito=0.5,saque=0.4,extrato=0.1" em dicionário"""
+    mistura = {}
+    for parte in texto.split(","):
+        tipo, _, peso = parte.partition("=")
+        if tipo.strip() not in MISTURA_PADRAO:
+            raise argparse.ArgumentTypeError(f"tipo de operação desconhecido: {tipo}")
+        mistura[tipo.strip()] = float(peso)
+    return mistura
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--clientes", type=int, default=1000)
+    parser.add_argument("--historico", type=int, default=1000, help="transações antigas por conta")
+    parser.add_argument("--operacoes", type=int, default=100_000)
+    parser.add_argument("--mistura", type=ler_mistura, default=MISTURA_PADRAO)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    _, contas = popular(args.clientes, args.historico, semente=args.semente)
+    operacoes = gerar_operacoes(contas, args.operacoes, args.mistura, args.zipf, args.semente)
+    por_tipo = Counter(tipo for tipo, _, _ in operacoes)
+    por_conta = Counter(conta.numero for _, conta, _ in operacoes)
+    quentes = por_conta.most_common(max(1, len(contas) // 100))
+
+    print(f"Clientes: {len(contas)} | transações no histórico: {sum(len(c.historico.transacoes) for c in contas)}")
+    print("Mistura: " + ", ".join(f"{tipo}={quantidade / len(operacoes):.1%}" for tipo, quantidade in por_tipo.items()))
+    print(f"1% de contas mais quentes recebem {sum(q for _, q in quentes) / len(operacoes):.1%} das operações")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Gerador de carga para o ServidorCaixa: mede latência p50/p99 e requisições por segundo
+
+Sem --host/--porta, sobe um servidor no próprio processo com clientes sintéticos.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date
+
+from benchmarks import carregar_sistema
+
+sb = carregar_sistema()
+
+
+def popular(caixa, clientes: int) -> list:
+    """Cadastra clientes sintéticos e retorna a lista de CPFs"""
+    cpfs = []
+    for i in range(clientes):
+        cpf = f"{i:011d}"
+        cliente = sb.PessoaFisica("Rua A, 1", cpf, f"Cliente {i}", date(1990, 1, 1))
+        caixa.adicionar_cliente(cliente)
+        # Conta simples para que os limites diários não recusem a carga
+        conta = sb.Conta.nova_conta(cliente)
+        caixa.adicionar_conta(conta)
+        conta.depositar(1_000_000)
+        cpfs.append(cpf)
+    return cpfs
+
+
+async def sessao(host: str, porta: int, cpf: str, requisicoes: int, latencias: list, semente: int):
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    aleatorio = random.Random(semente)
+
+    async def enviar(requisicao: dict) -> dict:
+        inicio = time.perf_counter()
+        escritor.write(json.dumps(requisicao).encode() + b"\n")
+        await escritor.drain()
+        resposta = json.loads(await leitor.readline())
+        latencias.append(time.perf_counter() - inicio)
+        return resposta
+
+    await enviar({"op": "login", "cpf": cpf})
+    for _ in range(requisicoes):
+        sorteio = aleatorio.random()
+        if sorteio < 0.45:
+            await enviar({"op": "depositar", "valor": 10})
+        elif sorteio < 0.9:
+            await enviar({"op": "sacar", "valor": 5})
+        else:
+            await enviar({"op": "extrato"})
+    await enviar({"op": "sair"})
+    escritor.close()
+
+
+def percentil(ordenados: list, p: float) -> float:
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def executar(args):
+    servidor = None
+    host, porta = args.host, args.porta
+    if host is None:
+        caixa = sb.CaixaEletronico()
+        cpfs = popular(caixa, args.clientes)
+        servidor = await sb.ServidorCaixa(caixa).iniciar("127.0.0.1", 0)
+        host, porta = servidor.sockets[0].getsockname()[:2]
+    else:
+        cpfs = args.cpfs
+
+    latencias = []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(
+        sessao(host, porta, cpfs[i % len(cpfs)], args.requisicoes, latencias, i)
+        for i in range(args.clientes)
+    ))
+    decorrido = time.perf_counter() - inicio
+
+    if servidor is not None:
+        servidor.close()
+        await servidor.wait_closed()
+
+    latencias.sort()
+    print(f"sessões simultâneas: {args.clientes}")
+    print(f"requisições: {len(latencias)} em {decorrido:.2f} s ({len(latencias) / decorrido:,.0f} req/s)")
+    print(f"latência p50: {percentil(latencias, 0.50) * 1000:.3f} ms")
+    print(f"latência p99: {percentil(latencias, 0.99) * 1000:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-c", "--clientes", type=int, default=500, help="sessões simultâneas")
+    parser.add_argument("-r", "--requisicoes", type=int, default=200, help="requisições por sessão")
+    parser.add_argument("--host", help="servidor externo (omitir para subir um servidor local)")
+    parser.add_argument("--porta", type=int, default=8888)
+    parser.add_argument("--cpfs", nargs="+", default=[], help="CPFs cadastrados no servidor externo")
+    args = parser.parse_args()
+    if args.host is not None and not args.cpfs:
+        parser.error("--cpfs é obrigatório ao usar um servidor externo")
+    asyncio.run(executar(args))
+
+
+if __name__ == "__main__":
+    main()
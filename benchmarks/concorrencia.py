@@ -0,0 +1,103 @@
+"""Teste de estresse: N threads operando sobre as mesmas contas
+
+Verifica que nenhum depósito/saque se perde, que os limites diários de ContaCorrente
+são respeitados e que Conta.nova_conta nunca repete um número.
+"""
+import argparse
+import random
+import threading
+import time
+from datetime import date
+
+from benchmarks import carregar_sistema
+
+sb = carregar_sistema()
+
+
+def executar(threads: int, operacoes: int, contas: list) -> tuple:
+    """Executa as operações em paralelo e retorna (segundos, saldo esperado em centavos)"""
+    movimentado = [0] * threads
+
+    def trabalhador(indice: int):
+        aleatorio = random.Random(indice)
+        total = 0
+        for _ in range(operacoes):
+            conta = aleatorio.choice(contas)
+            if aleatorio.random() < 0.5:
+                if conta.depositar(2):
+                    total += 200
+            elif conta.sacar(1):
+                total -= 100
+        movimentado[indice] = total
+
+    trabalhadores = [threading.Thread(target=trabalhador, args=(i,)) for i in range(threads)]
+    inicio = time.perf_counter()
+    for t in trabalhadores:
+        t.start()
+    for t in trabalhadores:
+        t.join()
+    return time.perf_counter() - inicio, sum(movimentado)
+
+
+def verificar_limites(threads: int) -> bool:
+    """Várias threads disputam a mesma ContaCorrente: os limites diários não podem ser furados"""
+    cliente = sb.PessoaFisica("Rua A, 1", "52998224725", "Cliente", date(1990, 1, 1))
+    conta = sb.ContaCorrente.nova_conta(cliente)
+    conta.depositar(1000)
+    barreira = threading.Barrier(threads)
+
+    def trabalhador():
+        barreira.wait()
+        for _ in range(10):
+            conta.sacar(1)
+
+    trabalhadores = [threading.Thread(target=trabalhador) for _ in range(threads)]
+    for t in trabalhadores:
+        t.start()
+    for t in trabalhadores:
+        t.join()
+    return (conta.historico.contar_hoje(sb.Saque) <= conta.limite_saques
+            and conta.historico.contar_hoje() <= conta.limite_transacoes)
+
+
+def verificar_numeracao(threads: int, por_thread: int) -> bool:
+    cliente = sb.PessoaFisica("Rua A, 1", "52998224725", "Cliente", date(1990, 1, 1))
+    numeros = []
+
+    def trabalhador():
+        for _ in range(por_thread):
+            numeros.append(sb.Conta.nova_conta(cliente).numero)
+
+    trabalhadores = [threading.Thread(target=trabalhador) for _ in range(threads)]
+    for t in trabalhadores:
+        t.start()
+    for t in trabalhadores:
+        t.join()
+    return len(set(numeros)) == len(numeros)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--operacoes", type=int, default=100_000, help="operações por thread")
+    parser.add_argument("-c", "--contas", type=int, default=8)
+    parser.add_argument("-t", "--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    for threads in args.threads:
+        cliente = sb.PessoaFisica("Rua A, 1", "52998224725", "Cliente", date(1990, 1, 1))
+        # Contas simples para que os limites diários não interrompam a carga
+        contas = [sb.Conta.nova_conta(cliente) for _ in range(args.contas)]
+        decorrido, esperado = executar(threads, args.operacoes, contas)
+        saldo = sum(conta.saldo_centavos for conta in contas)
+        correto = saldo == esperado
+        total = threads * args.operacoes
+        print(f"{threads:3d} threads: {total / decorrido:12,.0f} ops/s | "
+              f"saldo {'correto' if correto else f'INCORRETO ({saldo} != {esperado})'}")
+
+    maximo = max(args.threads)
+    print(f"limites diários respeitados: {'sim' if verificar_limites(maximo) else 'NÃO'}")
+    print(f"números de conta únicos: {'sim' if verificar_numeracao(maximo, 10_000) else 'NÃO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Exportação colunar do livro-razão: vazão de escrita por fragmento, completa e incremental
+
+Usa Parquet se o pyarrow estiver instalado e o formato SBC caso contrário. Exemplo:
+    python -m benchmarks.exportacao -n 2000 --historico 5000 -f 1 2 4 8
+"""
+import argparse
+import shutil
+import tempfile
+
+from benchmarks import carregar_sistema
+from benchmarks.carga import gerar_operacoes, popular
+
+sb = carregar_sistema()
+
+
+def imprimir(titulo: str, relatorio: dict):
+    print(f"{titulo:26} {relatorio['transacoes']:>12,} transações em {relatorio['segundos']:7.2f} s | "
+          f"{relatorio['transacoes_por_segundo']:>12,.0f} transações/s | {relatorio['mib_por_segundo']:7.1f} MiB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--clientes", type=int, default=1000)
+    parser.add_argument("--historico", type=int, default=2000, help="transações antigas por conta")
+    parser.add_argument("--operacoes", type=int, default=100_000, help="operações entre a exportação completa e a incremental")
+    parser.add_argument("-f", "--fragmentos", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("-b", "--tamanho-bloco", type=int, default=65_536)
+    parser.add_argument("--formato", choices=("parquet", "sbc"), help="padrão: parquet se o pyarrow estiver instalado")
+    parser.add_argument("--colunar", action="store_true", help="usa HistoricoColunar")
+    args = parser.parse_args()
+
+    classe_historico = sb.HistoricoColunar if args.colunar else sb.Historico
+    caixa, contas = popular(args.clientes, args.historico, classe_historico=classe_historico)
+    operacoes = gerar_operacoes(contas, args.operacoes)
+    for fragmentos in args.fragmentos:
+        diretorio = tempfile.mkdtemp(prefix="exportacao_")
+        try:
+            exportador = sb.ExportadorColunar(caixa, diretorio, fragmentos, args.tamanho_bloco, args.formato)
+            completa = exportador.exportar()
+            for tipo, conta, valor in operacoes:
+                if tipo == "deposito":
+                    conta.depositar(valor)
+                elif tipo == "saque":
+                    conta.sacar(valor)
+            incremental = exportador.exportar()
+        finally:
+            shutil.rmtree(diretorio)
+        print(f"formato {exportador.formato}, {fragmentos} fragmento(s):")
+        imprimir("  completa", completa)
+        imprimir("  incremental", incremental)
+
+
+if __name__ == "__main__":
+    main()
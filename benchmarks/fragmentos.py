@@ -0,0 +1,49 @@
+"""Vazão do LedgerFragmentado (operações por segundo) em função do número de processos"""
+import argparse
+import random
+import time
+from datetime import date
+
+from benchmarks import carregar_sistema
+
+sb = carregar_sistema()
+
+
+def medir(fragmentos: int, contas: int, operacoes: int, tamanho_lote: int) -> tuple:
+    """Retorna (ops/s, números de conta únicos?) para a quantidade de fragmentos"""
+    # Contas simples: os limites diários de ContaCorrente recusariam quase toda a carga
+    with sb.LedgerFragmentado(fragmentos, classe_conta=sb.Conta) as ledger:
+        clientes = [(f"{i:011d}", f"Cliente {i}", "Rua A, 1", date(1990, 1, 1)) for i in range(contas)]
+        numeros = ledger.abrir_contas(clientes)
+        ledger.aplicar_lote([(numero, "D", 1_000_000) for numero in numeros])
+
+        aleatorio = random.Random(7)
+        lotes = []
+        for _ in range(operacoes // tamanho_lote):
+            lotes.append([
+                (aleatorio.choice(numeros), "S" if aleatorio.random() < 0.5 else "D", 1)
+                for _ in range(tamanho_lote)
+            ])
+
+        inicio = time.perf_counter()
+        for lote in lotes:
+            ledger.aplicar_lote(lote)
+        decorrido = time.perf_counter() - inicio
+    return len(lotes) * tamanho_lote / decorrido, len(set(numeros)) == len(numeros)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-w", "--fragmentos", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("-c", "--contas", type=int, default=10_000)
+    parser.add_argument("-n", "--operacoes", type=int, default=1_000_000)
+    parser.add_argument("-l", "--tamanho-lote", type=int, default=50_000)
+    args = parser.parse_args()
+
+    for fragmentos in args.fragmentos:
+        vazao, unicos = medir(fragmentos, args.contas, args.operacoes, args.tamanho_lote)
+        print(f"{fragmentos:3d} processos: {vazao:12,.0f} ops/s | números únicos: {'sim' if unicos else 'NÃO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Importação em massa de clientes via CSV: mede linhas por segundo e pico de memória"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+
+from benchmarks import carregar_sistema
+
+sb = carregar_sistema()
+
+
+def gerar_cpf(aleatorio: random.Random) -> str:
+    """Gera um CPF com dígitos verificadores válidos"""
+    digitos = [aleatorio.randrange(10) for _ in range(9)]
+    for pesos in (range(10, 1, -1), range(11, 1, -1)):
+        digitos.append(sum(d * p for d, p in zip(digitos, pesos)) * 10 % 11 % 10)
+    return ''.join(map(str, digitos))
+
+
+def gerar_csv(caminho: str, linhas: int, semente: int = 42):
+    """Gera um CSV com ~2% de CPFs inválidos e ~1% de duplicados"""
+    aleatorio = random.Random(semente)
+    anteriores = []
+    with open(caminho, "w", newline="", encoding="utf-8") as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(["cpf", "nome", "endereco", "data_nascimento"])
+        for i in range(linhas):
+            sorteio = aleatorio.random()
+            if sorteio < 0.02:
+                cpf = f"{aleatorio.randrange(10**11):011d}"
+            elif sorteio < 0.03 and anteriores:
+                cpf = aleatorio.choice(anteriores)
+            else:
+                cpf = gerar_cpf(aleatorio)
+                if len(anteriores) < 10_000:
+                    anteriores.append(cpf)
+            escritor.writerow([
+                f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}",
+                f"Cliente {i}",
+                f"Rua {i % 1000}, {i % 97}",
+                f"{1950 + i % 50}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--linhas", type=int, default=200_000)
+    parser.add_argument("-l", "--tamanho-lote", type=int, default=10_000)
+    parser.add_argument("--memoria", action="store_true", help="mede o pico de memória (mais lento)")
+    args = parser.parse_args()
+
+    descritor, caminho = tempfile.mkstemp(suffix=".csv")
+    os.close(descritor)
+    try:
+        gerar_csv(caminho, args.linhas)
+        caixa = sb.CaixaEletronico()
+        importador = sb.ImportadorClientes(caixa, tamanho_lote=args.tamanho_lote)
+        relatorio = importador.importar(caminho, medir_memoria=args.memoria)
+    finally:
+        os.remove(caminho)
+
+    print(f"validação vetorizada (NumPy): {'sim' if sb.np is not None else 'não'}")
+    for chave in ("linhas", "importados", "cpf_invalido", "duplicados", "linhas_invalidas"):
+        print(f"{chave:>18}: {relatorio[chave]}")
+    print(f"{'linhas/s':>18}: {relatorio['linhas_por_segundo']:,.0f}")
+    if "pico_memoria" in relatorio:
+        print(f"{'pico de memória':>18}: {relatorio['pico_memoria'] / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Compara o consumo de memória do Historico em lista com o HistoricoColunar e o HistoricoEscalonado"""
+import argparse
+import gc
+import tracemalloc
+
+from benchmarks import carregar_sistema
+
+sb = carregar_sistema()
+
+
+def medir(classe_historico, quantidade: int) -> int:
+    """Retorna os bytes alocados para guardar `quantidade` transações"""
+    gc.collect()
+    tracemalloc.start()
+    historico = classe_historico()
+    for i in range(quantidade):
+        # Cada transação recebe o próprio datetime, como no uso real
+        if i % 2:
+            historico.adicionar_transacao(sb.Saque(10.0))
+        else:
+            historico.adicionar_transacao(sb.Deposito(25.5))
+    atual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del historico
+    return atual
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--transacoes", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    lista = medir(sb.Historico, args.transacoes)
+    colunar = medir(sb.HistoricoColunar, args.transacoes)
+    escalonado = medir(sb.HistoricoEscalonado, args.transacoes)
+
+    print(f"Transações: {args.transacoes}")
+    print(f"Historico (lista de objetos): {lista / 2**20:8.1f} MiB ({lista / args.transacoes:.1f} B/transação)")
+    print(f"HistoricoColunar:             {colunar / 2**20:8.1f} MiB ({colunar / args.transacoes:.1f} B/transação)")
+    print(f"HistoricoEscalonado:          {escalonado / 2**10:8.1f} KiB (janela de {sb.HistoricoEscalonado.JANELA} em memória)")
+    print(f"Redução: {lista / colunar:.1f}x (colunar) | {lista / escalonado:.0f}x (escalonado)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Vazão, latência por operação e memória do núcleo, com linhas de base em JSON
+
+Mede Conta.depositar, ContaCorrente.sacar, Historico.obter_transacoes_hoje, a geração
+do extrato completo (todas as páginas) e uma carga mista sobre contas quentes (ver benchmarks.carga). Exemplos:
+    python -m benchmarks.nucleo --salvar base.json
+    python -m benchmarks.nucleo --comparar base.json --tolerancia 0.15
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime, timedelta
+
+from benchmarks import carregar_sistema
+from benchmarks.carga import MISTURA_PADRAO, gerar_operacoes, ler_mistura, popular
+
+sb = carregar_sistema()
+
+# Métricas usadas na comparação: True quando valores maiores são melhores
+METRICAS_COMPARADAS = {
+    "ops_por_segundo": True,
+    "p50_ns": False,
+    "p99_ns": False,
+    "bytes_por_transacao": False,
+}
+
+
+def cronometrar(preparar, repeticoes: int = 1) -> dict:
+    """Executa as funções sem argumentos retornadas por preparar() medindo cada uma
+
+    preparar é chamada antes de cada repetição: operações que alteram as contas precisam
+    de uma população nova, e não da deixada pela repetição anterior. Com várias
+    repetições, fica a de maior vazão (a menos afetada por ruído da máquina).
+    """
+    return max((_cronometrar(list(preparar())) for _ in range(repeticoes)), key=lambda r: r["ops_por_segundo"])
+
+
+def _cronometrar(chamadas: list) -> dict:
+    histograma = sb.HistogramaLatencia()
+    relogio = time.perf_counter_ns
+    gc.collect()
+    gc.disable()
+    try:
+        inicio = relogio()
+        for chamada in chamadas:
+            antes = relogio()
+            chamada()
+            histograma.registrar(relogio() - antes)
+        total = relogio() - inicio
+    finally:
+        gc.enable()
+    return {
+        "operacoes": histograma.contagem,
+        "ops_por_segundo": round(histograma.contagem / (total / 1e9), 1) if total else 0.0,
+        "p50_ns": histograma.percentil(50),
+        "p99_ns": histograma.percentil(99),
+        "p999_ns": histograma.percentil(99.9),
+        "maximo_ns": histograma.maximo,
+    }
+
+
+def executar(args) -> dict:
+    """Monta a população, roda todos os benchmarks e retorna o relatório"""
+    classe_historico = sb.HistoricoColunar if args.colunar else sb.Historico
+    gc.collect()
+    tracemalloc.start()
+    caixa, contas = popular(args.clientes, args.historico, semente=args.semente,
+                            classe_historico=classe_historico)
+    alocado, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    transacoes = sum(len(conta.historico.transacoes) for conta in contas)
+
+    semana = datetime.now() - timedelta(days=7)
+
+    def montar() -> tuple:
+        """População e carga novas; a mesma semente gera sempre os mesmos dados"""
+        caixa, contas = popular(args.clientes, args.historico, semente=args.semente,
+                                classe_historico=classe_historico)
+        return caixa.servico, gerar_operacoes(contas, args.operacoes, args.mistura, args.zipf, args.semente)
+
+    def extrato_completo(servico, conta):
+        deque(servico.paginar_extrato(conta, semana), maxlen=0)
+
+    def depositos():
+        _, operacoes = montar()
+        return [lambda c=c, v=v: c.depositar(v) for tipo, c, v in operacoes if tipo == "deposito"]
+
+    def saques():
+        _, operacoes = montar()
+        return [lambda c=c, v=v: c.sacar(v) for tipo, c, v in operacoes if tipo == "saque"]
+
+    def carga_mista():
+        servico, operacoes = montar()
+        chamadas = []
+        for tipo, conta, valor in operacoes:
+            if tipo == "deposito":
+                chamadas.append(lambda c=conta, v=valor: servico.depositar(c, v))
+            elif tipo == "saque":
+                chamadas.append(lambda c=conta, v=valor: servico.sacar(c, v))
+            else:
+                chamadas.append(lambda c=conta: extrato_completo(servico, c))
+        return chamadas
+
+    # As leituras não alteram as contas: usam a população medida acima em todas as repetições
+    servico = caixa.servico
+    operacoes = gerar_operacoes(contas, args.operacoes, args.mistura, args.zipf, args.semente)
+    extratos = [conta for _, conta, _ in operacoes[:args.extratos]]
+    del operacoes
+
+    r = args.repeticoes
+    resultados = {
+        "depositar": cronometrar(depositos, r),
+        "sacar": cronometrar(saques, r),
+        "obter_transacoes_hoje": cronometrar(
+            lambda: [lambda c=c: c.historico.obter_transacoes_hoje() for c in extratos], r),
+        "extrato": cronometrar(lambda: [lambda c=c: extrato_completo(servico, c) for c in extratos], r),
+        "carga_mista": cronometrar(carga_mista, r),
+    }
+    return {
+        "parametros": {
+            "clientes": args.clientes,
+            "historico": args.historico,
+            "operacoes": args.operacoes,
+            "extratos": args.extratos,
+            "mistura": args.mistura,
+            "zipf": args.zipf,
+            "semente": args.semente,
+            "colunar": args.colunar,
+            "repeticoes": args.repeticoes,
+        },
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "numpy": sb.np is not None,
+        },
+        "memoria": {
+            "transacoes": transacoes,
+            "bytes_por_transacao": round(alocado / max(transacoes, 1), 1),
+            "pico_mib": round(pico / 2**20, 1),
+        },
+        "resultados": resultados,
+    }
+
+
+def comparar(atual: dict, base: dict, tolerancia: float) -> list:
+    """Lista (métrica, base, atual, variação) das métricas que pioraram além da tolerância"""
+    if atual["parametros"] != base["parametros"]:
+        print("Aviso: os parâmetros diferem da linha de base; a comparação pode não ser justa")
+    grupos = dict(atual["resultados"], memoria=atual["memoria"])
+    grupos_base = dict(base["resultados"], memoria=base["memoria"])
+    regressoes = []
+    for grupo, medidas in grupos.items():
+        for metrica, maior_melhor in METRICAS_COMPARADAS.items():
+            anterior = grupos_base.get(grupo, {}).get(metrica)
+            if metrica not in medidas or not anterior:
+                continue
+            variacao = medidas[metrica] / anterior - 1
+            piorou = -variacao if maior_melhor else variacao
+            marca = "REGRESSÃO" if piorou > tolerancia else ""
+            print(f"{grupo + '.' + metrica:38} {anterior:>14,.1f} -> {medidas[metrica]:>14,.1f} {variacao:+8.1%} {marca}")
+            if marca:
+                regressoes.append((f"{grupo}.{metrica}", anterior, medidas[metrica], variacao))
+    return regressoes
+
+
+def imprimir(relatorio: dict):
+    memoria = relatorio["memoria"]
+    print(f"Transações no histórico: {memoria['transacoes']:,} | "
+          f"{memoria['bytes_por_transacao']} B/transação | pico {memoria['pico_mib']} MiB")
+    for nome, medidas in relatorio["resultados"].items():
+        print(f"{nome:22} {medidas['ops_por_segundo']:>12,.0f} ops/s | p50 {medidas['p50_ns'] / 1000:8.1f} µs"
+              f" | p99 {medidas['p99_ns'] / 1000:8.1f} µs | p99.9 {medidas['p999_ns'] / 1000:8.1f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--clientes", type=int, default=1000)
+    parser.add_argument("--historico", type=int, default=1000, help="transações antigas por conta")
+    parser.add_argument("--operacoes", type=int, default=200_000)
+    parser.add_argument("--extratos", type=int, default=2000)
+    parser.add_argument("--mistura", type=ler_mistura, default=MISTURA_PADRAO)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--colunar", action="store_true", help="usa HistoricoColunar")
+    parser.add_argument("-r", "--repeticoes", type=int, default=3, help="mantém a melhor de R execuções")
+    parser.add_argument("--salvar", metavar="ARQUIVO", help="grava o relatório como linha de base JSON")
+    parser.add_argument("--comparar", metavar="ARQUIVO", help="compara com uma linha de base salva")
+    parser.add_argument("--tolerancia", type=float, default=0.10,
+                        help="piora relativa aceita antes de acusar regressão (padrão: 0.10)")
+    args = parser.parse_args()
+
+    relatorio = executar(args)
+    imprimir(relatorio)
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+        print(f"Linha de base gravada em {args.salvar}")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            base = json.load(arquivo)
+        print()
+        regressoes = comparar(relatorio, base, args.tolerancia)
+        if regressoes:
+            print(f"{len(regressoes)} regressão(ões) acima de {args.tolerancia:.0%}")
+            sys.exit(1)
+        print("Sem regressões.")
+
+
+if __name__ == "__main__":
+    main()
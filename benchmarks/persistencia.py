@@ -0,0 +1,91 @@
+"""Mede a vazão do log de escrita antecipada e o tempo de recuperação do CaixaEletronico
+
+Compara fsync a cada registro com o commit em grupo (fsync em lote).
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from datetime import date
+
+from benchmarks import carregar_sistema
+
+sb = carregar_sistema()
+
+
+def popular(diretorio: str, operacoes: int, contas: int, fsync_em_lote: bool, intervalo_snapshot: int) -> float:
+    """Executa as operações com a persistência ativa e retorna as operações por segundo"""
+    sb.Conta.contador_contas = 1
+    caixa = sb.CaixaEletronico()
+    persistencia = sb.Persistencia(caixa, diretorio, fsync_em_lote=fsync_em_lote,
+                                   intervalo_snapshot=intervalo_snapshot)
+    persistencia.recuperar()
+
+    lista_contas = []
+    for i in range(contas):
+        cliente = sb.PessoaFisica("Rua A, 1", f"{i:011d}", f"Cliente {i}", date(1990, 1, 1))
+        caixa.adicionar_cliente(cliente)
+        # Conta simples: os limites diários de ContaCorrente barrariam a carga
+        conta = sb.Conta.nova_conta(cliente)
+        caixa.adicionar_conta(conta)
+        lista_contas.append(conta)
+
+    inicio = time.perf_counter()
+    for i in range(operacoes):
+        conta = lista_contas[i % contas]
+        if i % 3 == 2:
+            conta.sacar(1)
+        else:
+            conta.depositar(2)
+    persistencia.sincronizar()
+    decorrido = time.perf_counter() - inicio
+    persistencia.fechar()
+    return operacoes / decorrido
+
+
+def recuperar(diretorio: str) -> tuple:
+    """Recupera o estado do diretório e retorna (segundos, registros reaplicados)"""
+    sb.Conta.contador_contas = 1
+    caixa = sb.CaixaEletronico()
+    persistencia = sb.Persistencia(caixa, diretorio)
+    inicio = time.perf_counter()
+    reaplicados = persistencia.recuperar()
+    decorrido = time.perf_counter() - inicio
+    persistencia.fechar()
+    return decorrido, reaplicados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--operacoes", type=int, default=100_000)
+    parser.add_argument("--operacoes-fsync", type=int, default=2_000,
+                        help="operações no modo fsync por registro (bem mais lento)")
+    parser.add_argument("-c", "--contas", type=int, default=1_000)
+    args = parser.parse_args()
+
+    cenarios = (
+        ("fsync por registro", False, args.operacoes_fsync),
+        ("commit em grupo", True, args.operacoes),
+    )
+    for nome, em_lote, operacoes in cenarios:
+        diretorio = tempfile.mkdtemp(prefix="bench_wal_")
+        try:
+            # Sem snapshot durante a carga: a recuperação reaplica o log inteiro
+            vazao = popular(diretorio, operacoes, args.contas, em_lote, intervalo_snapshot=10**12)
+            tempo_log, reaplicados = recuperar(diretorio)
+            print(f"{nome:>20}: {vazao:12,.0f} ops/s | recuperação só com log: "
+                  f"{tempo_log:.3f} s ({reaplicados} registros)")
+        finally:
+            shutil.rmtree(diretorio)
+
+    diretorio = tempfile.mkdtemp(prefix="bench_wal_")
+    try:
+        popular(diretorio, args.operacoes, args.contas, True, intervalo_snapshot=args.operacoes // 2)
+        tempo_snapshot, reaplicados = recuperar(diretorio)
+        print(f"{'snapshot + cauda':>20}: recuperação em {tempo_snapshot:.3f} s ({reaplicados} registros reaplicados)")
+    finally:
+        shutil.rmtree(diretorio)
+
+
+if __name__ == "__main__":
+    main()
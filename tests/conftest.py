@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks import carregar_sistema  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def sb():
+    """Módulo do sistema bancário"""
+    return carregar_sistema()
+
+
+@pytest.fixture(autouse=True)
+def estado_limpo(sb):
+    """Isola o estado global das classes (numeração, histórico e motor de fraude)"""
+    sb.Conta.configurar_numeracao(1, 1)
+    classe_historico = sb.Conta.classe_historico
+    yield
+    sb.Conta.configurar_numeracao(1, 1)
+    sb.Conta.classe_historico = classe_historico
+    sb.Conta.motor_fraude = None
+
+
+@pytest.fixture
+def caixa(sb):
+    return sb.CaixaEletronico()
+
+
+@pytest.fixture
+def abrir_conta(sb, caixa):
+    """Cria um cliente com uma ContaCorrente no caixa e retorna a conta"""
+    cpfs = iter(["52998224725", "11144477735", "39053344705", "71428793860", "87748248800"])
+
+    def abrir(saldo=0, classe=None, **opcoes):
+        cliente = sb.PessoaFisica("Rua A, 1", next(cpfs), "Fulano de Tal", sb.date(1990, 1, 1))
+        caixa.adicionar_cliente(cliente)
+        classe = classe or sb.ContaCorrente
+        conta = classe(cliente, sb.Conta.reservar_numeros(1)[0], "1001", **opcoes)
+        caixa.adicionar_conta(conta)
+        if saldo:
+            assert conta.depositar(saldo)
+        return conta
+    return abrir
@@ -0,0 +1,85 @@
+from datetime import date, datetime, timedelta
+
+
+def test_dias_antigos_ficam_so_nos_totais_mensais(sb):
+    agregados = sb.AgregadosTransacoes()
+    hoje = date.today()
+    antigo = hoje - timedelta(days=sb.AgregadosTransacoes.DIAS_RETIDOS + 1)
+    agregados.adicionar(sb.Deposito, antigo, 100)
+    assert agregados.dia(antigo) == (0, 0)
+    assert agregados.mes(antigo.year, antigo.month, sb.Deposito) == (1, 100)
+    assert antigo not in agregados.por_dia
+
+
+def test_dias_que_saem_da_retencao_sao_descartados(sb, monkeypatch):
+    agregados = sb.AgregadosTransacoes()
+    hoje = date.today()
+    agregados.adicionar(sb.Saque, hoje - timedelta(days=3), 10)
+    monkeypatch.setattr(sb.AgregadosTransacoes, "DIAS_RETIDOS", 2)
+    agregados.adicionar(sb.Saque, hoje, 20)
+    assert list(agregados.por_dia) == [hoje]
+    assert sum(centavos for totais in agregados.por_mes.values() for _, centavos in totais.values()) == 30
+
+
+def test_transferencias_separadas_por_sentido(sb, abrir_conta):
+    origem, destino = abrir_conta(100), abrir_conta()
+    assert origem.executar_transferencia(destino, 30) == sb.CodigoResultado.OK
+    hoje = date.today()
+    enviadas = origem.historico.agregados
+    assert enviadas.mes(hoje.year, hoje.month, sb.AgregadosTransacoes.ENVIADA) == (1, 3000)
+    assert enviadas.mes(hoje.year, hoje.month, sb.AgregadosTransacoes.RECEBIDA) == (0, 0)
+    recebidas = destino.historico.agregados
+    assert recebidas.dia(hoje, sb.AgregadosTransacoes.RECEBIDA) == (1, 3000)
+    assert recebidas.dia(hoje, sb.Transferencia) == (1, 3000)
+
+
+def test_agencia_inclui_o_historico_reaplicado(sb, caixa, abrir_conta, tmp_path):
+    persistencia = sb.Persistencia(caixa, str(tmp_path))
+    persistencia.recuperar()
+    origem, destino = abrir_conta(100), abrir_conta()
+    assert origem.executar_transferencia(destino, 40) == sb.CodigoResultado.OK
+    persistencia.fechar()
+
+    sb.Conta.configurar_numeracao(1, 1)
+    recuperado = sb.CaixaEletronico()
+    persistencia = sb.Persistencia(recuperado, str(tmp_path))
+    persistencia.recuperar()
+    try:
+        agencia = sb.AgregadosAgencia(recuperado)
+        hoje = date.today()
+        assert agencia.totais_mes("1001", hoje.year, hoje.month, sb.Deposito) == (1, 10000)
+        assert agencia.totais_dia("1001", hoje, sb.AgregadosTransacoes.ENVIADA) == (1, 4000)
+        assert agencia.totais_dia("1001", hoje, sb.Transferencia) == (2, 8000)
+    finally:
+        persistencia.fechar()
+
+
+def test_agencia_no_modo_cache_soma_armazem_e_pendentes(sb, tmp_path):
+    armazem = sb.ArmazemSQLite(str(tmp_path / "contas.db"))
+    cache = sb.CacheContas(armazem, capacidade=1, intervalo_sincronizacao=None)
+    try:
+        caixa = sb.CaixaEletronico(cache)
+        contas = []
+        for cpf in ("52998224725", "11144477735"):
+            cliente = sb.PessoaFisica("Rua A, 1", cpf, "Fulano", sb.date(1990, 1, 1))
+            caixa.adicionar_cliente(cliente)
+            conta = sb.Conta.nova_conta(cliente)
+            caixa.adicionar_conta(conta)
+            contas.append(conta)
+        antiga = datetime.now() - timedelta(days=40)
+        assert contas[0].depositar(10)
+        contas[0].historico.adicionar_transacao(sb.Deposito.de_centavos(700, antiga))
+        assert contas[1].depositar(20)  # Tira a primeira conta do cache: gravada no armazém
+        assert contas[1].sacar(5)  # Pendente em memória
+        numero_agencia = contas[0].agencia
+
+        agencia = sb.AgregadosAgencia(caixa)
+        hoje = date.today()
+        assert agencia.totais_dia(numero_agencia, hoje, sb.Deposito) == (2, 3000)
+        assert agencia.totais_dia(numero_agencia, hoje, sb.Saque) == (1, 500)
+        assert agencia.totais_mes(numero_agencia, antiga.year, antiga.month, sb.Deposito) == (1, 700)
+        assert contas[0].depositar(1)  # Depois da carga, contado uma única vez pelo evento
+        assert agencia.totais_dia(numero_agencia, hoje, sb.Deposito) == (3, 3100)
+    finally:
+        cache.fechar()
+        armazem.fechar()
@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+CPFS = ["52998224725", "11144477735", "39053344705"]
+
+
+@pytest.fixture
+def armazem(sb, tmp_path):
+    armazem = sb.ArmazemSQLite(str(tmp_path / "contas.db"))
+    yield armazem
+    armazem.fechar()
+
+
+@pytest.fixture
+def abrir_caixa(sb, armazem):
+    caches = []
+
+    def abrir(capacidade=10, intervalo_sincronizacao=None):
+        cache = sb.CacheContas(armazem, capacidade, intervalo_sincronizacao)
+        caches.append(cache)
+        return sb.CaixaEletronico(cache)
+    yield abrir
+    for cache in caches:
+        cache.fechar()
+
+
+def cadastrar(sb, caixa, cpf, saldo=0):
+    cliente = sb.PessoaFisica("Rua A, 1", cpf, "Fulano", sb.date(1990, 1, 1))
+    caixa.adicionar_cliente(cliente)
+    conta = sb.ContaCorrente.nova_conta(cliente)
+    caixa.adicionar_conta(conta)
+    if saldo:
+        assert conta.depositar(saldo)
+    return conta
+
+
+def saldo_gravado(sb, armazem, cpf):
+    cliente = sb.ArmazemSQLite(armazem.caminho).carregar_cliente(cpf)
+    return cliente.contas[0].saldo_centavos
+
+
+def test_lote_encontra_contas_que_so_estao_no_armazem(sb, abrir_caixa, armazem):
+    caixa = abrir_caixa()
+    numero = cadastrar(sb, caixa, CPFS[0], 100).numero
+    caixa.cache.fechar()
+
+    caixa = abrir_caixa()  # Cache vazio: a conta existe apenas no armazém
+    assert caixa.contas == {}
+    resultados = caixa.aplicar_lote([(numero, 'S', 30), (numero, 'D', 5), (999, 'D', 1)])
+    assert list(resultados) == [sb.CodigoResultado.OK, sb.CodigoResultado.OK, sb.CodigoResultado.CONTA_INEXISTENTE]
+    assert caixa.servico.auditar_saldos() == []
+    caixa.cache.sincronizar()
+    assert saldo_gravado(sb, armazem, CPFS[0]) == 7500
+
+
+def test_historico_e_carregado_so_no_primeiro_acesso(sb, abrir_caixa):
+    caixa = abrir_caixa()
+    cadastrar(sb, caixa, CPFS[0], 100)
+    caixa.cache.fechar()
+
+    conta = abrir_caixa().obter_cliente(CPFS[0]).contas[0]
+    assert 'historico' not in vars(conta)
+    assert conta.saldo_centavos == 10000
+    assert len(conta.historico.transacoes) == 1
+    assert 'historico' in vars(conta)
+
+
+def test_conta_antiga_em_uso_nao_perde_movimentos(sb, abrir_caixa, armazem):
+    caixa = abrir_caixa(capacidade=1)
+    antiga = cadastrar(sb, caixa, CPFS[0], 100)
+    cadastrar(sb, caixa, CPFS[1])  # Tira o primeiro cliente do cache
+    assert antiga.numero not in caixa.cache._contas
+
+    assert antiga.sacar(10)  # Movimento na referência guardada fora do cache
+    recarregada = caixa.obter_conta(antiga.numero)
+    assert recarregada is antiga
+    assert recarregada.depositar(1)
+    caixa.cache.sincronizar()
+    assert saldo_gravado(sb, armazem, CPFS[0]) == 9100
+    assert caixa.servico.auditar_saldos() == []
+
+
+def test_saldos_pendentes_sao_gravados_periodicamente(sb, abrir_caixa, armazem):
+    caixa = abrir_caixa(intervalo_sincronizacao=0.01)
+    conta = cadastrar(sb, caixa, CPFS[0])
+    assert conta.depositar(42)
+    limite = time.monotonic() + 5
+    while saldo_gravado(sb, armazem, CPFS[0]) != 4200 and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert saldo_gravado(sb, armazem, CPFS[0]) == 4200
+
+
+def test_persistencia_recusa_caixa_com_cache(sb, abrir_caixa, tmp_path):
+    with pytest.raises(ValueError):
+        sb.Persistencia(abrir_caixa(), str(tmp_path / "dados"))
@@ -0,0 +1,53 @@
+import sys
+import threading
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def trocas_frequentes():
+    """Troca de thread a cada poucos microssegundos, para expor disputas"""
+    intervalo = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(intervalo)
+
+
+def em_paralelo(funcao, threads: int = 8) -> list:
+    """Executa funcao() em várias threads liberadas ao mesmo tempo e retorna os resultados"""
+    barreira = threading.Barrier(threads)
+    resultados = [None] * threads
+
+    def trabalhador(indice):
+        barreira.wait()
+        resultados[indice] = funcao()
+
+    trabalhadores = [threading.Thread(target=trabalhador, args=(i,)) for i in range(threads)]
+    for thread in trabalhadores:
+        thread.start()
+    for thread in trabalhadores:
+        thread.join()
+    return resultados
+
+
+def test_depositos_simultaneos_nao_se_perdem(sb, abrir_conta):
+    conta = abrir_conta(classe=sb.Conta)
+    em_paralelo(lambda: [conta.depositar("0.01") for _ in range(500)])
+    assert conta.saldo_centavos == 8 * 500
+    assert len(conta.historico.transacoes) == 8 * 500
+    assert conta.recalcular_saldo() == 8 * 500
+
+
+def test_limites_diarios_valem_entre_threads(sb, abrir_conta):
+    conta = abrir_conta(1000)
+    saques = em_paralelo(lambda: sum(conta.sacar(1) for _ in range(5)))
+    assert sum(saques) == conta.limite_saques
+    assert conta.historico.contar_hoje(sb.Saque) == conta.limite_saques
+
+
+def test_numeros_de_conta_reservados_sao_unicos(sb):
+    blocos = [bloco for resultado in em_paralelo(lambda: [sb.Conta.reservar_numeros(3) for _ in range(200)])
+              for bloco in resultado]
+    assert all(len(bloco) == 3 for bloco in blocos)
+    numeros = [numero for bloco in blocos for numero in bloco]
+    assert len(set(numeros)) == len(numeros) == 8 * 200 * 3
@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+import pytest
+
+
+@pytest.mark.parametrize("valor, centavos", [
+    (10, 1000),
+    ("10.50", 1050),
+    ("10,5", 1050),
+    ("1.000", 100),
+    (Decimal("0.01"), 1),
+    (0.1, 10),
+    (19.99, 1999),
+    ("-3.25", -325),
+])
+def test_para_centavos_converte_valores_exatos(sb, valor, centavos):
+    assert sb.Dinheiro.para_centavos(valor) == centavos
+
+
+@pytest.mark.parametrize("valor", ["0.005", "10.005", 0.005, Decimal("1.001"), "abc", "NaN", "Infinity", ""])
+def test_para_centavos_recusa_sem_arredondar(sb, valor):
+    with pytest.raises(ValueError):
+        sb.Dinheiro.para_centavos(valor)
+
+
+@pytest.mark.parametrize("valor", ["1e20", 10 ** 14, -(10 ** 14), 1e16])
+def test_para_centavos_recusa_valores_fora_do_limite(sb, valor):
+    with pytest.raises(ValueError):
+        sb.Dinheiro.para_centavos(valor)
+
+
+def test_limite_fica_abaixo_de_64_bits(sb):
+    maximo = sb.Dinheiro.MAXIMO_CENTAVOS
+    assert sb.Dinheiro.para_centavos(maximo // 100) == maximo
+    assert 2 * maximo < 2 ** 63
+
+
+@pytest.mark.parametrize("classe_historico", ["Historico", "HistoricoColunar", "HistoricoEscalonado"])
+def test_deposito_invalido_nao_altera_a_conta(sb, abrir_conta, classe_historico):
+    sb.Conta.classe_historico = getattr(sb, classe_historico)
+    conta = abrir_conta(100)
+    for valor in ("1e20", "0.005"):
+        with pytest.raises(ValueError):
+            conta.depositar(valor)
+    assert conta.saldo_centavos == 10000
+    assert len(conta.historico.transacoes) == 1
+
+
+def test_deposito_nao_ultrapassa_o_saldo_maximo(sb, abrir_conta):
+    conta = abrir_conta(classe=sb.Conta)
+    maximo = sb.Dinheiro.MAXIMO_CENTAVOS // 100
+    assert conta.executar_deposito(maximo) == sb.CodigoResultado.OK
+    assert conta.executar_deposito(1) == sb.CodigoResultado.VALOR_INVALIDO
+    assert conta.saldo_centavos == sb.Dinheiro.MAXIMO_CENTAVOS
+
+
+def test_saque_e_transferencia_recusam_valor_nao_positivo(sb, abrir_conta):
+    origem, destino = abrir_conta(100), abrir_conta()
+    assert origem.executar_saque(0) == sb.CodigoResultado.VALOR_INVALIDO
+    assert origem.executar_transferencia(destino, "-5") == sb.CodigoResultado.VALOR_INVALIDO
+    assert origem.saldo_centavos == 10000 and destino.saldo_centavos == 0
@@ -0,0 +1,73 @@
+import random
+
+
+def cadastrar(sb, caixa, cpf, nome, agencia="0001"):
+    cliente = sb.PessoaFisica("Rua A, 1", cpf, nome, sb.date(1990, 1, 1))
+    caixa.adicionar_cliente(cliente)
+    conta = sb.Conta(cliente, sb.Conta.reservar_numeros(1)[0], agencia)
+    caixa.adicionar_conta(conta)
+    return conta
+
+
+def test_lista_ordenada_acompanha_uma_lista_comum(sb, monkeypatch):
+    monkeypatch.setattr(sb._ListaOrdenada, "CARGA", 4)
+    lista = sb._ListaOrdenada(random.Random(1).sample(range(1000), 50))
+    esperado = sorted(lista.a_partir(-1))
+    aleatorio = random.Random(2)
+    for _ in range(2000):
+        item = aleatorio.randrange(1000)
+        if aleatorio.random() < 0.5:
+            lista.adicionar(item)
+            esperado.append(item)
+            esperado.sort()
+        else:
+            assert lista.remover(item) == (item in esperado)
+            if item in esperado:
+                esperado.remove(item)
+        assert len(lista) == len(esperado)
+    assert list(lista.a_partir(-1)) == esperado
+    assert list(lista.a_partir(500)) == [item for item in esperado if item >= 500]
+    assert (esperado[0] in lista) and (1000 not in lista)
+
+
+def test_busca_por_nome_e_saldo(sb, caixa):
+    joao = cadastrar(sb, caixa, "52998224725", "João da Silva")
+    maria = cadastrar(sb, caixa, "11144477735", "Maria Silveira", agencia="0002")
+    diretorio = sb.Diretorio(caixa)
+    assert diretorio.buscar_nome("joao") == [joao.cliente]
+    assert {c.cpf for c in diretorio.buscar_nome("SILV")} == {joao.cliente.cpf, maria.cliente.cpf}
+    assert len(diretorio.buscar_nome("silv", limite=1)) == 1
+    assert diretorio.buscar_nome("pedro") == []
+    assert diretorio.contas_agencia("0002") == [maria]
+
+    assert joao.depositar(100) and maria.depositar(50)
+    assert diretorio.contas_saldo_entre(40, 60) == [maria]
+    assert diretorio.contas_saldo_acima(50) == [joao]
+    assert diretorio.contas_saldo_entre(maximo=100) == [maria, joao]
+
+
+def test_saldo_recalculado_atualiza_o_indice(sb, caixa):
+    conta = cadastrar(sb, caixa, "52998224725", "João")
+    assert conta.depositar(100)
+    diretorio = sb.Diretorio(caixa)
+    conta._saldo = 0  # Saldo divergente do histórico
+    conta.recalcular_saldo()
+    assert diretorio.contas_saldo_acima(99) == [conta]
+
+
+def test_cadastro_inicial_vem_do_armazem_no_modo_cache(sb, tmp_path):
+    armazem = sb.ArmazemSQLite(str(tmp_path / "contas.db"))
+    cache = sb.CacheContas(armazem, capacidade=1, intervalo_sincronizacao=None)
+    try:
+        caixa = sb.CaixaEletronico(cache)
+        ana = cadastrar(sb, caixa, "52998224725", "Ana Souza")
+        bia = cadastrar(sb, caixa, "11144477735", "Beatriz Souza")  # Tira Ana do cache
+        assert ana.depositar(10)
+        assert bia.depositar(20)  # Saldo ainda não gravado no armazém
+        diretorio = sb.Diretorio(caixa)
+        assert {c.cpf for c in diretorio.buscar_nome("souza")} == {"52998224725", "11144477735"}
+        assert [c.numero for c in diretorio.contas_saldo_acima(15)] == [bia.numero]
+        assert [c.numero for c in diretorio.contas_saldo_entre(5, 15)] == [ana.numero]
+    finally:
+        cache.fechar()
+        armazem.fechar()
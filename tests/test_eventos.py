@@ -0,0 +1,74 @@
+import json
+import threading
+import time
+
+
+def sequencias_gravadas(caminho):
+    with open(caminho, encoding="utf-8") as arquivo:
+        return [json.loads(linha)["seq"] for linha in arquivo]
+
+
+def test_sequencia_retoma_da_maior_gravada(sb, caixa, abrir_conta, tmp_path):
+    caminho = tmp_path / "eventos.jsonl"
+    # Fluxo anterior com a última linha incompleta (escrita interrompida)
+    linhas = [sb.Evento(seq, "transacao", {}).serializar() for seq in (1, 2, 3)]
+    caminho.write_bytes(b"".join(linhas) + b'{"seq":')
+
+    barramento = sb.BarramentoEventos(caixa, str(tmp_path))
+    abrir_conta()
+    barramento.fechar()
+    assert sequencias_gravadas(caminho)[:4] == [1, 2, 3, 4]
+
+
+def test_fluxo_gravado_em_ordem_com_varios_publicadores(sb, caixa, abrir_conta, tmp_path):
+    contas = [abrir_conta(classe=sb.Conta) for _ in range(4)]
+    barramento = sb.BarramentoEventos(caixa, str(tmp_path))
+
+    def depositar(conta):
+        for _ in range(200):
+            conta.depositar("0.01")
+
+    threads = [threading.Thread(target=depositar, args=(conta,)) for conta in contas]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    barramento.fechar()
+    assert sequencias_gravadas(tmp_path / "eventos.jsonl") == list(range(1, 801))
+
+
+def test_consumidor_com_erro_nao_para_a_thread(sb, caixa, abrir_conta):
+    barramento = sb.BarramentoEventos(caixa)
+    assinatura = barramento.assinar("falha", capacidade=1)
+    recebidos = []
+
+    def consumir(lote):
+        recebidos.extend(evento.sequencia for evento in lote)
+        if len(recebidos) == 1:
+            raise OSError("disco cheio")
+
+    assinatura.consumir_em_thread(consumir, maximo=1)
+    conta = abrir_conta()
+    for _ in range(3):
+        assert conta.depositar(1)
+    limite = time.monotonic() + 5
+    while len(recebidos) < 5 and time.monotonic() < limite:
+        time.sleep(0.01)
+    barramento.fechar()
+    assert recebidos == [1, 2, 3, 4, 5]
+    assert assinatura.erros == 1
+
+
+def test_assinatura_cheia_nao_trava_as_transacoes(sb, caixa, abrir_conta):
+    barramento = sb.BarramentoEventos(caixa)
+    parada = barramento.assinar("parada", capacidade=1)  # Nenhum consumidor
+    conta = abrir_conta(classe=sb.Conta)
+    movimentar = threading.Thread(target=lambda: [conta.depositar(1) for _ in range(100)])
+    movimentar.start()
+    movimentar.join(5)
+    try:
+        assert not movimentar.is_alive()
+        assert conta.saldo_centavos == 10000
+    finally:
+        barramento.fechar()
+    assert parada.entregues == 1
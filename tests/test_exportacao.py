@@ -0,0 +1,79 @@
+import glob
+import os
+
+import pytest
+
+
+def ler_linhas(sb, diretorio: str, prefixo: str) -> list:
+    """Linhas ({coluna: valor}) de todos os arquivos da tabela, em Parquet ou SBC"""
+    linhas = []
+    for caminho in sorted(glob.glob(os.path.join(diretorio, prefixo + '*'))):
+        if caminho.endswith(sb.ArquivoParquet.EXTENSAO):
+            linhas.extend(sb.pq.read_table(caminho).to_pylist())
+        else:
+            for bloco in sb.ArquivoSBC.ler(caminho):
+                linhas.extend(dict(zip(bloco, valores)) for valores in zip(*bloco.values()))
+    return linhas
+
+
+def movimentos(linhas: list) -> dict:
+    """{numero: [(tipo, centavos, origem, destino)]} a partir das linhas exportadas"""
+    por_conta = {}
+    for linha in linhas:
+        por_conta.setdefault(linha['numero'], []).append(
+            (linha['tipo'], linha['centavos'], linha['origem'], linha['destino']))
+    return por_conta
+
+
+def esperado(conta, inicio: int = 0) -> list:
+    return [
+        (type(t).__name__, t.centavos, getattr(t, 'origem', 0), getattr(t, 'destino', 0))
+        for t in list(conta.historico.transacoes)[inicio:]
+    ]
+
+
+@pytest.mark.parametrize("classe_historico", ["Historico", "HistoricoColunar"])
+@pytest.mark.parametrize("formato", ["sbc", "parquet"])
+def test_exportacao_ida_e_volta(sb, caixa, abrir_conta, tmp_path, formato, classe_historico):
+    if formato == "parquet" and sb.pa is None:
+        pytest.skip("pyarrow não está instalado")
+    sb.Conta.classe_historico = getattr(sb, classe_historico)
+    contas = [abrir_conta(100), abrir_conta(50), abrir_conta()]
+    assert contas[0].sacar(30)
+    assert contas[0].executar_transferencia(contas[2], "12.34") == sb.CodigoResultado.OK
+    assert contas[1].executar_transferencia(contas[0], 5) == sb.CodigoResultado.OK
+    exportador = sb.ExportadorColunar(caixa, str(tmp_path), fragmentos=2, tamanho_bloco=2, formato=formato)
+
+    relatorio = exportador.exportar()
+    diretorio = relatorio['diretorio']
+    assert relatorio['transacoes'] == sum(len(conta.historico.transacoes) for conta in contas)
+    clientes = ler_linhas(sb, diretorio, 'clientes')
+    assert sorted(linha['cpf'] for linha in clientes) == sorted(caixa.clientes)
+    assert {linha['nascimento'] for linha in clientes} == {sb.date(1990, 1, 1).toordinal()}
+    linhas_contas = {linha['numero']: linha for linha in ler_linhas(sb, diretorio, 'contas-')}
+    for conta in contas:
+        linha = linhas_contas[conta.numero]
+        assert (linha['cpf'], linha['agencia'], linha['classe']) == (conta.cliente.cpf, "1001", "ContaCorrente")
+        assert linha['saldo_centavos'] == conta.saldo_centavos
+        assert linha['limite_centavos'] == conta.limite_centavos
+    transacoes = ler_linhas(sb, diretorio, 'transacoes-')
+    assert movimentos(transacoes) == {conta.numero: esperado(conta) for conta in contas}
+    assert all(linha['instante'] > 0 for linha in transacoes)
+
+    # A exportação seguinte traz só as transações novas
+    assert contas[2].depositar(1)
+    relatorio = exportador.exportar()
+    novas = movimentos(ler_linhas(sb, relatorio['diretorio'], 'transacoes-'))
+    assert novas == {contas[2].numero: esperado(contas[2], -1)}
+    assert relatorio['contas'] == len(contas)
+
+
+def test_exportacao_recusa_caixa_com_cache(sb, tmp_path):
+    armazem = sb.ArmazemSQLite(str(tmp_path / "contas.db"))
+    cache = sb.CacheContas(armazem, 10)
+    try:
+        with pytest.raises(ValueError):
+            sb.ExportadorColunar(sb.CaixaEletronico(cache), str(tmp_path / "exportacao"))
+    finally:
+        cache.fechar()
+        armazem.fechar()
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+INICIO = datetime(2024, 3, 1, 12)
+
+
+@pytest.fixture(params=["Historico", "HistoricoColunar", "HistoricoEscalonado"])
+def classe_historico(request, sb, tmp_path, monkeypatch):
+    monkeypatch.setattr(sb.HistoricoEscalonado, "diretorio", str(tmp_path))
+    return getattr(sb, request.param)
+
+
+def preencher(sb, historico, quantidade):
+    """Um depósito por hora, com centavos = posição + 1"""
+    for i in range(quantidade):
+        historico.adicionar_transacao(sb.Deposito.de_centavos(i + 1, INICIO + timedelta(hours=i)))
+
+
+def centavos(transacoes):
+    return [transacao.centavos for transacao in transacoes]
+
+
+def test_periodo_inclui_o_inicio_e_exclui_o_fim(sb, classe_historico):
+    historico = classe_historico(1)
+    preencher(sb, historico, 500)
+    inicio, fim = INICIO + timedelta(hours=10), INICIO + timedelta(hours=20)
+    assert list(historico.indices_periodo(inicio, fim)) == list(range(10, 20))
+    assert centavos(historico.transacoes_periodo(inicio, fim)) == list(range(11, 21))
+    # Limites entre duas transações
+    assert list(historico.indices_periodo(inicio + timedelta(minutes=1), fim + timedelta(minutes=1))) == list(range(11, 21))
+    assert list(historico.indices_periodo(fim=fim)) == list(range(20))
+    assert list(historico.indices_periodo(inicio=INICIO + timedelta(hours=495))) == list(range(495, 500))
+    assert len(historico.indices_periodo()) == 500
+
+
+def test_periodo_vazio(sb, classe_historico):
+    historico = classe_historico(1)
+    assert list(historico.indices_periodo()) == []
+    preencher(sb, historico, 50)
+    meio = INICIO + timedelta(hours=5)
+    assert list(historico.indices_periodo(meio, meio)) == []
+    assert list(historico.indices_periodo(meio, INICIO)) == []
+    assert list(historico.indices_periodo(fim=INICIO)) == []
+    assert list(historico.transacoes_periodo(INICIO + timedelta(days=30))) == []
+
+
+def test_periodo_com_insercao_fora_de_ordem(sb):
+    historico = sb.Historico(1)
+    preencher(sb, historico, 10)
+    historico.adicionar_transacao(sb.Deposito.de_centavos(99, INICIO + timedelta(minutes=30)))
+    assert centavos(historico.transacoes_periodo(INICIO, INICIO + timedelta(hours=2))) == [1, 2, 99]
+
+
+def test_paginas_do_extrato(sb, caixa, abrir_conta, classe_historico):
+    servico = sb.ServicoBancario(caixa)
+    sb.Conta.classe_historico = classe_historico
+    conta = abrir_conta()
+    preencher(sb, conta.historico, 120)
+    fim = INICIO + timedelta(hours=100)
+    paginas = list(servico.paginar_extrato(conta, INICIO, fim, tamanho_pagina=30))
+    assert [len(pagina) for pagina in paginas] == [30, 30, 30, 10]
+    linhas = [linha for pagina in paginas for linha in pagina]
+    formatar = servico.formatador.formatar
+    assert linhas == [formatar(n, t) for n, t in enumerate(conta.historico.transacoes_periodo(INICIO, fim), 1)]
+    # Período que fecha exatamente numa página: não há página vazia no fim
+    assert [len(p) for p in servico.paginar_extrato(conta, INICIO, INICIO + timedelta(hours=60), 30)] == [30, 30]
+    # Período além da última transação
+    assert list(servico.paginar_extrato(conta, INICIO + timedelta(days=30), tamanho_pagina=30)) == []
+
+
+def test_classes_de_historico_concordam(sb, tmp_path, monkeypatch):
+    monkeypatch.setattr(sb.HistoricoEscalonado, "diretorio", str(tmp_path))
+    historicos = [sb.Historico(1), sb.HistoricoColunar(1), sb.HistoricoEscalonado(1)]
+    for historico in historicos:
+        preencher(sb, historico, 2000)
+    for inicio, fim in [(None, None), (INICIO + timedelta(hours=7), INICIO + timedelta(hours=1500)),
+                        (INICIO + timedelta(hours=1999), None), (INICIO - timedelta(days=1), INICIO)]:
+        resultados = [(list(h.indices_periodo(inicio, fim)), centavos(h.transacoes_periodo(inicio, fim)))
+                      for h in historicos]
+        assert resultados[1] == resultados[0] and resultados[2] == resultados[0]
@@ -0,0 +1,47 @@
+from datetime import date
+
+import pytest
+
+
+def test_numeracao_continua_a_partir_do_processo_principal(sb):
+    ja_usados = set(sb.Conta.reservar_numeros(5))
+    with sb.LedgerFragmentado(3, classe_conta=sb.Conta) as ledger:
+        clientes = [(f"{i:011d}", f"Cliente {i}", "Rua A, 1", date(1990, 1, 1)) for i in range(12)]
+        numeros = ledger.abrir_contas(clientes)
+    assert len(set(numeros)) == len(numeros)
+    assert not ja_usados & set(numeros)
+    assert min(numeros) > max(ja_usados)
+
+
+def test_cpf_formatado_vai_para_o_mesmo_fragmento(sb):
+    with sb.LedgerFragmentado(2, classe_conta=sb.Conta) as ledger:
+        primeira, segunda = ledger.abrir_contas([
+            ("529.982.247-25", "Fulano", "Rua A, 1", date(1990, 1, 1)),
+            ("52998224725", "Fulano", "Rua A, 1", date(1990, 1, 1)),
+        ])
+        assert ledger.fragmento(primeira) == ledger.fragmento(segunda)
+
+
+def test_erro_em_um_fragmento_nao_dessincroniza_os_pipes(sb):
+    with sb.LedgerFragmentado(2, classe_conta=sb.Conta) as ledger:
+        numeros = ledger.abrir_contas([(f"{i:011d}", "Cliente", "Rua A, 1", date(1990, 1, 1)) for i in range(4)])
+        with pytest.raises(RuntimeError):
+            ledger.aplicar_lote([(numeros[0], "D", 100), (numeros[1], "D")])  # Linha malformada
+        assert ledger.aplicar_lote([(numero, "D", 100) for numero in numeros]).tolist() == [0] * 4
+        saldos = ledger.saldos(numeros)
+        assert sorted(saldos) == sorted(numeros)
+
+
+def test_ledgers_e_contas_locais_nao_repetem_numeros(sb):
+    clientes = [(f"{i:011d}", "Cliente", "Rua A, 1", date(1990, 1, 1)) for i in range(7)]
+    with sb.LedgerFragmentado(2, classe_conta=sb.Conta) as primeiro, \
+            sb.LedgerFragmentado(3, classe_conta=sb.Conta) as segundo:
+        numeros_primeiro = primeiro.abrir_contas(clientes)
+        numeros_segundo = segundo.abrir_contas(clientes)
+        local = sb.Conta.reservar_numeros(1)[0]
+        assert primeiro.aplicar_lote([(n, "D", 1) for n in numeros_primeiro]).tolist() == [0] * 7
+        assert segundo.aplicar_lote([(n, "D", 2) for n in numeros_segundo]).tolist() == [0] * 7
+        assert set(primeiro.saldos(numeros_primeiro).values()) == {100}
+        assert set(segundo.saldos(numeros_segundo).values()) == {200}
+    todos = numeros_primeiro + numeros_segundo + [local]
+    assert len(set(todos)) == len(todos)
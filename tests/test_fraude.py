@@ -0,0 +1,73 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.fixture
+def instalar_motor(sb):
+    motores = []
+
+    def instalar(*regras):
+        motor = sb.MotorFraude(regras)
+        motor.instalar()
+        motores.append(motor)
+        return motor
+    yield instalar
+    for motor in motores:
+        motor.desinstalar()
+
+
+def test_verificacao_nao_contabiliza_o_movimento(sb, abrir_conta, instalar_motor):
+    instalar_motor(sb.RegraVelocidade('rajada', 10, maximo_quantidade=2))
+    conta = abrir_conta(100, classe=sb.Conta)
+    for _ in range(5):
+        assert conta.verificar_saque(100) == sb.CodigoResultado.OK
+    assert conta.executar_saque(1) == sb.CodigoResultado.OK
+    assert conta.executar_saque(1) == sb.CodigoResultado.OK
+    assert conta.executar_saque(1) == sb.CodigoResultado.BLOQUEIO_FRAUDE
+
+
+def test_janela_soma_apenas_movimentos_efetivados(sb, abrir_conta, instalar_motor):
+    motor = instalar_motor(sb.RegraVelocidade('valor', 10, maximo_valor=100))
+    conta = abrir_conta(1000, classe=sb.Conta)
+    assert conta.executar_saque(200) == sb.CodigoResultado.BLOQUEIO_FRAUDE
+    assert conta.executar_saque(5000) == sb.CodigoResultado.SALDO_INSUFICIENTE
+    assert conta.executar_saque(60) == sb.CodigoResultado.OK
+    assert conta.executar_saque(40) == sb.CodigoResultado.OK
+    assert conta.executar_saque("0.01") == sb.CodigoResultado.BLOQUEIO_FRAUDE
+    assert motor.estatisticas()['valor']['bloqueios'] == 2
+
+
+def test_transferencia_recusada_pelo_destino_nao_conta(sb, abrir_conta, instalar_motor):
+    instalar_motor(sb.RegraVelocidade('rajada', 10, maximo_quantidade=1, tipos=('transferencia',)))
+    origem, destino = abrir_conta(1000, classe=sb.Conta), abrir_conta()
+    for _ in range(destino.limite_transacoes):
+        assert destino.depositar(1)
+    assert origem.executar_transferencia(destino, 10) == sb.CodigoResultado.LIMITE_DESTINO
+    outro = abrir_conta()
+    assert origem.executar_transferencia(outro, 10) == sb.CodigoResultado.OK
+    assert origem.executar_transferencia(outro, 10) == sb.CodigoResultado.BLOQUEIO_FRAUDE
+    # A transferência recebida não entra na janela do destino
+    assert outro.executar_transferencia(origem, 1) == sb.CodigoResultado.OK
+
+
+def test_lote_contabiliza_os_saques_aprovados(sb, caixa, abrir_conta, instalar_motor):
+    instalar_motor(sb.RegraVelocidade('rajada', 10, maximo_quantidade=2))
+    conta = abrir_conta(100, classe=sb.Conta)
+    resultados = caixa.aplicar_lote([(conta.numero, 'S', 1)] * 3)
+    assert list(resultados) == [sb.CodigoResultado.OK, sb.CodigoResultado.OK, sb.CodigoResultado.BLOQUEIO_FRAUDE]
+
+
+def test_janelas_ociosas_sao_descartadas(sb, instalar_motor):
+    motor = instalar_motor(sb.RegraVelocidade('rajada', 0.001, maximo_quantidade=5))  # 60 ms
+    fatias = sb.MotorFraude.FATIAS
+    # Números na mesma fatia: o descarte acontece quando a fatia volta a ser usada
+    contas = [SimpleNamespace(numero=1 + i * fatias) for i in range(3)]
+    motor.registrar(contas[0], 100)
+    motor.registrar(contas[1], 100)
+    assert motor.estatisticas()['rajada']['janelas'] == 2
+    time.sleep(0.15)
+    motor.registrar(contas[2], 100)
+    assert motor.estatisticas()['rajada']['janelas'] == 1
+    assert motor.bloquear(contas[0], 100) is None
@@ -0,0 +1,45 @@
+from datetime import date, datetime, timedelta
+
+
+def test_contagem_do_dia_inclui_subclasses(sb):
+    class SaqueAgendado(sb.Saque):
+        pass
+
+    historico = sb.Historico(1)
+    historico.adicionar_transacao(sb.Saque.de_centavos(100))
+    historico.adicionar_transacao(SaqueAgendado.de_centavos(200))
+    historico.adicionar_transacao(sb.Deposito.de_centavos(300))
+    assert historico.contar_hoje(sb.Saque) == 2
+    assert historico.contar_hoje(SaqueAgendado) == 1
+    assert historico.contar_hoje(sb.Transacao) == historico.contar_hoje() == 3
+
+
+def test_contadores_na_virada_do_dia(sb, monkeypatch):
+    historico = sb.Historico(1)
+    historico.adicionar_transacao(sb.Deposito.de_centavos(100))
+    historico.adicionar_transacao(sb.Saque.de_centavos(50))
+    hoje = date.today()
+    amanha = hoje + timedelta(days=1)
+
+    class Data(date):
+        dia = amanha
+
+        @classmethod
+        def today(cls):
+            return cls.dia
+    monkeypatch.setattr(sb, "date", Data)
+    assert historico.contar_hoje() == 0
+    assert historico.contar_hoje(sb.Saque) == 0
+
+    # A leitura no dia seguinte não apaga a contagem do dia em que ela foi feita
+    Data.dia = hoje
+    assert historico.contar_hoje() == 2
+    assert historico.contar_hoje(sb.Saque) == 1
+
+    Data.dia = amanha
+    historico.adicionar_transacao(sb.Deposito.de_centavos(10, datetime.combine(amanha, datetime.min.time())))
+    assert historico.contar_hoje() == 1
+    assert historico.contar_hoje(sb.Saque) == 0
+    # Transação com data anterior não volta a contar no dia corrente
+    historico.adicionar_transacao(sb.Saque.de_centavos(10, datetime.now()))
+    assert historico.contar_hoje() == 1
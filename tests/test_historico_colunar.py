@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+INICIO = datetime(2024, 1, 1, 9)
+
+
+def preencher(sb, historico):
+    """Depósitos, saques, consultas e transferências nos dois sentidos da conta 1"""
+    for i in range(300):
+        data = INICIO + timedelta(minutes=i)
+        if i % 7 == 0:
+            historico.adicionar_transacao(sb.Transferencia.entre(i + 3, 1 if i % 2 else 2, 2 if i % 2 else 1, data))
+        elif i % 5 == 0:
+            historico.adicionar_transacao(sb.Consulta(data))
+        elif i % 3 == 0:
+            historico.adicionar_transacao(sb.Saque.de_centavos(i, data))
+        else:
+            historico.adicionar_transacao(sb.Deposito.de_centavos(i * 10, data))
+
+
+def descrever(transacoes):
+    return [(type(t), getattr(t, 'centavos', None), t.data, getattr(t, 'origem', None), getattr(t, 'destino', None))
+            for t in transacoes]
+
+
+@pytest.fixture(params=["numpy", "sem_numpy"])
+def modo_numpy(request, sb, monkeypatch):
+    if request.param == "numpy":
+        if sb.np is None:
+            pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(sb, "np", None)
+    return request.param
+
+
+def test_colunar_equivale_ao_historico(sb, modo_numpy):
+    historico, colunar = sb.Historico(1), sb.HistoricoColunar(1)
+    preencher(sb, historico)
+    preencher(sb, colunar)
+    assert descrever(colunar.transacoes) == descrever(historico.transacoes)
+    assert descrever(colunar.transacoes[-3:]) == descrever(historico.transacoes[-3:])
+    assert colunar.recalcular_saldo(1) == historico.recalcular_saldo(1)
+    assert colunar.recalcular_saldo(2) == historico.recalcular_saldo(2)
+
+
+def test_saldo_de_historico_colunar_vazio(sb, modo_numpy):
+    assert sb.HistoricoColunar(1).recalcular_saldo(1) == 0
+
+
+def test_transacoes_sem_dicionario_de_instancia(sb):
+    for transacao in (sb.Deposito.de_centavos(1), sb.Saque.de_centavos(1), sb.Consulta(INICIO),
+                      sb.Transferencia.entre(1, 1, 2, INICIO)):
+        assert not hasattr(transacao, '__dict__')
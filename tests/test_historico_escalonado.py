@@ -0,0 +1,65 @@
+import gc
+import os
+import threading
+from datetime import datetime
+
+
+def preencher(sb, historico, quantidade, inicio=0):
+    for i in range(inicio, inicio + quantidade):
+        historico.adicionar_transacao(sb.Deposito.de_centavos(i + 1, datetime(2024, 1, 1)))
+
+
+def test_leitura_das_duas_camadas(sb, tmp_path, monkeypatch):
+    monkeypatch.setattr(sb.HistoricoEscalonado, "diretorio", str(tmp_path))
+    historico = sb.HistoricoEscalonado(1)
+    preencher(sb, historico, 1000)
+    assert historico._arquivadas > 0
+    assert [t.centavos for t in historico.transacoes] == list(range(1, 1001))
+    assert historico.transacoes[5].centavos == 6
+    assert historico.transacoes[-1].centavos == 1000
+    assert [t.centavos for t in historico.transacoes[30:35]] == [31, 32, 33, 34, 35]
+    assert historico.recalcular_saldo(1) == sum(range(1, 1001))
+
+
+def test_historicos_compartilham_segmentos_e_liberam_os_arquivos(sb, tmp_path, monkeypatch):
+    monkeypatch.setattr(sb.HistoricoEscalonado, "diretorio", str(tmp_path))
+    monkeypatch.setattr(sb._SegmentoHistorico, "TAMANHO_LOTE", 4096)
+    monkeypatch.setattr(sb._SegmentoHistorico, "TAMANHO_MAXIMO", 64 * 1024)
+    sb._SegmentoHistorico.atual = None  # Começa um segmento novo em tmp_path
+    historicos = [sb.HistoricoEscalonado(n) for n in range(50)]
+    for historico in historicos:
+        preencher(sb, historico, 200)
+    arquivos = os.listdir(tmp_path)
+    assert 1 < len(arquivos) < len(historicos)
+    for historico in historicos:
+        assert [t.centavos for t in historico.transacoes] == list(range(1, 201))
+
+    del historico
+    historicos.clear()
+    gc.collect()
+    # Resta apenas o segmento que ainda recebe blocos novos
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_leitores_concorrentes_durante_despejos(sb, tmp_path, monkeypatch):
+    monkeypatch.setattr(sb.HistoricoEscalonado, "diretorio", str(tmp_path))
+    historico = sb.HistoricoEscalonado(1)
+    preencher(sb, historico, 1)
+    erros = []
+    parar = threading.Event()
+
+    def ler():
+        while not parar.is_set():
+            quantidade = len(historico.transacoes)
+            for indice in (0, quantidade // 2, quantidade - 1):
+                if historico.transacoes[indice].centavos != indice + 1:
+                    erros.append(indice)
+
+    leitor = threading.Thread(target=ler)
+    leitor.start()
+    try:
+        preencher(sb, historico, 5000, inicio=1)
+    finally:
+        parar.set()
+        leitor.join()
+    assert erros == []
@@ -0,0 +1,41 @@
+import tracemalloc
+
+import pytest
+
+
+def test_digitos_de_outros_alfabetos_nao_passam_como_cpf(sb):
+    arabe = "٥٢٩٩٨٢٢٤٧٢٥"  # 52998224725 em algarismos arábico-índicos
+    assert sb.Validacao.limpar_cpf(arabe) == ""
+    assert sb.Validacao.validar_cpf(arabe) is False
+    assert sb.Validacao.validar_cpfs([arabe, "52998224725"]) == [False, True]
+
+
+def test_importacao_conta_cpfs_invalidos_sem_abortar(sb, caixa, tmp_path):
+    caminho = tmp_path / "clientes.csv"
+    caminho.write_text(
+        "cpf,nome,endereco,data_nascimento\n"
+        "٥٢٩٩٨٢٢٤٧٢٥,Arábico,Rua A,1990-01-01\n"
+        "529.982.247-25,Fulano,Rua B,01/02/1990\n",
+        encoding="utf-8")
+    relatorio = sb.ImportadorClientes(caixa).importar(str(caminho))
+    assert (relatorio['importados'], relatorio['cpf_invalido']) == (1, 1)
+    assert caixa.obter_cliente("52998224725") is not None
+
+
+def test_medicao_de_memoria_para_mesmo_com_erro(sb, caixa, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        sb.ImportadorClientes(caixa).importar(str(tmp_path / "ausente.csv"), medir_memoria=True)
+    assert not tracemalloc.is_tracing()
+
+
+@pytest.mark.parametrize("com_numpy", [True, False])
+def test_validacao_em_lote_igual_a_individual(sb, monkeypatch, com_numpy):
+    if not com_numpy:
+        monkeypatch.setattr(sb, "np", None)
+    elif sb.np is None:
+        pytest.importorskip("numpy")
+    cpfs = ["52998224725", "52998224726", "11111111111", "1144477735", "111444777350",
+            "1114447773a", "", "11144477735", "٥٢٩٩٨٢٢٤٧٢٥", "39053344705", "00000000000"]
+    assert sb.Validacao.validar_cpfs(cpfs) == [sb.Validacao.validar_cpf(cpf) for cpf in cpfs]
+    assert sb.Validacao.validar_cpfs(["abc"]) == [False]
+    assert sb.Validacao.validar_cpfs([]) == []
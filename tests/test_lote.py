@@ -0,0 +1,45 @@
+import pytest
+
+
+def test_lote_segue_as_regras_da_conta_corrente(sb, caixa, abrir_conta):
+    conta = abrir_conta(100)
+    codigos = sb.CodigoResultado
+    lote = [
+        ('S', "600"),  # Acima do limite por saque
+        ('S', "200"),  # Saldo insuficiente
+        ('S', "10"), ('S', "10"), ('S', "10"),
+        ('S', "0.001"),  # Limite de saques vem antes da validação do valor
+        ('D', "0.001"),
+        ('X', "1"),
+    ] + [('D', "1")] * 6 + [('D', "abc")]  # Com o depósito inicial, 10 transações antes da última
+    resultados = caixa.aplicar_lote([(conta.numero, tipo, valor) for tipo, valor in lote])
+    assert list(resultados) == [
+        codigos.LIMITE_VALOR_SAQUE, codigos.SALDO_INSUFICIENTE, codigos.OK, codigos.OK, codigos.OK,
+        codigos.LIMITE_SAQUES, codigos.VALOR_INVALIDO, codigos.OPERACAO_INVALIDA,
+    ] + [codigos.OK] * 6 + [codigos.LIMITE_TRANSACOES]
+    assert conta.saldo_centavos == 10000 - 3000 + 600
+
+
+def test_lote_respeita_o_saldo_maximo(sb, caixa, abrir_conta):
+    conta = abrir_conta(classe=sb.Conta)
+    maximo = sb.Dinheiro.MAXIMO_CENTAVOS // 100
+    resultados = caixa.aplicar_lote([(conta.numero, 'D', maximo), (conta.numero, 'D', 1)])
+    assert list(resultados) == [sb.CodigoResultado.OK, sb.CodigoResultado.VALOR_INVALIDO]
+
+
+def test_lote_intercalado_mantem_a_ordem_e_nao_imprime(sb, caixa, abrir_conta, capsys, monkeypatch):
+    monkeypatch.setattr(sb.Validacao, "aguardar_tecla", lambda: pytest.fail("lote aguardou uma tecla"))
+    a, b = abrir_conta(), abrir_conta(20)
+    codigos = sb.CodigoResultado
+    resultados = caixa.aplicar_lote([
+        (a.numero, 'D', "10"), (b.numero, 'S', "5"), (999, 'D', "1"),
+        (a.numero, 'S', "4.50"), (b.numero, 'S', "50"), (999, 'S', "1"),
+    ])
+    assert isinstance(resultados, sb.array) and resultados.itemsize == 1
+    assert list(resultados) == [
+        codigos.OK, codigos.OK, codigos.CONTA_INEXISTENTE,
+        codigos.OK, codigos.SALDO_INSUFICIENTE, codigos.CONTA_INEXISTENTE,
+    ]
+    assert (a.saldo_centavos, b.saldo_centavos) == (550, 1500)
+    assert list(caixa.aplicar_lote([])) == []
+    assert capsys.readouterr() == ("", "")
@@ -0,0 +1,92 @@
+import re
+
+import pytest
+
+
+@pytest.fixture
+def metricas(sb):
+    metricas = sb.Metricas()
+    yield metricas
+    metricas.desativar()
+
+
+def test_ativar_e_desativar_restauram_os_metodos_originais(sb, metricas):
+    originais = {(classe, nome): classe.__dict__[nome] for classe, nome, _, _ in sb.Metricas.ALVOS}
+    metricas.ativar()
+    assert sb.Metricas.ativa is metricas
+    assert all(classe.__dict__[nome].__wrapped__ is original for (classe, nome), original in originais.items())
+    outra = sb.Metricas()
+    outra.ativar()  # Substitui a instância ativa sem empilhar instrumentações
+    assert all(classe.__dict__[nome].__wrapped__ is original for (classe, nome), original in originais.items())
+    outra.desativar()
+    assert sb.Metricas.ativa is None
+    assert all(classe.__dict__[nome] is original for (classe, nome), original in originais.items())
+
+
+def test_rejeicoes_contadas_por_motivo(sb, caixa, abrir_conta, metricas):
+    conta = abrir_conta(100)
+    metricas.ativar()
+    codigos = sb.CodigoResultado
+    assert conta.executar_saque(600) == codigos.LIMITE_VALOR_SAQUE
+    assert conta.executar_saque(200) == codigos.SALDO_INSUFICIENTE
+    assert conta.executar_saque(10) == codigos.OK
+    caixa.aplicar_lote([(conta.numero, 'S', 600), (999, 'D', 1)])
+    assert metricas.rejeicoes == {
+        ('saque', codigos.LIMITE_VALOR_SAQUE): 1,
+        ('saque', codigos.SALDO_INSUFICIENTE): 1,
+        ('lote', codigos.LIMITE_VALOR_SAQUE): 1,
+        ('lote', codigos.CONTA_INEXISTENTE): 1,
+    }
+    assert metricas.chamadas['saque'] == 3
+    assert metricas.chamadas['historico_contar_hoje'] > 0
+
+
+def test_percentis_do_histograma(sb):
+    histograma = sb.HistogramaLatencia()
+    assert histograma.percentil(50) == 0
+    for valor in range(1, 10_001):
+        histograma.registrar(valor)
+    for p in (50, 90, 99):
+        esperado = 10_000 * p / 100
+        assert esperado <= histograma.percentil(p) <= esperado * (1 + 1 / sb.HistogramaLatencia.SUB_BALDES)
+    assert histograma.percentil(100) == histograma.maximo == 10_000
+
+
+def test_baldes_incluem_o_limite_superior(sb):
+    histograma = sb.HistogramaLatencia()
+    for valor in (1, 16, 17, 1023, 1024, 1025, 2048):
+        histograma.registrar(valor)
+        indice = sb.HistogramaLatencia.indice(valor)
+        assert sb.HistogramaLatencia.limite_superior(indice - 1) < valor <= sb.HistogramaLatencia.limite_superior(indice)
+    # 1023 e 1024 caem no balde (960, 1024]; o limite 960 fica de fora dele
+    assert histograma.acumulado_ate(960) == 3
+    assert histograma.acumulado_ate(1024) == 5
+    assert histograma.acumulado_ate(2048) == 7
+
+
+class FonteFalsa:
+    def linhas_prometheus(self, prefixo):
+        return [f"{prefixo}_fonte_falsa 1"]
+
+
+def test_formato_prometheus(sb, abrir_conta, metricas):
+    conta = abrir_conta(100)
+    fonte = FonteFalsa()
+    metricas.registrar_fonte(fonte)
+    metricas.ativar()
+    assert conta.executar_saque(600) == sb.CodigoResultado.LIMITE_VALOR_SAQUE
+    texto = metricas.exportar_prometheus()
+    assert texto.endswith("\n")
+    assert "# TYPE banco_latencia_segundos histogram" in texto
+    assert 'banco_operacoes_total{operacao="saque"} 1' in texto
+    assert 'banco_rejeicoes_total{operacao="saque",motivo="limite_valor_saque"} 1' in texto
+    assert "banco_fonte_falsa 1" in texto
+    for linha in texto.splitlines():
+        assert re.fullmatch(r'# (HELP|TYPE) \w+ .+|\w+(\{[^}]*\})? [0-9.e+-]+', linha), linha
+    baldes = [int(quantidade) for quantidade in
+              re.findall(r'banco_latencia_segundos_bucket\{operacao="saque",le="[^"]+"\} (\d+)', texto)]
+    assert baldes == sorted(baldes) and baldes[-1] == 1
+    assert 'banco_latencia_segundos_count{operacao="saque"} 1' in texto
+
+    metricas.remover_fonte(fonte)
+    assert "banco_fonte_falsa" not in metricas.exportar_prometheus()
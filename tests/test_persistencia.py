@@ -0,0 +1,113 @@
+import os
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def abrir_persistencia(sb, tmp_path):
+    abertas = []
+
+    def abrir(caixa, **opcoes):
+        persistencia = sb.Persistencia(caixa, str(tmp_path / "dados"), **opcoes)
+        persistencia.recuperar()
+        abertas.append(persistencia)
+        return persistencia
+    yield abrir
+    for persistencia in abertas:
+        if persistencia._ativo:
+            persistencia.fechar()
+
+
+def recuperar(sb, abrir_persistencia):
+    """Simula um reinício: numeração zerada e um caixa novo carregado do disco"""
+    sb.Conta.configurar_numeracao(1, 1)
+    caixa = sb.CaixaEletronico()
+    abrir_persistencia(caixa)
+    return caixa
+
+
+def estado(caixa):
+    return {
+        numero: (conta.saldo_centavos, [(type(t).__name__, t.centavos) for t in conta.historico.transacoes])
+        for numero, conta in caixa.contas.items()
+    }
+
+
+def test_log_e_reaplicado_na_recuperacao(sb, caixa, abrir_conta, abrir_persistencia):
+    persistencia = abrir_persistencia(caixa)
+    a, b = abrir_conta(100), abrir_conta(50)
+    assert a.sacar(30)
+    assert a.executar_transferencia(b, 20) == sb.CodigoResultado.OK
+    persistencia.fechar()
+
+    recuperado = recuperar(sb, abrir_persistencia)
+    assert estado(recuperado) == estado(caixa)
+    assert set(recuperado.clientes) == set(caixa.clientes)
+    assert sb.Conta.contador_contas > max(caixa.contas)
+
+
+def test_snapshot_e_log_posterior(sb, caixa, abrir_conta, abrir_persistencia, tmp_path):
+    persistencia = abrir_persistencia(caixa)
+    a = abrir_conta(100)
+    persistencia.snapshot()
+    assert os.path.getsize(tmp_path / "dados" / "wal.log") == 0
+    b = abrir_conta(10)
+    assert a.executar_transferencia(b, 5) == sb.CodigoResultado.OK
+    persistencia.fechar()
+
+    recuperado = recuperar(sb, abrir_persistencia)
+    assert estado(recuperado) == estado(caixa)
+
+
+def test_snapshot_durante_transferencias_concorrentes(sb, caixa, abrir_conta, abrir_persistencia):
+    persistencia = abrir_persistencia(caixa)
+    contas = [abrir_conta(1000, classe=sb.Conta) for _ in range(4)]
+    parar = threading.Event()
+
+    def transferir(origem, destino):
+        while not parar.is_set():
+            origem.executar_transferencia(destino, "0.01")
+            destino.depositar("0.01")
+
+    threads = [threading.Thread(target=transferir, args=(contas[i], contas[(i + 1) % 4])) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(5):
+            persistencia.snapshot()
+    finally:
+        parar.set()
+        for thread in threads:
+            thread.join()
+    persistencia.fechar()
+
+    recuperado = recuperar(sb, abrir_persistencia)
+    assert estado(recuperado) == estado(caixa)
+
+
+def test_snapshot_interrompido_reaplica_os_dois_logs(sb, caixa, abrir_conta, abrir_persistencia, tmp_path):
+    persistencia = abrir_persistencia(caixa)
+    a = abrir_conta(100)
+    persistencia.fechar()
+    dados = tmp_path / "dados"
+    os.replace(dados / "wal.log", dados / "wal.anterior.log")
+
+    recuperado = recuperar(sb, abrir_persistencia)
+    assert estado(recuperado) == {a.numero: (10000, [("Deposito", 10000)])}
+    assert not (dados / "wal.anterior.log").exists()
+
+
+def test_eventos_de_outro_caixa_nao_entram_no_log(sb, caixa, abrir_conta, abrir_persistencia):
+    persistencia = abrir_persistencia(caixa)
+    conta = abrir_conta(100)
+    outro = sb.CaixaEletronico()
+    cliente = sb.PessoaFisica("Rua B, 2", "11144477735", "Outro", sb.date(1980, 1, 1))
+    outro.adicionar_cliente(cliente)
+    estranha = sb.Conta.nova_conta(cliente)
+    outro.adicionar_conta(estranha)
+    assert estranha.depositar(5)
+    persistencia.fechar()
+
+    recuperado = recuperar(sb, abrir_persistencia)
+    assert list(recuperado.contas) == [conta.numero]
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import threading
+
+
+def conversar(sb, caixa, linhas: list) -> list:
+    """Envia as linhas a um servidor local e retorna as respostas até a conexão fechar"""
+    async def executar():
+        servidor = await sb.ServidorCaixa(caixa).iniciar(porta=0)
+        porta = servidor.sockets[0].getsockname()[1]
+        leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+        respostas = []
+        for linha in linhas:
+            escritor.write(linha)
+            await escritor.drain()
+            resposta = await leitor.readline()
+            if not resposta:
+                break
+            respostas.append(json.loads(resposta))
+        escritor.close()
+        servidor.close()
+        await servidor.wait_closed()
+        return respostas
+    return asyncio.run(executar())
+
+
+def requisicao(**campos) -> bytes:
+    return json.dumps(campos).encode() + b'\n'
+
+
+def test_metricas_exigem_login(sb, caixa, abrir_conta):
+    conta = abrir_conta(10)
+    respostas = conversar(sb, caixa, [
+        requisicao(op='metricas'),
+        requisicao(op='login', cpf=conta.cliente.cpf),
+        requisicao(op='metricas'),
+    ])
+    assert respostas[0] == {'ok': False, 'erro': "É necessário fazer login primeiro."}
+    assert respostas[1]['ok']
+    assert respostas[2]['erro'] != respostas[0]['erro']
+
+
+def test_requisicoes_invalidas_recebem_codigo(sb, caixa, abrir_conta):
+    conta = abrir_conta(10)
+    respostas = conversar(sb, caixa, [
+        requisicao(op='login', cpf=conta.cliente.cpf),
+        b'{"op": "transferir", "destino": 1e400, "valor": 1}\n',  # int(inf): OverflowError
+        b'nao e json\n',
+        requisicao(op='depositar', valor=1),
+    ])
+    invalida = sb.CodigoResultado.OPERACAO_INVALIDA
+    assert [r.get('codigo') for r in respostas[1:3]] == [invalida, invalida]
+    assert respostas[3] == {'ok': True, 'saldo': "11.00"}
+
+
+def test_linha_acima_do_limite_encerra_a_sessao(sb, caixa):
+    (resposta,) = conversar(sb, caixa, [b'x' * (2**17) + b'\n'])
+    assert resposta['codigo'] == sb.CodigoResultado.OPERACAO_INVALIDA
+    assert resposta['fim']
+
+
+def test_caixa_com_cache_processa_fora_do_laco(sb, tmp_path, monkeypatch):
+    armazem = sb.ArmazemSQLite(str(tmp_path / "contas.db"))
+    cache = sb.CacheContas(armazem, 10)
+    caixa = sb.CaixaEletronico(cache)
+    cliente = sb.PessoaFisica("Rua A, 1", "52998224725", "Fulano", sb.date(1990, 1, 1))
+    caixa.adicionar_cliente(cliente)
+    caixa.adicionar_conta(sb.ContaCorrente.nova_conta(cliente))
+    threads = []
+    processar = sb.ServidorCaixa.processar
+
+    def registrar(self, sessao, requisicao):
+        threads.append(threading.current_thread())
+        return processar(self, sessao, requisicao)
+    monkeypatch.setattr(sb.ServidorCaixa, "processar", registrar)
+    try:
+        respostas = conversar(sb, caixa, [
+            requisicao(op='login', cpf=cliente.cpf),
+            requisicao(op='depositar', valor="2.50"),
+        ])
+    finally:
+        cache.fechar()
+        armazem.fechar()
+    assert respostas[1] == {'ok': True, 'saldo': "2.50"}
+    assert threads and threading.main_thread() not in threads
@@ -0,0 +1,81 @@
+import pytest
+
+
+def test_compensar_retorna_um_resultado_por_linha_na_ordem(sb, caixa, abrir_conta):
+    a, b = abrir_conta(100), abrir_conta(100)
+    codigos = sb.CodigoResultado
+    resultados = caixa.servico.compensar_transferencias([
+        (a.numero, b.numero, "30"),
+        (b.numero, a.numero, "10"),
+        (a.numero, 999, "5"),
+        (a.numero, b.numero, "-40"),
+        (a.numero, a.numero, "1"),
+        (a.numero, b.numero, "0.001"),
+        (a.numero, b.numero, "abc"),
+    ])
+    assert list(resultados) == [
+        codigos.OK, codigos.OK, codigos.CONTA_INEXISTENTE, codigos.VALOR_INVALIDO,
+        codigos.OPERACAO_INVALIDA, codigos.VALOR_INVALIDO, codigos.VALOR_INVALIDO,
+    ]
+    # Valores negativos não invertem o sentido: só as duas transferências válidas movem dinheiro
+    assert a.saldo_centavos == 8000
+    assert b.saldo_centavos == 12000
+
+
+def test_compensar_registra_e_limita_cada_transferencia_bruta(sb, caixa, abrir_conta):
+    a, b = abrir_conta(1000), abrir_conta(1000)
+    codigos = sb.CodigoResultado
+    # Líquido de 100 reais, mas a primeira transferência passa do limite de 500 por saque
+    resultados = caixa.servico.compensar_transferencias([
+        (a.numero, b.numero, "600"),
+        (b.numero, a.numero, "500"),
+        (a.numero, b.numero, "200"),
+    ])
+    assert list(resultados) == [codigos.LIMITE_VALOR_SAQUE, codigos.OK, codigos.OK]
+    assert (a.saldo_centavos, b.saldo_centavos) == (130000, 70000)
+    transferencias = [t for t in a.historico.transacoes if type(t) is sb.Transferencia]
+    assert [(t.origem, t.destino, t.centavos) for t in transferencias] == [
+        (b.numero, a.numero, 50000), (a.numero, b.numero, 20000)]
+    assert a.recalcular_saldo() == a.saldo_centavos
+    assert b.recalcular_saldo() == b.saldo_centavos
+
+
+def test_transferencia_respeita_limite_de_saques(sb, abrir_conta):
+    origem, destino = abrir_conta(1000), abrir_conta()
+    for _ in range(origem.limite_saques):
+        assert origem.sacar(10)
+    assert origem.executar_transferencia(destino, 10) == sb.CodigoResultado.LIMITE_SAQUES
+    assert destino.saldo_centavos == 0
+
+
+def test_recalcular_saldo_exige_o_numero_da_conta(sb):
+    for classe in (sb.Historico, sb.HistoricoColunar, sb.HistoricoEscalonado):
+        with pytest.raises(TypeError):
+            classe().recalcular_saldo()
+
+
+def test_liquidar_registra_so_o_valor_liquido(sb, caixa, abrir_conta):
+    a, b, c = abrir_conta(1000), abrir_conta(1000), abrir_conta(100)
+    codigos = sb.CodigoResultado
+    resultados = caixa.servico.compensar_transferencias([
+        (a.numero, b.numero, "600"),  # Acima do limite por saque, mas o líquido é de 100
+        (b.numero, a.numero, "500"),
+        (a.numero, 999, "5"),
+        (c.numero, a.numero, "10"),
+        (a.numero, c.numero, "10"),  # Líquido zero
+    ], liquidar=True)
+    assert list(resultados) == [codigos.OK, codigos.OK, codigos.CONTA_INEXISTENTE, codigos.OK, codigos.OK]
+    assert (a.saldo_centavos, b.saldo_centavos, c.saldo_centavos) == (90000, 110000, 10000)
+    transferencias = [t for t in b.historico.transacoes if type(t) is sb.Transferencia]
+    assert [(t.origem, t.destino, t.centavos) for t in transferencias] == [(a.numero, b.numero, 10000)]
+    assert not [t for t in c.historico.transacoes if type(t) is sb.Transferencia]
+
+
+def test_liquido_recusado_vale_para_todo_o_par(sb, caixa, abrir_conta):
+    a, b = abrir_conta(100), abrir_conta(1000)
+    resultados = caixa.servico.compensar_transferencias([
+        (a.numero, b.numero, "300"),
+        (b.numero, a.numero, "100"),
+    ], liquidar=True)
+    assert list(resultados) == [sb.CodigoResultado.SALDO_INSUFICIENTE] * 2
+    assert (a.saldo_centavos, b.saldo_centavos) == (10000, 100000)